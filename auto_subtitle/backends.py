@@ -0,0 +1,356 @@
+from __future__ import annotations
+import sys
+import types
+import warnings
+import threading
+import contextlib
+import importlib.util
+from typing import Any, Callable, Dict, Iterator, List, Optional, Union
+
+from .models import load_whisper_model
+from .utils import LazyModule, sanitize_for_print
+
+np = LazyModule("numpy")
+torch = LazyModule("torch")
+whisper = LazyModule("whisper")
+
+BACKENDS = ["whisper", "faster-whisper"]
+
+# --task both decodes every chunk for each of these tasks and tags each segment with a "task" key.
+TASK_BOTH = "both"
+BOTH_TASKS = ["transcribe", "translate"]
+
+
+# Called with (audio seconds decoded so far, total audio seconds) while one transcribe() call is running.
+ProgressCallback = Callable[[float, float], None]
+
+
+def tag_segments_with_task(segments: List[Dict[str, Any]], task: str) -> List[Dict[str, Any]]:
+    for segment in segments: segment["task"] = task
+    return segments
+
+
+# whisper.transcribe() has no progress callback: it reports progress only through a tqdm bar it creates via the
+# `tqdm` module global of its own module. Swapping that global is private API, so report_whisper_transcribe_progress
+# checks it still holds the tqdm module first, and otherwise transcribes without progress. The lock keeps two
+# reporting calls from swapping it at once.
+WHISPER_PROGRESS_HOOK_LOCK = threading.Lock()
+WHISPER_PROGRESS_HOOK_WARNED = False
+
+
+@contextlib.contextmanager
+def report_whisper_transcribe_progress(progress_callback: ProgressCallback) -> Iterator[None]:
+    # While active, whisper.transcribe() calls from this thread report to progress_callback; other threads' bars
+    # are left alone.
+    global WHISPER_PROGRESS_HOOK_WARNED
+    transcribe_module = sys.modules.get(getattr(whisper.transcribe, "__module__", None) or "")
+    tqdm_module = getattr(transcribe_module, "tqdm", None)
+    if not isinstance(tqdm_module, types.ModuleType) or not isinstance(getattr(tqdm_module, "tqdm", None), type):
+        if not WHISPER_PROGRESS_HOOK_WARNED:
+            WHISPER_PROGRESS_HOOK_WARNED = True
+            print("WARNING: This whisper version does not create its progress bar through tqdm.tqdm as expected; per-chunk progress is not reported.", file=sys.stderr, flush=True)
+        yield
+        return
+    calling_thread = threading.get_ident()
+    frames_per_second = whisper.audio.FRAMES_PER_SECOND
+
+    class ProgressReportingTqdm(tqdm_module.tqdm):
+        # Counts frames itself: a disabled bar (verbose output on) does not advance n.
+        def update(self, n=1):
+            if threading.get_ident() == calling_thread and self.total:
+                self.frames_done = getattr(self, "frames_done", 0) + n
+                progress_callback(min(self.frames_done, self.total) / frames_per_second, self.total / frames_per_second)
+            return super().update(n)
+
+    with WHISPER_PROGRESS_HOOK_LOCK:
+        transcribe_module.tqdm = types.SimpleNamespace(tqdm=ProgressReportingTqdm)
+        try:
+            yield
+        finally:
+            transcribe_module.tqdm = tqdm_module
+
+
+class TranscriptionBackend:
+    """An inference engine behind the subtitle pipeline.
+
+    Segments are returned as whisper-style dicts (``start``, ``end``, ``text``, ``no_speech_prob``,
+    ``avg_logprob``, ``compression_ratio``, ...) with times relative to the audio passed in, so VAD offsets,
+    filtering, merging, caching and the SRT writer do not depend on which engine produced them.
+    """
+
+    name = ""
+
+    @property
+    def is_multilingual(self) -> bool:
+        return True
+
+    def transcribe(self, audio: Union[str, np.ndarray], options: Dict[str, Any], progress_callback: Optional[ProgressCallback] = None) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def transcribe_all_tasks(self, audio: Union[str, np.ndarray], options: Dict[str, Any], progress_callback: Optional[ProgressCallback] = None) -> List[Dict[str, Any]]:
+        # transcribe() that also takes task 'both', as one full pass per task with task-tagged segments.
+        # Progress then runs over both passes: each pass covers half of the audio's seconds.
+        if options.get("task") != TASK_BOTH: return self.transcribe(audio, options, progress_callback)
+        if isinstance(audio, str): audio = whisper.load_audio(audio) # Decode the file once for both passes.
+        segments: List[Dict[str, Any]] = []
+        for i_task, task in enumerate(BOTH_TASKS):
+            task_progress_callback = None
+            if progress_callback is not None:
+                task_progress_callback = lambda done_sec, total_sec, i_task=i_task: progress_callback((i_task * total_sec + done_sec) / len(BOTH_TASKS), total_sec)
+            segments.extend(tag_segments_with_task(self.transcribe(audio, dict(options, task=task), task_progress_callback), task))
+        return segments
+
+    def transcribe_chunks(self, audio_chunks: List[np.ndarray], options: Dict[str, Any], batch_size: int = 1) -> List[List[Dict[str, Any]]]:
+        # One segment list per chunk. Engines without a batched path transcribe the chunks one at a time.
+        chunk_options = dict(options, verbose=False)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            return [self.transcribe_all_tasks(chunk, chunk_options) for chunk in audio_chunks]
+
+    def detect_language(self, audio_chunks: List[np.ndarray]) -> List[Dict[str, float]]:
+        # Language code -> probability for every chunk.
+        raise NotImplementedError(f"the {self.name} backend cannot detect languages on its own")
+
+
+def split_decoding_result_into_segments(decoding_result: Any, tokenizer: Any, chunk_duration_sec: float, time_precision: float = 0.02) -> List[Dict[str, Any]]:
+    # Mirrors the timestamp-token slicing in whisper.transcribe for a single 30 s window. Like transcribe(),
+    # an unfinished segment after the last timestamp pair is left out (see needs_next_window), and
+    # instantaneous or empty segments are dropped.
+    tokens = list(decoding_result.tokens)
+    segment_base = {
+        "seek": 0, "temperature": decoding_result.temperature, "avg_logprob": decoding_result.avg_logprob,
+        "compression_ratio": decoding_result.compression_ratio, "no_speech_prob": decoding_result.no_speech_prob,
+    }
+
+    def make_segment(start_sec: float, end_sec: float, segment_tokens: List[int]) -> Dict[str, Any]:
+        text_tokens = [t for t in segment_tokens if t < tokenizer.eot]
+        return dict(segment_base, start=start_sec, end=end_sec, text=tokenizer.decode(text_tokens), tokens=text_tokens)
+
+    segments: List[Dict[str, Any]] = []
+    is_timestamp = [t >= tokenizer.timestamp_begin for t in tokens]
+    single_timestamp_ending = is_timestamp[-2:] == [False, True]
+    consecutive = [i + 1 for i in range(len(tokens) - 1) if is_timestamp[i] and is_timestamp[i + 1]]
+    if consecutive:
+        slices = consecutive + ([len(tokens)] if single_timestamp_ending else [])
+        last_slice = 0
+        for current_slice in slices:
+            sliced_tokens = tokens[last_slice:current_slice]
+            start_pos = sliced_tokens[0] - tokenizer.timestamp_begin
+            end_pos = sliced_tokens[-1] - tokenizer.timestamp_begin
+            segments.append(make_segment(start_pos * time_precision, end_pos * time_precision, sliced_tokens))
+            last_slice = current_slice
+    else:
+        duration_sec = chunk_duration_sec
+        timestamps = [t for t, ts in zip(tokens, is_timestamp) if ts]
+        if timestamps and timestamps[-1] != tokenizer.timestamp_begin:
+            duration_sec = (timestamps[-1] - tokenizer.timestamp_begin) * time_precision
+        segments.append(make_segment(0.0, duration_sec, tokens))
+    return [seg for seg in segments if seg["text"].strip() and seg["start"] != seg["end"]]
+
+
+def needs_next_window(decoding_result: Any, tokenizer: Any, chunk_duration_sec: float, time_precision: float = 0.02) -> bool:
+    # transcribe() seeks to the last timestamp of a window that ends mid-segment and decodes from there again;
+    # a single window can only stand in for transcribe() when that seek would land past the chunk's end.
+    tokens = list(decoding_result.tokens)
+    is_timestamp = [t >= tokenizer.timestamp_begin for t in tokens]
+    consecutive = [i + 1 for i in range(len(tokens) - 1) if is_timestamp[i] and is_timestamp[i + 1]]
+    if not consecutive or is_timestamp[-2:] == [False, True]: return False
+    return (tokens[consecutive[-1] - 1] - tokenizer.timestamp_begin) * time_precision < chunk_duration_sec
+
+
+class WhisperBackend(TranscriptionBackend):
+    """The openai-whisper engine, with batched decoding of short VAD chunks."""
+
+    name = "whisper"
+
+    def __init__(self, model: whisper.Whisper):
+        self.model = model
+
+    @property
+    def is_multilingual(self) -> bool:
+        return self.model.is_multilingual
+
+    def transcribe(self, audio: Union[str, np.ndarray], options: Dict[str, Any], progress_callback: Optional[ProgressCallback] = None) -> List[Dict[str, Any]]:
+        if progress_callback is None:
+            return self.model.transcribe(audio, **options).get("segments", [])
+        with report_whisper_transcribe_progress(progress_callback):
+            return self.model.transcribe(audio, **options).get("segments", [])
+
+    def transcribe_chunk_batch(self, audio_chunks: List[np.ndarray], whisper_options: Dict[str, Any]) -> List[List[Dict[str, Any]]]:
+        # One encoder pass over the stacked log-mel batch, then greedy/beam decoding in lockstep across the batch.
+        # Every chunk must fit in a single 30 s window. The windows are built like transcribe() builds its first
+        # one (log-mel over the chunk plus 30 s of silence, cut at the chunk's frames and zero-padded), and a
+        # missing language is detected per chunk on the silence-padded window as transcribe() does. With task
+        # 'both' the decoder runs once per task on the same encoder output, and each chunk's list holds the
+        # transcribe segments followed by the translate ones.
+        model = self.model
+        n_frames = whisper.audio.N_FRAMES
+        fp16 = model.device.type != "cpu" and whisper_options.get("fp16", True)
+        padded_mels = [whisper.log_mel_spectrogram(torch.from_numpy(chunk), model.dims.n_mels, padding=whisper.audio.N_SAMPLES) for chunk in audio_chunks]
+        content_frames = [min(n_frames, mel.shape[-1] - n_frames) for mel in padded_mels]
+        chunk_durations = [frames * whisper.audio.HOP_LENGTH / whisper.audio.SAMPLE_RATE for frames in content_frames]
+        mel_batch = torch.stack([whisper.pad_or_trim(mel[:, :frames], n_frames) for mel, frames in zip(padded_mels, content_frames)]).to(model.device)
+        if fp16: mel_batch = mel_batch.half()
+
+        languages = [whisper_options.get("language")] * len(audio_chunks)
+        if languages and languages[0] is None:
+            if not model.is_multilingual:
+                languages = ["en"] * len(audio_chunks)
+            else:
+                detection_batch = torch.stack([whisper.pad_or_trim(mel, n_frames) for mel in padded_mels]).to(model.device)
+                if fp16: detection_batch = detection_batch.half()
+                with torch.no_grad():
+                    _, language_probs_per_chunk = model.detect_language(detection_batch)
+                languages = [max(language_probs, key=language_probs.get) for language_probs in language_probs_per_chunk]
+        del padded_mels
+
+        with torch.no_grad():
+            audio_features = model.embed_audio(mel_batch)
+        tasks = BOTH_TASKS if whisper_options.get("task") == TASK_BOTH else [whisper_options.get("task", "transcribe")]
+        segments_per_chunk: List[List[Dict[str, Any]]] = [[] for _ in audio_chunks]
+        for task in tasks:
+            # DecodingOptions takes one language, so chunks are decoded in one group per detected language.
+            for language in dict.fromkeys(languages):
+                indices = [i for i, chunk_language in enumerate(languages) if chunk_language == language]
+                task_options = dict(whisper_options, task=task, language=language)
+                group_segments = self.decode_chunk_batch(
+                    [audio_chunks[i] for i in indices], audio_features[indices], task_options, [chunk_durations[i] for i in indices]
+                )
+                for i, task_segments in zip(indices, group_segments):
+                    segments_per_chunk[i].extend(tag_segments_with_task(task_segments, task) if len(tasks) > 1 else task_segments)
+        return segments_per_chunk
+
+    def decode_chunk_batch(
+        self, audio_chunks: List[np.ndarray], audio_features: torch.Tensor, whisper_options: Dict[str, Any], chunk_durations: List[float]
+    ) -> List[List[Dict[str, Any]]]:
+        # Decodes one task from precomputed encoder output. Chunks whose decode looks degenerate, or that
+        # transcribe() would continue in a second window, are re-run through transcribe() so they still get
+        # the usual temperature fallback and seeking.
+        model = self.model
+        compression_ratio_threshold = whisper_options.get("compression_ratio_threshold", 2.4)
+        logprob_threshold = whisper_options.get("logprob_threshold", -1.0)
+        no_speech_threshold = whisper_options.get("no_speech_threshold", 0.6)
+        decode_options = whisper.DecodingOptions(
+            task=whisper_options.get("task", "transcribe"), language=whisper_options.get("language"),
+            temperature=0.0, beam_size=whisper_options.get("beam_size"), patience=whisper_options.get("patience"),
+            prompt=whisper_options.get("initial_prompt"), without_timestamps=False,
+            fp16=model.device.type != "cpu" and whisper_options.get("fp16", True),
+        )
+        with torch.no_grad():
+            decoding_results = whisper.decode(model, audio_features, decode_options)
+
+        segments_per_chunk: List[List[Dict[str, Any]]] = []
+        for chunk, decoding_result, chunk_duration_sec in zip(audio_chunks, decoding_results, chunk_durations):
+            if decoding_result.no_speech_prob > no_speech_threshold and not decoding_result.avg_logprob > logprob_threshold:
+                segments_per_chunk.append([])
+                continue
+            tokenizer = whisper.tokenizer.get_tokenizer(
+                model.is_multilingual, num_languages=model.num_languages, language=decoding_result.language, task=decode_options.task
+            )
+            if (
+                decoding_result.compression_ratio > compression_ratio_threshold or decoding_result.avg_logprob < logprob_threshold
+                or needs_next_window(decoding_result, tokenizer, chunk_duration_sec)
+            ):
+                segments_per_chunk.append(self.transcribe(chunk, dict(whisper_options, verbose=False)))
+                continue
+            segments_per_chunk.append(split_decoding_result_into_segments(decoding_result, tokenizer, chunk_duration_sec))
+        return segments_per_chunk
+
+    def transcribe_chunks(self, audio_chunks: List[np.ndarray], options: Dict[str, Any], batch_size: int = 1) -> List[List[Dict[str, Any]]]:
+        # With task 'both' even single chunks take the batched path, which shares the encoder pass between the tasks.
+        # Word timings only come from transcribe(), so they keep every chunk off the batched path.
+        segments_per_chunk: List[Optional[List[Dict[str, Any]]]] = [None] * len(audio_chunks)
+        use_batched_path = (batch_size > 1 or options.get("task") == TASK_BOTH) and not options.get("word_timestamps")
+        batchable_indices = [i for i, chunk in enumerate(audio_chunks) if use_batched_path and len(chunk) <= whisper.audio.N_SAMPLES]
+        for batch_start in range(0, len(batchable_indices), max(1, batch_size)):
+            batch_indices = batchable_indices[batch_start:batch_start + batch_size]
+            try:
+                with warnings.catch_warnings():
+                    warnings.simplefilter("ignore")
+                    batch_segments = self.transcribe_chunk_batch([audio_chunks[i] for i in batch_indices], options)
+                for i, chunk_segments in zip(batch_indices, batch_segments):
+                    segments_per_chunk[i] = chunk_segments
+            except Exception as e_batch:
+                print(f"WARNING: Batched transcription of {len(batch_indices)} chunks failed: {sanitize_for_print(str(e_batch))}. Transcribing them one at a time.", file=sys.stderr, flush=True)
+
+        unbatched_indices = [i for i in range(len(audio_chunks)) if segments_per_chunk[i] is None]
+        for i, chunk_segments in zip(unbatched_indices, super().transcribe_chunks([audio_chunks[i] for i in unbatched_indices], options)):
+            segments_per_chunk[i] = chunk_segments
+        return segments_per_chunk
+
+    def detect_language(self, audio_chunks: List[np.ndarray]) -> List[Dict[str, float]]:
+        # One batched encoder pass over the first 30 s of every chunk.
+        model = self.model
+        mel_batch = torch.stack([
+            whisper.log_mel_spectrogram(whisper.pad_or_trim(torch.from_numpy(chunk)), model.dims.n_mels) for chunk in audio_chunks
+        ]).to(model.device)
+        if model.device.type != "cpu": mel_batch = mel_batch.half()
+        with torch.no_grad():
+            _, language_probs_per_chunk = model.detect_language(mel_batch)
+        return language_probs_per_chunk
+
+
+class FasterWhisperBackend(TranscriptionBackend):
+    """A CTranslate2 Whisper model through the optional faster-whisper package (int8 on the CPU)."""
+
+    name = "faster-whisper"
+
+    # whisper transcribe() option -> faster-whisper transcribe() keyword; other options have no counterpart.
+    OPTION_NAMES = {
+        "language": "language", "task": "task", "beam_size": "beam_size", "best_of": "best_of", "patience": "patience",
+        "temperature": "temperature", "compression_ratio_threshold": "compression_ratio_threshold", "logprob_threshold": "log_prob_threshold",
+        "no_speech_threshold": "no_speech_threshold", "condition_on_previous_text": "condition_on_previous_text",
+        "initial_prompt": "initial_prompt", "word_timestamps": "word_timestamps",
+    }
+
+    def __init__(self, model: Any):
+        self.model = model
+
+    @property
+    def is_multilingual(self) -> bool:
+        return getattr(self.model.model, "is_multilingual", True)
+
+    def transcribe(self, audio: Union[str, np.ndarray], options: Dict[str, Any], progress_callback: Optional[ProgressCallback] = None) -> List[Dict[str, Any]]:
+        transcribe_kwargs = {engine_name: options[name] for name, engine_name in self.OPTION_NAMES.items() if options.get(name) is not None}
+        segments, info = self.model.transcribe(audio, **transcribe_kwargs)
+        transcribed_segments = []
+        for segment in segments: # A generator: decoding happens while it is consumed.
+            transcribed_segments.append({
+                "id": segment.id, "seek": segment.seek, "start": segment.start, "end": segment.end, "text": segment.text,
+                "tokens": list(segment.tokens), "temperature": segment.temperature, "avg_logprob": segment.avg_logprob,
+                "compression_ratio": segment.compression_ratio, "no_speech_prob": segment.no_speech_prob,
+            })
+            if getattr(segment, "words", None):
+                transcribed_segments[-1]["words"] = [{"word": word.word, "start": word.start, "end": word.end, "probability": word.probability} for word in segment.words]
+            if progress_callback is not None and info.duration: progress_callback(min(segment.end, info.duration), info.duration)
+        return transcribed_segments
+
+    def detect_language(self, audio_chunks: List[np.ndarray]) -> List[Dict[str, float]]:
+        if not hasattr(self.model, "detect_language"):
+            return super().detect_language(audio_chunks)
+        return [dict(self.model.detect_language(chunk)[2]) for chunk in audio_chunks]
+
+
+def is_backend_available(backend_name: str) -> bool:
+    # Checked without importing faster-whisper (and CTranslate2), which only happens when the backend is loaded.
+    return backend_name == "whisper" or (backend_name == "faster-whisper" and importlib.util.find_spec("faster_whisper") is not None)
+
+
+def load_backend(
+    backend_name: str, model_name: str, download_root: Optional[str] = None, mmap_weights: bool = True, convert: bool = True,
+    quantize: str = "none", cpu_threads: int = 0
+) -> TranscriptionBackend:
+    # mmap_weights, convert and quantize only apply to the whisper backend; faster-whisper always runs int8.
+    if backend_name == "whisper":
+        return WhisperBackend(load_whisper_model(model_name, download_root, mmap_weights=mmap_weights, convert=convert, quantize=quantize))
+    if backend_name == "faster-whisper":
+        try:
+            import faster_whisper
+        except ImportError:
+            raise RuntimeError("--backend faster-whisper needs the faster-whisper package (pip install faster-whisper)")
+        use_cuda = torch.cuda.is_available()
+        return FasterWhisperBackend(faster_whisper.WhisperModel(
+            model_name, device="cuda" if use_cuda else "cpu", compute_type="int8_float16" if use_cuda else "int8",
+            cpu_threads=cpu_threads, download_root=download_root,
+        ))
+    raise ValueError(f"Unknown backend {backend_name!r}; available backends = {BACKENDS}")
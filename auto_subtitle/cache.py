@@ -0,0 +1,180 @@
+from __future__ import annotations
+import os
+import json
+import hashlib
+import tempfile
+from typing import Any, Callable, Dict, IO, List, Optional, Tuple, Union
+
+from .utils import LazyModule
+
+np = LazyModule("numpy")
+
+
+def hash_audio(audio: Union[str, np.ndarray]) -> str:
+    # Decoded waveforms are hashed by their float32 samples; temp-file audio by the WAV bytes.
+    hasher = hashlib.blake2b(digest_size=20)
+    if isinstance(audio, np.ndarray):
+        hasher.update(np.ascontiguousarray(audio, dtype=np.float32).data)
+    else:
+        with open(audio, "rb") as audio_file:
+            for block in iter(lambda: audio_file.read(1 << 20), b""):
+                hasher.update(block)
+    return hasher.hexdigest()
+
+
+def make_cache_key(audio_hash: str, model_name: str, options: Dict[str, Any]) -> str:
+    key_material = json.dumps({"audio": audio_hash, "model": model_name, "options": options}, sort_keys=True, default=str)
+    return hashlib.sha256(key_material.encode("utf-8")).hexdigest()
+
+
+class LruDirectoryCache:
+    """A directory of one-file-per-key entries with least-recently-used eviction.
+
+    Reads refresh an entry's mtime, and writes evict the oldest entries until the
+    directory fits in ``max_size_mb``.
+    """
+
+    suffix = ""
+
+    def __init__(self, cache_dir: str, max_size_mb: float, subdir: str):
+        self.cache_dir = os.path.join(cache_dir, subdir)
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024)
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}{self.suffix}")
+
+    def _read(self, key: str, reader: Callable[[str], Any]) -> Optional[Any]:
+        entry_path = self._entry_path(key)
+        try:
+            value = reader(entry_path)
+            os.utime(entry_path)
+            return value
+        except (OSError, ValueError):
+            return None
+
+    def _write(self, key: str, writer: Callable[[IO[bytes]], None]):
+        # Written to a temp file and renamed into place, so readers never see a partial entry.
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as entry_file:
+                writer(entry_file)
+            os.replace(temp_path, self._entry_path(key))
+        except Exception:
+            try: os.remove(temp_path)
+            except OSError: pass
+            raise
+        self.evict()
+
+    def evict(self):
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file() and entry.name.endswith(self.suffix):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total_bytes = sum(size for _, size, _ in entries)
+        for _, size, entry_path in sorted(entries):
+            if total_bytes <= self.max_size_bytes: break
+            try:
+                os.remove(entry_path)
+                total_bytes -= size
+            except OSError:
+                pass
+
+
+class TranscriptionCache(LruDirectoryCache):
+    """Raw Whisper segments, one JSON file per key from ``make_cache_key``."""
+
+    suffix = ".json"
+
+    def __init__(self, cache_dir: str, max_size_mb: float = 1024, subdir: str = "transcripts"):
+        super().__init__(cache_dir, max_size_mb, subdir)
+
+    def get(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        def read_json(entry_path: str) -> List[Dict[str, Any]]:
+            with open(entry_path, "r", encoding="utf-8") as entry_file:
+                return json.load(entry_file)
+        return self._read(key, read_json)
+
+    def put(self, key: str, segments: List[Dict[str, Any]]):
+        self._write(key, lambda entry_file: entry_file.write(json.dumps(segments, ensure_ascii=False, default=float).encode("utf-8")))
+
+
+class VadProbabilityCache(LruDirectoryCache):
+    """Silero per-window speech probabilities as float16 ``.npy`` files, keyed by ``make_cache_key`` over the
+    audio hash, the VAD model revision and the window parameters."""
+
+    suffix = ".npy"
+
+    def __init__(self, cache_dir: str, max_size_mb: float = 256, subdir: str = "vad"):
+        super().__init__(cache_dir, max_size_mb, subdir)
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        return self._read(key, lambda entry_path: np.load(entry_path, allow_pickle=False))
+
+    def put(self, key: str, speech_probs: np.ndarray):
+        self._write(key, lambda entry_file: np.save(entry_file, speech_probs.astype(np.float16), allow_pickle=False))
+
+
+class ChunkJournal:
+    """Append-only JSON-lines checkpoint of the VAD chunks of one file that finished transcribing.
+
+    One record per finished chunk batch: its ``[offset, length]`` sample ranges and its segments, already
+    offset to the file timeline. The journal is keyed like the transcription cache (audio hash, model and
+    options), so a resumed run only reuses chunks decoded with the same settings. A record cut short by a
+    crash is skipped on load and cut off the file before the next append.
+    """
+
+    suffix = ".jsonl"
+
+    def __init__(self, journal_dir: str, key: str):
+        os.makedirs(journal_dir, exist_ok=True)
+        self.journal_path = os.path.join(journal_dir, f"{key}{self.suffix}")
+        self.tail_checked = False
+
+    def load(self) -> Dict[Tuple[Tuple[int, int], ...], List[Dict[str, Any]]]:
+        finished_batches: Dict[Tuple[Tuple[int, int], ...], List[Dict[str, Any]]] = {}
+        try:
+            with open(self.journal_path, "r", encoding="utf-8") as journal_file:
+                for line in journal_file:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue # A record cut short by a crash; the records after it are still good.
+                    finished_batches[tuple((int(offset), int(length)) for offset, length in record["chunks"])] = record["segments"]
+        except OSError:
+            pass
+        return finished_batches
+
+    def truncate_partial_tail(self):
+        # Cuts the file back to its last complete line, so new records never continue a torn one.
+        try:
+            with open(self.journal_path, "rb+") as journal_file:
+                end = journal_file.seek(0, os.SEEK_END)
+                position = end
+                while position > 0:
+                    block_start = max(0, position - (1 << 16))
+                    journal_file.seek(block_start)
+                    block = journal_file.read(position - block_start)
+                    newline_index = block.rfind(b"\n")
+                    if newline_index >= 0:
+                        position = block_start + newline_index + 1
+                        break
+                    position = block_start
+                if position < end: journal_file.truncate(position)
+        except OSError:
+            pass
+
+    def append(self, chunk_ranges: List[Tuple[int, int]], segments: List[Dict[str, Any]]):
+        record = json.dumps({"chunks": [list(chunk_range) for chunk_range in chunk_ranges], "segments": segments}, ensure_ascii=False, default=float)
+        if not self.tail_checked:
+            self.truncate_partial_tail()
+            self.tail_checked = True
+        with open(self.journal_path, "a", encoding="utf-8") as journal_file:
+            journal_file.write(record + "\n")
+            journal_file.flush()
+            os.fsync(journal_file.fileno())
+
+    def remove(self):
+        try: os.remove(self.journal_path)
+        except OSError: pass
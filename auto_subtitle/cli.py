@@ -1,88 +1,766 @@
+from __future__ import annotations
 import os
 import sys
-import ffmpeg
-import whisper
 import argparse
 import warnings
 import tempfile
-from .utils import filename, str2bool, write_srt
-from typing import Optional, List, Dict, Any, Callable, Tuple
+from .utils import LazyModule, filename, sanitize_for_print, str2bool, output_formats_arg, SUBTITLE_FORMATS
+from .cache import ChunkJournal, TranscriptionCache, VadProbabilityCache, hash_audio, make_cache_key
+from .models import MODEL_NAMES, QUANTIZATION_MODES, build_empty_whisper_model, get_unsaved_buffers, load_whisper_model, load_whisper_state
+from .backends import BACKENDS, BOTH_TASKS, TASK_BOTH, TranscriptionBackend, WhisperBackend, is_backend_available, load_backend, tag_segments_with_task
+from .progress import PROGRESS_FORMATS, ProgressReporter, open_progress_stream
+from typing import Optional, List, Dict, Any, Callable, Iterable, Iterator, Tuple, Union
 import re
 import string
-import numpy as np
-import torch
 import multiprocessing
 import gc
+import time
+import pickle
+import hashlib
+import threading
+import weakref
+import queue
+import json
+import io
+import math
+import inspect
+from dataclasses import asdict
+from multiprocessing import shared_memory
+
+# Imported on first use: argument parsing and --help never load them.
+ffmpeg = LazyModule("ffmpeg")
+whisper = LazyModule("whisper")
+np = LazyModule("numpy")
+torch = LazyModule("torch")
 
 try:
-    import soundfile as sf
+    import resource
 except ImportError:
-    sf = None
+    resource = None
 try:
-    import torchaudio
+    import psutil
 except ImportError:
-    torchaudio = None
+    psutil = None
 
 VAD_MODEL = None
 VAD_UTILS = None
-WHISPER_MODEL_WORKER = None
+VAD_MODEL_REVISION = "unknown"
+WORKER_BACKEND: Any = None
+WHISPER_MODEL_WORKER_LOAD_SECONDS = 0.0
+WORKER_SHARED_AUDIO: Dict[str, shared_memory.SharedMemory] = {}
+WORKER_TASK_EVENTS = None
+WORKER_SHARED_WEIGHTS: Optional[shared_memory.SharedMemory] = None
+PROGRESS = ProgressReporter() # Replaced by main() with --progress_format jsonl; drops every event otherwise.
+JOB_CANCEL = threading.Event() # Set by the daemon's request reader when the running job is cancelled.
+JOB_CANCEL_POLL_SEC = 0.5 # How often waits on worker results look at JOB_CANCEL.
+
+SHARED_WEIGHTS_ALIGNMENT = 64
+
+def check_shared_weights_support():
+    # Weight sharing needs torch.frombuffer, load_state_dict(assign=...) (torch 2.1+) and TorchFunctionMode for
+    # build_empty_whisper_model. Checked up front so an older torch disables sharing, and every worker loads its
+    # own copy, instead of failing half way.
+    missing_names = []
+    if not callable(getattr(torch, "frombuffer", None)): missing_names.append("torch.frombuffer")
+    if "assign" not in inspect.signature(torch.nn.Module.load_state_dict).parameters: missing_names.append("Module.load_state_dict(assign=...)")
+    if not hasattr(getattr(torch, "overrides", None), "TorchFunctionMode"): missing_names.append("torch.overrides.TorchFunctionMode")
+    if missing_names:
+        raise RuntimeError(f"torch {getattr(torch, '__version__', '?')} lacks what weight sharing needs ({', '.join(missing_names)})")
+
+def share_whisper_model_weights(model: whisper.Whisper) -> Tuple[shared_memory.SharedMemory, Dict[str, Any]]:
+    # Copies every tensor of a CPU model's state dict into one shared-memory block and describes where each
+    # one lives. Workers rebuild the model from the spec with zero-copy views of the block, so N workers map
+    # one copy of the weights instead of loading N.
+    check_shared_weights_support()
+    state_dict = model.state_dict()
+    tensor_layout: Dict[str, Tuple[int, Tuple[int, ...], torch.dtype]] = {} # Name -> (block offset, shape, dtype).
+    block_size = 0
+    for name, tensor in state_dict.items():
+        tensor_offset = -(-block_size // SHARED_WEIGHTS_ALIGNMENT) * SHARED_WEIGHTS_ALIGNMENT
+        tensor_layout[name] = (tensor_offset, tuple(tensor.shape), tensor.dtype)
+        block_size = tensor_offset + tensor.numel() * tensor.element_size()
+    shared_block = shared_memory.SharedMemory(create=True, size=max(1, block_size))
+    for name, tensor in state_dict.items():
+        if tensor.numel() == 0: continue
+        torch.frombuffer(shared_block.buf, dtype=tensor.dtype, count=tensor.numel(), offset=tensor_layout[name][0]).copy_(tensor.reshape(-1))
+    # The few buffers outside the state dict are small and travel in the spec itself.
+    unsaved_buffers = io.BytesIO()
+    torch.save(get_unsaved_buffers(model), unsaved_buffers)
+    return shared_block, {
+        "block_name": shared_block.name, "block_bytes": block_size, "dims": asdict(model.dims), "tensors": tensor_layout,
+        "unsaved_buffers": unsaved_buffers.getvalue(),
+    }
+
+def build_whisper_model_from_shared_weights(weights_spec: Dict[str, Any], shared_block: Optional[shared_memory.SharedMemory] = None) -> whisper.Whisper:
+    # The returned model's tensors are views of the block, so the attachment must outlive the model.
+    global WORKER_SHARED_WEIGHTS
+    if shared_block is None:
+        if WORKER_SHARED_WEIGHTS is None or WORKER_SHARED_WEIGHTS.name != weights_spec["block_name"]:
+            WORKER_SHARED_WEIGHTS = shared_memory.SharedMemory(name=weights_spec["block_name"])
+        shared_block = WORKER_SHARED_WEIGHTS
 
-def sanitize_for_print(text_to_print: str) -> str:
+    state_dict = {}
+    for name, (tensor_offset, shape, dtype) in weights_spec["tensors"].items():
+        numel = math.prod(shape)
+        state_dict[name] = torch.frombuffer(shared_block.buf, dtype=dtype, count=numel, offset=tensor_offset).view(shape) if numel else torch.empty(shape, dtype=dtype)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore") # torch.load notes that it validates the sparse alignment_heads buffer.
+        unsaved_buffers = torch.load(io.BytesIO(weights_spec["unsaved_buffers"]), map_location="cpu", weights_only=True)
+    return load_whisper_state(build_empty_whisper_model(weights_spec["dims"]), state_dict, unsaved_buffers)
+
+def release_shared_weights_block(shared_block: shared_memory.SharedMemory):
+    # Unlinked first: the main model may still hold views of the block, which makes close() fail until it is freed.
     try:
-        
-        if sys.stdout.encoding and sys.stdout.encoding.lower() not in ['utf-8', 'utf8']:
-            return text_to_print.encode(sys.stdout.encoding, errors='replace').decode(sys.stdout.encoding, errors='ignore')
-        return text_to_print
-    except Exception: 
-        
-        return "".join(c if ord(c) < 128 else '?' for c in text_to_print)
+        shared_block.unlink()
+    except OSError as e:
+        print(f"WARNING: Could not release shared model weights block {shared_block.name}: {sanitize_for_print(str(e))}", file=sys.stderr, flush=True)
+    try: shared_block.close()
+    except BufferError: pass
 
-def load_whisper_model_for_worker(model_name_worker: str, download_root_worker: Optional[str]):
-    global WHISPER_MODEL_WORKER
-    if WHISPER_MODEL_WORKER is None:
+def get_process_memory_mb() -> Tuple[Optional[float], Optional[float]]:
+    # (unique, resident) set size of this process. Pages of shared blocks count towards RSS but not USS.
+    if psutil is None:
         try:
-            WHISPER_MODEL_WORKER = whisper.load_model(model_name_worker, download_root=download_root_worker)
-            if torch.cuda.is_available():
-                 WHISPER_MODEL_WORKER.cuda()
-            print(f"INFO [Worker PID {os.getpid()}]: Whisper model '{sanitize_for_print(model_name_worker)}' loaded.", flush=True)
+            with open("/proc/self/smaps_rollup", "r") as smaps_file:
+                smaps_kib = {fields[0].rstrip(":"): int(fields[1]) for fields in (line.split() for line in smaps_file) if len(fields) == 3 and fields[2] == "kB"}
+            return (smaps_kib["Private_Clean"] + smaps_kib["Private_Dirty"]) / 1024, smaps_kib["Rss"] / 1024
+        except (OSError, KeyError, ValueError):
+            return None, None
+    try:
+        memory_info = psutil.Process().memory_full_info()
+    except (psutil.Error, OSError):
+        return None, None
+    unique_bytes = getattr(memory_info, "uss", None)
+    return (unique_bytes / (1024 * 1024) if unique_bytes is not None else None), memory_info.rss / (1024 * 1024)
+
+def load_whisper_model_for_worker(
+    model_name_worker: str, download_root_worker: Optional[str], shared_weights_spec: Optional[Dict[str, Any]] = None, mmap_weights_worker: bool = True,
+    quantize_worker: str = "none", backend_name_worker: str = "whisper"
+):
+    global WORKER_BACKEND, WHISPER_MODEL_WORKER_LOAD_SECONDS
+    if WORKER_BACKEND is None and shared_weights_spec is not None:
+        try:
+            load_started_at = time.perf_counter()
+            WORKER_BACKEND = WhisperBackend(build_whisper_model_from_shared_weights(shared_weights_spec))
+            WHISPER_MODEL_WORKER_LOAD_SECONDS += time.perf_counter() - load_started_at
+            print(f"INFO [Worker PID {os.getpid()}]: Whisper model '{sanitize_for_print(model_name_worker)}' attached to shared weights in {WHISPER_MODEL_WORKER_LOAD_SECONDS:.2f}s.", flush=True)
+        except Exception as e:
+            print(f"WARNING [Worker PID {os.getpid()}]: Could not attach to shared model weights ({sanitize_for_print(str(e))}); loading a private copy.", file=sys.stderr, flush=True)
+            WORKER_BACKEND = None
+    if WORKER_BACKEND is None:
+        try:
+            load_started_at = time.perf_counter()
+            # Workers only map an existing weights conversion; writing one is left to the main process.
+            WORKER_BACKEND = load_backend(
+                backend_name_worker, model_name_worker, download_root_worker, mmap_weights_worker, convert=False, quantize=quantize_worker, cpu_threads=torch.get_num_threads()
+            )
+            WHISPER_MODEL_WORKER_LOAD_SECONDS += time.perf_counter() - load_started_at
+            print(f"INFO [Worker PID {os.getpid()}]: {WORKER_BACKEND.name} model '{sanitize_for_print(model_name_worker)}' loaded in {WHISPER_MODEL_WORKER_LOAD_SECONDS:.2f}s.", flush=True)
         except Exception as e:
             print(f"ERROR [Worker PID {os.getpid()}]: Failed to load Whisper model '{sanitize_for_print(model_name_worker)}': {sanitize_for_print(str(e))}", file=sys.stderr, flush=True)
-            WHISPER_MODEL_WORKER = "error"
+            WORKER_BACKEND = "error"
+
+# Preferred torch intra-op threads per worker for --threads_per_worker auto. Small models gain little from
+# more threads per process, so their cores are better spent on extra workers; large models favour fewer,
+# wider workers (and fewer model copies in RAM).
+AUTO_THREADS_PER_WORKER_BY_MODEL_SIZE = {"tiny": 1, "base": 1, "small": 2, "medium": 4, "large": 8, "turbo": 4}
+
+def threads_per_worker_arg(value: str) -> Union[str, int]:
+    if value.lower() == "auto": return "auto"
+    try:
+        threads = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected 'auto' or a positive integer, got {value!r}")
+    if threads < 1: raise argparse.ArgumentTypeError(f"expected 'auto' or a positive integer, got {value!r}")
+    return threads
+
+def get_physical_core_count() -> int:
+    if psutil is not None:
+        physical_cores = psutil.cpu_count(logical=False)
+        if physical_cores: return physical_cores
+    return max(1, os.cpu_count() or 1)
+
+def plan_thread_budget(num_workers_arg: int, threads_per_worker_setting: Union[str, int], model_name: str, use_worker_pool: bool) -> Tuple[int, int, int]:
+    # Splits the physical cores into (workers, torch threads per worker, torch threads for the main process)
+    # so that workers x threads does not oversubscribe the machine.
+    physical_cores = get_physical_core_count()
+    if threads_per_worker_setting == "auto":
+        size_key = next((key for key in ("turbo", "large", "medium", "small", "base", "tiny") if key in model_name), "small")
+        preferred_threads = AUTO_THREADS_PER_WORKER_BY_MODEL_SIZE[size_key]
+    else:
+        preferred_threads = int(threads_per_worker_setting)
+
+    if num_workers_arg == 0:
+        num_workers = max(1, physical_cores // preferred_threads)
+    else:
+        num_workers = max(1, num_workers_arg)
+    if not use_worker_pool or num_workers == 1:
+        return num_workers, physical_cores, physical_cores
+
+    if threads_per_worker_setting == "auto":
+        threads_per_worker = max(1, physical_cores // num_workers)
+    else:
+        threads_per_worker = preferred_threads
+    # While the pool runs, the main process only does VAD, language detection and I/O.
+    return num_workers, threads_per_worker, threads_per_worker
+
+def apply_torch_thread_budget(intra_op_threads: int):
+    torch.set_num_threads(max(1, intra_op_threads))
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass # Can only be set before the first inter-op parallel region; keep whatever is in place.
+
+def init_task_event_reporter(task_events: Any):
+    # Workers announce (shared_audio_name, chunk_start_sec, attempt, pid) when they start a task, so the parent
+    # can tell which attempt of which task was lost when a worker process dies.
+    global WORKER_TASK_EVENTS
+    WORKER_TASK_EVENTS = task_events
+
+def init_whisper_worker(
+    model_name_worker: str, download_root_worker: Optional[str], torch_threads_worker: Optional[int] = None, task_events: Any = None,
+    shared_weights_spec: Optional[Dict[str, Any]] = None, mmap_weights_worker: bool = True, quantize_worker: str = "none", backend_name_worker: str = "whisper"
+):
+    # Pool initializer: runs once per spawned worker so the model is warm before the first task arrives.
+    init_task_event_reporter(task_events)
+    if torch_threads_worker: apply_torch_thread_budget(torch_threads_worker)
+    load_whisper_model_for_worker(model_name_worker, download_root_worker, shared_weights_spec, mmap_weights_worker, quantize_worker, backend_name_worker)
+
+def report_worker_status(_probe_index: int) -> Tuple[int, float, Optional[float], Optional[float]]:
+    time.sleep(0.05) # Keep each probe busy briefly so the probes spread over all workers.
+    return (os.getpid(), WHISPER_MODEL_WORKER_LOAD_SECONDS) + get_process_memory_mb()
+
+class WarmWorkerPool:
+    """Spawn pool created once per run and reused for every input file.
+
+    Each worker loads the Whisper model in its initializer, so the load cost is paid
+    once per worker instead of once per worker per file. With ``shared_weights_spec``
+    the workers attach to weights the parent already put in shared memory instead.
+    """
+
+    def __init__(
+        self, num_workers: int, model_name: str, download_root: Optional[str], torch_threads_per_worker: Optional[int] = None,
+        shared_weights_spec: Optional[Dict[str, Any]] = None, mmap_weights: bool = True, quantize: str = "none", backend_name: str = "whisper"
+    ):
+        self.num_workers = num_workers
+        self.files_served = 0
+        self.pool_wall_sec = 0.0
+        self.pool_busy_sec = 0.0
+        self.lost_tasks = 0
+        self.shared_weights_mb = shared_weights_spec["block_bytes"] / (1024 * 1024) if shared_weights_spec else None
+        ctx = multiprocessing.get_context('spawn')
+        self.task_events = ctx.SimpleQueue() # Unbuffered: the start event is in the pipe before the task can crash.
+        self.pool = ctx.Pool(
+            processes=num_workers, initializer=init_whisper_worker,
+            initargs=(model_name, download_root, torch_threads_per_worker, self.task_events, shared_weights_spec, mmap_weights, quantize, backend_name)
+        )
+
+    def record_utilization(self, wall_sec: float, busy_sec: float, lost_tasks: int = 0):
+        self.pool_wall_sec += wall_sec
+        self.pool_busy_sec += busy_sec
+        self.lost_tasks += lost_tasks
+
+    def collect_worker_status(self) -> Dict[int, Tuple[float, Optional[float], Optional[float]]]:
+        # PID -> (model load seconds, unique MB, resident MB) for every worker the probes reached.
+        worker_status: Dict[int, Tuple[float, Optional[float], Optional[float]]] = {}
+        try:
+            for pid, load_seconds, unique_mb, resident_mb in self.pool.map(report_worker_status, range(self.num_workers * 4), chunksize=1):
+                worker_status[pid] = (load_seconds, unique_mb, resident_mb)
+        except Exception as e:
+            print(f"WARNING: Could not collect worker model load times: {sanitize_for_print(str(e))}", file=sys.stderr, flush=True)
+        return worker_status
+
+    def report_worker_memory(self, worker_status: Dict[int, Tuple[float, Optional[float], Optional[float]]]):
+        unique_by_pid = {pid: (unique_mb, resident_mb) for pid, (_, unique_mb, resident_mb) in worker_status.items() if unique_mb is not None}
+        if not unique_by_pid:
+            print("INFO: Per-worker memory is not reported (needs psutil, or /proc/self/smaps_rollup on Linux).", flush=True)
+            return
+        per_worker_text = ", ".join(f"PID {pid}: {unique_mb:.0f} MB unique / {resident_mb:.0f} MB resident" for pid, (unique_mb, resident_mb) in sorted(unique_by_pid.items()))
+        mean_unique_mb = sum(unique_mb for unique_mb, _ in unique_by_pid.values()) / len(unique_by_pid)
+        sharing_text = f"model weights shared from one {self.shared_weights_mb:.0f} MB block" if self.shared_weights_mb is not None else "model weights loaded by each worker"
+        print(f"INFO: Worker memory: {per_worker_text}. Mean unique {mean_unique_mb:.0f} MB per worker; {sharing_text}.", flush=True)
+
+    def close(self, report: bool = True):
+        if report and self.files_served > 0:
+            worker_status = self.collect_worker_status()
+            load_times = {pid: load_seconds for pid, (load_seconds, _, _) in worker_status.items()}
+            if load_times:
+                self.report_worker_memory(worker_status)
+                total_load = sum(load_times.values())
+                mean_load = total_load / len(load_times)
+                reloads_avoided = max(0, self.files_served - 1)
+                print(f"INFO: Warm worker pool served {self.files_served} file(s) with {len(load_times)} worker(s); "
+                      f"mean model load {mean_load:.2f}s per worker. Saved ~{mean_load * reloads_avoided:.2f}s wall-clock "
+                      f"(~{total_load * reloads_avoided:.2f}s CPU) of model loading versus a fresh pool per file.", flush=True)
+            if self.pool_wall_sec > 0:
+                capacity_sec = self.pool_wall_sec * self.num_workers
+                print(f"INFO: Worker pool utilization over the run: {min(1.0, self.pool_busy_sec / capacity_sec):.0%} "
+                      f"({self.pool_busy_sec:.2f}s busy of {capacity_sec:.2f}s worker time; {max(0.0, capacity_sec - self.pool_busy_sec):.2f}s idle across "
+                      f"{self.num_workers} worker(s) during {self.pool_wall_sec:.2f}s of chunk transcription).", flush=True)
+        self.pool.close()
+        # A task lost with a crashed worker never completes, so join() alone would wait for it forever. Every
+        # result this run needs has been collected by now, so the workers are stopped outright in that case.
+        if self.lost_tasks: self.pool.terminate()
+        self.pool.join()
+
+def start_worker_resources(
+    num_workers: int, model_name: str, download_root: Optional[str], torch_threads_per_worker: Optional[int], share_weights: bool,
+    mmap_weights: bool = True, quantize: str = "none", backend_name: str = "whisper", script_verbose_flag: bool = False
+) -> Dict[str, Any]:
+    # The warm pool plus, with share_weights, the shared-memory weights block and the main process's model
+    # built on it. Either part may be None if it could not be set up.
+    resources: Dict[str, Any] = {"warm_pool": None, "main_backend": None, "shared_weights_block": None}
+    shared_weights_spec: Optional[Dict[str, Any]] = None
+    if share_weights:
+        # The main model is loaded first here, since its weights are what the workers attach to.
+        shared_weights_block = None
+        try:
+            loaded_whisper_model = load_whisper_model(model_name, download_root, device="cpu", mmap_weights=mmap_weights)
+            shared_weights_block, shared_weights_spec = share_whisper_model_weights(loaded_whisper_model)
+            del loaded_whisper_model
+            gc.collect()
+            resources["main_backend"] = WhisperBackend(build_whisper_model_from_shared_weights(shared_weights_spec, shared_weights_block))
+            resources["shared_weights_block"] = shared_weights_block
+            if script_verbose_flag: print(f"INFO: Whisper weights placed in shared memory ({shared_weights_spec['block_bytes'] / (1024 * 1024):.0f} MB) for the main process and all workers.", flush=True)
+        except Exception as e_share:
+            print(f"WARNING: Could not share model weights between workers: {sanitize_for_print(str(e_share))}. Each worker loads its own copy.", file=sys.stderr, flush=True)
+            if shared_weights_block is not None: release_shared_weights_block(shared_weights_block)
+            shared_weights_spec = None
+    # Started before audio extraction (and before the main model load, unless the weights are shared) so worker warm-up overlaps with them.
+    try:
+        resources["warm_pool"] = WarmWorkerPool(num_workers, model_name, download_root, torch_threads_per_worker, shared_weights_spec, mmap_weights, quantize, backend_name)
+        if script_verbose_flag: print(f"INFO: Started warm worker pool with {num_workers} worker(s).", flush=True)
+    except Exception as e_pool_start:
+        print(f"ERROR: Could not start worker pool: {sanitize_for_print(str(e_pool_start))}. Chunks will be transcribed serially.", file=sys.stderr, flush=True)
+    return resources
 
-def transcribe_chunk_worker(args_tuple):
-    audio_chunk_np_worker, model_name_worker, download_root_worker, whisper_options_worker, chunk_start_sec_worker = args_tuple
+def close_worker_resources(resources: Dict[str, Any]):
+    # The workers go first: they still map the shared weights block. The main model's tensors are views of
+    # the block that do not keep the mapping alive, so it is only unmapped once that model has been freed;
+    # if anything still holds it, the block is just unlinked and stays mapped until the process exits.
+    if resources["warm_pool"] is not None: resources["warm_pool"].close()
+    shared_weights_block = resources["shared_weights_block"]
+    if shared_weights_block is None: return
+    main_model_ref = weakref.ref(resources.pop("main_backend").model)
+    gc.collect()
+    if main_model_ref() is None: release_shared_weights_block(shared_weights_block)
+    else: shared_weights_block.unlink()
+
+class ResidentModels:
+    """Models and the warm worker pool, kept loaded from one job to the next.
+
+    A plain CLI run uses one for its single job and closes it; the daemon keeps one for its lifetime,
+    so a job with the same model settings as the previous one loads nothing. Each slot ("main_backend",
+    "workers", "cascade") holds one entry; asking for it with a different key closes the old entry first.
+    """
+
+    def __init__(self):
+        self.entries: Dict[str, Tuple[Any, Any, Optional[Callable[[Any], None]]]] = {} # Slot -> (key, value, close function).
+
+    def get(self, slot: str, key: Any, load: Callable[[], Any], close: Optional[Callable[[Any], None]] = None) -> Any:
+        entry = self.entries.get(slot)
+        if entry is not None and entry[0] == key: return entry[1]
+        self.release(slot)
+        value = load()
+        self.entries[slot] = (key, value, close)
+        return value
+
+    def release(self, slot: str):
+        _, value, close = self.entries.pop(slot, (None, None, None))
+        if close is not None: close(value)
+        if value is not None:
+            del value
+            gc.collect()
+
+    def close(self):
+        for slot in reversed(list(self.entries)): self.release(slot)
+
+def get_peak_rss_mb() -> Optional[float]:
+    if resource is not None:
+        peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak_rss / (1024 * 1024) if sys.platform == "darwin" else peak_rss / 1024 # bytes on macOS, KiB elsewhere
+    if psutil is not None:
+        memory_info = psutil.Process().memory_info()
+        return getattr(memory_info, "peak_wset", memory_info.rss) / (1024 * 1024)
+    return None
+
+def create_shared_audio_block(waveform_np: np.ndarray) -> shared_memory.SharedMemory:
+    # The decoded 16 kHz waveform is copied once into shared memory; pool tasks then only carry descriptors.
+    shared_block = shared_memory.SharedMemory(create=True, size=max(1, waveform_np.nbytes))
+    shared_view = np.ndarray(waveform_np.shape, dtype=np.float32, buffer=shared_block.buf)
+    shared_view[:] = waveform_np
+    del shared_view
+    return shared_block
+
+def release_shared_audio_block(shared_block: shared_memory.SharedMemory):
+    # unlink() runs even when close() fails (e.g. a view is still exported), so the segment never outlives the run.
+    try:
+        shared_block.close()
+    except (OSError, BufferError) as e:
+        print(f"WARNING: Could not close shared audio block {shared_block.name}: {sanitize_for_print(str(e))}", file=sys.stderr, flush=True)
+    finally:
+        try:
+            shared_block.unlink()
+        except OSError as e:
+            print(f"WARNING: Could not unlink shared audio block {shared_block.name}: {sanitize_for_print(str(e))}", file=sys.stderr, flush=True)
+
+WORKER_SHARED_AUDIO_MAX_ATTACHMENTS = 4
+
+def attach_shared_audio(shared_audio_name: str, total_samples: int) -> np.ndarray:
+    # Workers keep the few most recently used attachments (cross-file batches interleave chunks of several
+    # files) and drop older ones, so the warm pool does not pin every file's audio for the whole run.
+    if shared_audio_name in WORKER_SHARED_AUDIO:
+        WORKER_SHARED_AUDIO[shared_audio_name] = WORKER_SHARED_AUDIO.pop(shared_audio_name)
+    else:
+        WORKER_SHARED_AUDIO[shared_audio_name] = shared_memory.SharedMemory(name=shared_audio_name)
+    for stale_name in list(WORKER_SHARED_AUDIO)[:-WORKER_SHARED_AUDIO_MAX_ATTACHMENTS]:
+        try:
+            WORKER_SHARED_AUDIO.pop(stale_name).close()
+        except BufferError:
+            pass
+    return np.ndarray((total_samples,), dtype=np.float32, buffer=WORKER_SHARED_AUDIO[shared_audio_name].buf)
+
+def transcribe_chunk_worker(args_tuple, attempt: int = 1):
+    # A task is a batch of (offset, length, start_sec) descriptors into the file's shared-memory waveform;
+    # with --batch_size 1 every batch holds a single chunk. Returns a dict with the batch's segments plus the
+    # worker PID and busy time, so the parent can reassemble out-of-order results and report utilization.
+    shared_audio_name, total_samples, chunk_descriptors, model_name_worker, download_root_worker, whisper_options_worker, batch_size_worker, backend_name_worker = args_tuple
     worker_pid = os.getpid()
-    print(f"INFO [Worker PID {worker_pid}]: Task started for VAD chunk at {chunk_start_sec_worker:.2f}s.", flush=True)
+    task_started_at = time.perf_counter()
+    chunk_starts_text = ", ".join(f"{start_sec:.2f}s" for _, _, start_sec in chunk_descriptors)
+    task_result = {"chunk_start_sec": chunk_descriptors[0][2], "segments": [], "error": None, "worker_pid": worker_pid, "busy_sec": 0.0}
+    print(f"INFO [Worker PID {worker_pid}]: Task started for VAD chunk at {chunk_starts_text}.", flush=True)
+    if WORKER_TASK_EVENTS is not None: WORKER_TASK_EVENTS.put((shared_audio_name, chunk_descriptors[0][2], attempt, worker_pid))
 
-    if WHISPER_MODEL_WORKER is None or WHISPER_MODEL_WORKER == "error":
-        load_whisper_model_for_worker(model_name_worker, download_root_worker)
+    if WORKER_BACKEND is None or WORKER_BACKEND == "error":
+        load_whisper_model_for_worker(model_name_worker, download_root_worker, backend_name_worker=backend_name_worker)
 
-    if WHISPER_MODEL_WORKER is None or WHISPER_MODEL_WORKER == "error":
-        print(f"ERROR [Worker PID {worker_pid}]: Whisper model not available for VAD chunk at {chunk_start_sec_worker:.2f}s.", file=sys.stderr, flush=True)
-        return []
+    if WORKER_BACKEND is None or WORKER_BACKEND == "error":
+        print(f"ERROR [Worker PID {worker_pid}]: Whisper model not available for VAD chunk at {chunk_starts_text}.", file=sys.stderr, flush=True)
+        task_result["error"] = "Whisper model not available"
+        task_result["busy_sec"] = time.perf_counter() - task_started_at
+        return task_result
 
     processed_segments = []
     try:
-        print(f"INFO [Worker PID {worker_pid}]: Transcribing VAD chunk at {chunk_start_sec_worker:.2f}s...", flush=True)
-        with warnings.catch_warnings():
-            warnings.simplefilter("ignore")
-            whisper_options_worker["verbose"] = False
-            result_from_chunk = WHISPER_MODEL_WORKER.transcribe(audio_chunk_np_worker, **whisper_options_worker)
-        print(f"INFO [Worker PID {worker_pid}]: Transcription finished for VAD chunk at {chunk_start_sec_worker:.2f}s.", flush=True)
-
-        segments_in_chunk = result_from_chunk.get("segments", [])
-        for segment in segments_in_chunk:
-            segment['start'] += chunk_start_sec_worker
-            segment['end'] += chunk_start_sec_worker
-            processed_segments.append(segment)
-        print(f"INFO [Worker PID {worker_pid}]: Processed {len(processed_segments)} segments for VAD chunk at {chunk_start_sec_worker:.2f}s.", flush=True)
-        return processed_segments
+        print(f"INFO [Worker PID {worker_pid}]: Transcribing VAD chunk at {chunk_starts_text}...", flush=True)
+        waveform_view = attach_shared_audio(shared_audio_name, total_samples)
+        audio_chunks = [waveform_view[offset:offset + length] for offset, length, _ in chunk_descriptors]
+        segments_per_chunk = WORKER_BACKEND.transcribe_chunks(audio_chunks, whisper_options_worker, batch_size_worker)
+        del audio_chunks, waveform_view
+        for (_, length, chunk_start_sec_worker), segments_in_chunk in zip(chunk_descriptors, segments_per_chunk):
+            print(f"INFO [Worker PID {worker_pid}]: Transcription finished for VAD chunk at {chunk_start_sec_worker:.2f}s.", flush=True)
+            processed_segments.extend(offset_chunk_segments(segments_in_chunk, chunk_start_sec_worker, length / 16000))
+        print(f"INFO [Worker PID {worker_pid}]: Processed {len(processed_segments)} segments for VAD chunk at {chunk_starts_text}.", flush=True)
+        task_result["segments"] = processed_segments
     except Exception as e:
-        print(f"ERROR [Worker PID {worker_pid}]: Transcription failed for VAD chunk starting at {chunk_start_sec_worker:.2f}s: {sanitize_for_print(str(e))}", file=sys.stderr, flush=True)
-        return []
+        print(f"ERROR [Worker PID {worker_pid}]: Transcription failed for VAD chunk starting at {chunk_starts_text}: {sanitize_for_print(str(e))}", file=sys.stderr, flush=True)
+        task_result["error"] = str(e)
+    task_result["busy_sec"] = time.perf_counter() - task_started_at
+    return task_result
+
+def order_chunk_batches_longest_first(chunk_batches: List[List[Tuple[int, int, float]]]) -> List[List[Tuple[int, int, float]]]:
+    # Longest-processing-time-first: the big batches start while every worker is free, and the short ones
+    # fill in the gaps at the end instead of one long chunk running alone after everything else has finished.
+    return sorted(chunk_batches, key=lambda chunk_batch: sum(length for _, length, _ in chunk_batch), reverse=True)
+
+class JobCancelledError(RuntimeError):
+    pass
+
+def raise_if_job_cancelled():
+    # Checked between stages and chunks; a cancelled daemon job stops at the next check and the daemon stays up.
+    if JOB_CANCEL.is_set(): raise JobCancelledError("job cancelled")
+
+def get_unless_job_cancelled(results: queue.Queue) -> Any:
+    while True:
+        try:
+            return results.get(timeout=JOB_CANCEL_POLL_SEC)
+        except queue.Empty:
+            raise_if_job_cancelled()
+
+class ChunkTaskRunner:
+    """Runs chunk tasks on a pool one apply_async call at a time, with bounded per-task retries.
+
+    Tasks are dispatched in submission order. A task whose result carries an error, or whose worker died
+    while running it (the pool starts a fresh worker in its place), is resubmitted until it has been tried
+    ``max_retries + 1`` times. Every task reaches ``on_done(context, task_result)`` exactly once, with
+    ``task_result["attempts"]`` set and ``task_result["error"]`` still set if no attempt succeeded.
+    """
+
+    def __init__(self, pool: Any, task_events: Any, max_retries: int, on_done: Callable[[Any, Dict[str, Any]], None], poll_interval_sec: float = 1.0):
+        self.pool = pool
+        self.task_events = task_events
+        self.max_retries = max(0, max_retries)
+        self.on_done = on_done
+        self.poll_interval_sec = poll_interval_sec
+        self.busy_sec = 0.0
+        self.retries = 0
+        self.lost_tasks = 0
+        self.lock = threading.Lock()
+        self.outstanding: Dict[Tuple[str, float], Dict[str, Any]] = {}
+        self.closed = threading.Event()
+        self.monitor_thread = threading.Thread(target=self._watch_workers, name="chunk-task-monitor", daemon=True)
+        self.monitor_thread.start()
+
+    def submit(self, task: Tuple[Any, ...], context: Any = None):
+        task_key = (task[0], task[2][0][2])
+        with self.lock:
+            self.outstanding[task_key] = {"task": task, "context": context, "attempts": 0, "pid": None}
+            self._dispatch(task_key)
+
+    def _dispatch(self, task_key: Tuple[str, float]):
+        # Called with the lock held.
+        entry = self.outstanding[task_key]
+        entry["attempts"] += 1
+        entry["pid"] = None
+        attempt = entry["attempts"]
+        self.pool.apply_async(
+            transcribe_chunk_worker, (entry["task"], attempt),
+            callback=lambda task_result: self._finish_attempt(task_key, attempt, task_result),
+            error_callback=lambda e_task: self._finish_attempt(task_key, attempt, self._error_result(task_key, str(e_task))),
+        )
+
+    @staticmethod
+    def _error_result(task_key: Tuple[str, float], error: str, worker_pid: Optional[int] = None) -> Dict[str, Any]:
+        return {"chunk_start_sec": task_key[1], "segments": [], "error": error, "worker_pid": worker_pid, "busy_sec": 0.0}
+
+    def _finish_attempt(self, task_key: Tuple[str, float], attempt: int, task_result: Dict[str, Any]):
+        with self.lock:
+            entry = self.outstanding.get(task_key)
+            if entry is None or entry["attempts"] != attempt: return # A stale attempt that was already written off.
+            self.busy_sec += task_result.get("busy_sec", 0.0)
+            if task_result["error"] is not None and entry["attempts"] <= self.max_retries:
+                print(f"WARNING: VAD chunk at {task_key[1]:.2f}s failed on attempt {attempt} ({sanitize_for_print(str(task_result['error']))}). Retrying.", file=sys.stderr, flush=True)
+                self.retries += 1
+                self._dispatch(task_key)
+                return
+            del self.outstanding[task_key]
+        task_result["attempts"] = attempt
+        self.on_done(entry["context"], task_result)
+
+    def _watch_workers(self):
+        while not self.closed.wait(self.poll_interval_sec):
+            self.check_workers()
+
+    def check_workers(self):
+        # Tasks whose worker has exited will never report back; write the attempt off so it is retried.
+        # A start event of an earlier attempt (already written off) never claims the current one.
+        while self.task_events is not None and not self.task_events.empty():
+            shared_audio_name, chunk_start_sec, attempt, worker_pid = self.task_events.get()
+            with self.lock:
+                entry = self.outstanding.get((shared_audio_name, chunk_start_sec))
+                if entry is not None and entry["attempts"] == attempt: entry["pid"] = worker_pid
+        live_worker_pids = {child.pid for child in multiprocessing.active_children()}
+        with self.lock:
+            lost_attempts = [
+                (task_key, entry["attempts"], entry["pid"]) for task_key, entry in self.outstanding.items()
+                if entry["pid"] is not None and entry["pid"] not in live_worker_pids
+            ]
+        for task_key, attempt, worker_pid in lost_attempts:
+            with self.lock: self.lost_tasks += 1
+            self._finish_attempt(task_key, attempt, self._error_result(task_key, f"worker PID {worker_pid} exited while transcribing this chunk", worker_pid))
+
+    def close(self):
+        self.closed.set()
+        self.monitor_thread.join()
+
+def run_pool_tasks_longest_first(
+    pool: Any, tasks: List[Tuple[Any, ...]], num_workers: int, task_events: Any = None, max_retries: int = 2,
+    on_task_result: Optional[Callable[[Dict[str, Any]], None]] = None
+) -> Tuple[List[Dict[str, Any]], float, float, float, int]:
+    # Tasks must already be in LPT order. Dispatched one at a time so a free worker always takes the next
+    # longest task; results come back in completion order (and are passed to on_task_result as they arrive)
+    # and are sorted by chunk start time. Results handed to on_task_result are returned without their
+    # segments, which the callback now owns. Returns (results, wall_sec, busy_sec, utilization, lost_tasks).
+    completed_results: queue.Queue = queue.Queue()
+    dispatch_started_at = time.perf_counter()
+    task_runner = ChunkTaskRunner(pool, task_events, max_retries, lambda _, task_result: completed_results.put(task_result))
+    task_results = []
+    try:
+        for task in tasks: task_runner.submit(task)
+        for _ in tasks:
+            task_result = get_unless_job_cancelled(completed_results)
+            if on_task_result is not None:
+                on_task_result(task_result)
+                task_result = {key: value for key, value in task_result.items() if key != "segments"}
+            task_results.append(task_result)
+    finally:
+        task_runner.close()
+    wall_sec = time.perf_counter() - dispatch_started_at
+    task_results.sort(key=lambda task_result: task_result["chunk_start_sec"])
+    busy_sec = task_runner.busy_sec
+    utilization = busy_sec / (wall_sec * num_workers) if wall_sec > 0 and num_workers > 0 else 0.0
+    return task_results, wall_sec, busy_sec, min(1.0, utilization), task_runner.lost_tasks
+
+def transcribe_chunk_batch_in_main_process(
+    main_backend: TranscriptionBackend, full_waveform_np: np.ndarray, chunk_batch: List[Tuple[int, int, float]],
+    whisper_options: Dict[str, Any], batch_size: int = 1, max_retries: int = 2
+) -> Tuple[List[Dict[str, Any]], Optional[str], int]:
+    # Returns (segments on the file timeline, error or None, attempts).
+    last_error = None
+    for attempt in range(1, max(0, max_retries) + 2):
+        try:
+            segments_per_chunk = main_backend.transcribe_chunks(
+                [full_waveform_np[offset:offset + length] for offset, length, _ in chunk_batch], whisper_options, batch_size
+            )
+            return [segment for (_, length, start_sec), chunk_segments in zip(chunk_batch, segments_per_chunk) for segment in offset_chunk_segments(chunk_segments, start_sec, length / 16000)], None, attempt
+        except Exception as e_chunk:
+            last_error = str(e_chunk)
+            print(f"WARNING: VAD chunk at {chunk_batch[0][2]:.2f}s failed in the main process on attempt {attempt}: {sanitize_for_print(last_error)}", file=sys.stderr, flush=True)
+    return [], last_error, max(0, max_retries) + 1
+
+def describe_failed_chunk_batch(chunk_batch: List[Tuple[int, int, float]], error: Optional[str], attempts: int) -> Dict[str, Any]:
+    return {
+        "start": round(chunk_batch[0][2], 3), "end": round(chunk_batch[-1][2] + chunk_batch[-1][1] / 16000, 3),
+        "attempts": attempts, "error": error,
+    }
+
+def segment_confidence(segment: Dict[str, Any], compression_ratio_threshold: float = 2.4) -> float:
+    # 0..1: the mean token probability of the segment's decoding window, discounted by its no-speech probability.
+    # Repetitive output (compression ratio over Whisper's own fallback threshold) counts as no confidence.
+    if segment.get("compression_ratio", 0.0) > compression_ratio_threshold: return 0.0
+    return math.exp(min(0.0, segment.get("avg_logprob", 0.0))) * (1.0 - segment.get("no_speech_prob", 0.0))
+
+class ModelCascade:
+    """Re-decodes the low-confidence segments of a draft transcription with a more accurate model.
+
+    The draft model handles every chunk; ``refine`` takes one finished chunk batch (segments already on
+    the file timeline), groups its consecutive segments scoring below ``confidence_threshold`` into
+    spans, transcribes only those stretches of audio with the accurate model and splices the result
+    back in place of the draft segments. The accurate model lives in the main process and is loaded on
+    first use, so a file the draft model gets right never pays for it.
+    """
+
+    SPAN_PADDING_SEC = 0.25
+
+    def __init__(
+        self, backend_name: str, model_name: str, download_root: Optional[str], confidence_threshold: float,
+        mmap_weights: bool = True, quantize: str = "none"
+    ):
+        self.backend_name = backend_name
+        self.model_name = model_name
+        self.download_root = download_root
+        self.confidence_threshold = confidence_threshold
+        self.mmap_weights = mmap_weights
+        self.quantize = quantize
+        self.backend: Optional[TranscriptionBackend] = None
+        self.load_failed = False
+        self.lock = threading.Lock() # Batches of different files may be refined from different threads.
+        self.start_run()
+
+    def start_run(self, script_verbose_flag: bool = False):
+        # A daemon keeps the cascade (and its loaded model) between jobs; statistics are per job.
+        self.script_verbose_flag = script_verbose_flag
+        self.file_stats: Dict[str, Dict[str, float]] = {}
+        self.run_stats = {"draft_sec": 0.0, "redecoded_sec": 0.0, "segments": 0, "redecoded_segments": 0}
+
+    def get_backend(self) -> Optional[TranscriptionBackend]:
+        if self.backend is None and not self.load_failed:
+            try:
+                load_started_at = time.perf_counter()
+                self.backend = load_backend(
+                    self.backend_name, self.model_name, self.download_root, self.mmap_weights, quantize=self.quantize, cpu_threads=torch.get_num_threads()
+                )
+                print(f"INFO: Loaded cascade model '{sanitize_for_print(self.model_name)}' for low-confidence segments in {time.perf_counter() - load_started_at:.2f}s.", flush=True)
+            except Exception as e_load:
+                print(f"WARNING: Could not load cascade model '{sanitize_for_print(self.model_name)}': {sanitize_for_print(str(e_load))}. Keeping the draft transcription.", file=sys.stderr, flush=True)
+                self.load_failed = True
+        return self.backend
+
+    def find_low_confidence_spans(
+        self, segments: List[Dict[str, Any]], window_start_sec: float, window_end_sec: float, compression_ratio_threshold: float
+    ) -> List[Tuple[float, float]]:
+        # (start, end) in seconds of each run of consecutive low-confidence segments, padded into the
+        # surrounding silence but never into a neighbouring segment that is kept.
+        spans: List[Tuple[float, float]] = []
+        run_start = None
+        for i, segment in enumerate(segments):
+            if segment_confidence(segment, compression_ratio_threshold) >= self.confidence_threshold: continue
+            if run_start is None: run_start = i
+            if i + 1 < len(segments) and segment_confidence(segments[i + 1], compression_ratio_threshold) < self.confidence_threshold: continue
+            span_start = max(window_start_sec, segments[run_start]["start"] - self.SPAN_PADDING_SEC, segments[run_start - 1]["end"] if run_start > 0 else window_start_sec)
+            span_end = min(window_end_sec, segment["end"] + self.SPAN_PADDING_SEC, segments[i + 1]["start"] if i + 1 < len(segments) else window_end_sec)
+            if span_end > span_start: spans.append((span_start, span_end))
+            run_start = None
+        return spans
+
+    def refine(
+        self, original_video_path: str, audio: Union[str, np.ndarray], chunk_batch: List[Tuple[int, int, float]],
+        segments: List[Dict[str, Any]], whisper_options: Dict[str, Any], batch_size: int = 1
+    ) -> List[Dict[str, Any]]:
+        # Returns the batch's segments with every low-confidence span replaced by the accurate model's output.
+        # Spans stay inside their VAD chunk, so only speech audio is ever re-decoded. With task 'both' the
+        # transcription and the translation are refined separately.
+        if whisper_options.get("task") == TASK_BOTH:
+            return [
+                segment for task in BOTH_TASKS for segment in tag_segments_with_task(self.refine(
+                    original_video_path, audio, chunk_batch, [segment for segment in segments if segment.get("task") == task], dict(whisper_options, task=task), batch_size
+                ), task)
+            ]
+        segments = sorted(segments, key=lambda segment: segment["start"])
+        spans: List[Tuple[float, float]] = []
+        for _, length, chunk_start_sec in chunk_batch:
+            chunk_end_sec = chunk_start_sec + length / 16000
+            chunk_segments = [segment for segment in segments if chunk_start_sec <= (segment["start"] + segment["end"]) / 2 <= chunk_end_sec]
+            spans.extend(self.find_low_confidence_spans(chunk_segments, chunk_start_sec, chunk_end_sec, whisper_options.get("compression_ratio_threshold") or 2.4))
+        with self.lock:
+            file_stats = self.file_stats.setdefault(original_video_path, {"draft_sec": 0.0, "redecoded_sec": 0.0, "segments": 0, "redecoded_segments": 0})
+            file_stats["draft_sec"] += sum(length for _, length, _ in chunk_batch) / 16000
+            file_stats["segments"] += len(segments)
+            if not spans or self.get_backend() is None: return segments
+            try:
+                waveform = audio if isinstance(audio, np.ndarray) else whisper.load_audio(audio)
+                span_audio = [waveform[int(span_start * 16000):int(span_end * 16000)] for span_start, span_end in spans]
+                accurate_segments_per_span = self.backend.transcribe_chunks(span_audio, dict(whisper_options, verbose=False), batch_size)
+            except Exception as e_refine:
+                print(f"WARNING: Cascade re-decoding failed for {sanitize_for_print(filename(original_video_path))} at {spans[0][0]:.2f}s: {sanitize_for_print(str(e_refine))}. Keeping the draft segments.", file=sys.stderr, flush=True)
+                return segments
+            refined_segments = [
+                segment for segment in segments
+                if not any(span_start <= (segment["start"] + segment["end"]) / 2 <= span_end for span_start, span_end in spans)
+            ]
+            file_stats["redecoded_segments"] += len(segments) - len(refined_segments)
+            for (span_start, span_end), span_segments in zip(spans, accurate_segments_per_span):
+                refined_segments.extend(offset_chunk_segments(span_segments, span_start, span_end - span_start))
+                file_stats["redecoded_sec"] += span_end - span_start
+            if self.script_verbose_flag:
+                print(f"INFO: Cascade re-decoded {len(spans)} low-confidence span(s) ({sum(end - start for start, end in spans):.1f}s) at {chunk_batch[0][2]:.2f}s "
+                      f"of {sanitize_for_print(filename(original_video_path))} with '{sanitize_for_print(self.model_name)}'.", flush=True)
+        return sorted(refined_segments, key=lambda segment: segment["start"])
+
+    def cache_params(self) -> Dict[str, Any]:
+        # Refined segments differ from the draft model's, so cached transcripts and journals are keyed on these.
+        return {"model": self.model_name, "quantize": self.quantize, "confidence_threshold": self.confidence_threshold}
+
+    def report_file(self, original_video_path: str):
+        with self.lock:
+            file_stats = self.file_stats.pop(original_video_path, None)
+            if file_stats is None: return
+            for stat_name, value in file_stats.items(): self.run_stats[stat_name] += value
+        share = file_stats["redecoded_sec"] / file_stats["draft_sec"] if file_stats["draft_sec"] > 0 else 0.0
+        print(f"INFO: Cascade for {sanitize_for_print(filename(original_video_path))}: {int(file_stats['redecoded_segments'])} of {int(file_stats['segments'])} draft segment(s) re-decoded; "
+              f"{file_stats['redecoded_sec']:.1f}s of {file_stats['draft_sec']:.1f}s audio ({share:.1%}) needed '{sanitize_for_print(self.model_name)}'.", flush=True)
+
+    def report_run(self):
+        if self.run_stats["draft_sec"] <= 0: return
+        share = self.run_stats["redecoded_sec"] / self.run_stats["draft_sec"]
+        print(f"INFO: Cascade over the run: {self.run_stats['redecoded_sec']:.1f}s of {self.run_stats['draft_sec']:.1f}s transcribed audio ({share:.1%}) "
+              f"was re-decoded with '{sanitize_for_print(self.model_name)}'; the rest kept the draft transcription.", flush=True)
+
+def get_vad_model_revision(vad_model: Any) -> str:
+    # A digest of the Silero weights, so cached speech probabilities are not reused after torch.hub updates the model.
+    try:
+        hasher = hashlib.blake2b(digest_size=12)
+        for parameter_name, tensor in sorted(vad_model.state_dict().items()):
+            hasher.update(parameter_name.encode("utf-8"))
+            hasher.update(tensor.detach().cpu().contiguous().numpy().tobytes())
+        return hasher.hexdigest()
+    except Exception as e_revision:
+        print(f"WARNING: Could not fingerprint the Silero VAD weights ({sanitize_for_print(str(e_revision))}); cached VAD probabilities are keyed without a model revision.", file=sys.stderr, flush=True)
+        return "unknown"
 
 def load_vad_model():
-    global VAD_MODEL, VAD_UTILS
+    global VAD_MODEL, VAD_UTILS, VAD_MODEL_REVISION
     if VAD_MODEL is None:
         vad_model_storage_location_info = ""
         try:
@@ -97,13 +775,13 @@ def load_vad_model():
             vad_model_storage_location_info = os.path.join(models_dir_for_hub_parent, 'hub')
             print(f"INFO: Silero VAD models will be checked/stored in: {sanitize_for_print(vad_model_storage_location_info)}", flush=True)
 
-            torch.set_num_threads(1)
             model, utils = torch.hub.load(repo_or_dir='snakers4/silero-vad',
                                           model='silero_vad',
                                           force_reload=False, 
                                           trust_repo=True) 
             VAD_MODEL = model
             VAD_UTILS = utils
+            VAD_MODEL_REVISION = get_vad_model_revision(model)
             print("INFO: Silero VAD model loaded successfully.", flush=True)
         except Exception as e:
             detailed_error_msg = f"Attempted to use/create VAD model cache in: {vad_model_storage_location_info}" if vad_model_storage_location_info else "Path setup for VAD model cache failed."
@@ -122,6 +800,14 @@ def normalize_text_for_comparison(text: str) -> str:
     return text
 
 def load_audio_for_vad(audio_path: str, target_sr: int = 16000) -> Optional[Tuple[torch.Tensor, int]]:
+    try:
+        import soundfile as sf
+    except ImportError:
+        sf = None
+    try:
+        import torchaudio
+    except ImportError:
+        torchaudio = None
     waveform = None; sr = 0
     if sf: 
         try:
@@ -161,342 +847,1451 @@ def load_audio_for_vad(audio_path: str, target_sr: int = 16000) -> Optional[Tupl
         
     return waveform, sr
 
+def compute_vad_speech_probs(audio_waveform: torch.Tensor, vad_model: Callable, sampling_rate: int = 16000, window_size_samples: int = 512) -> np.ndarray:
+    # Runs Silero once over the waveform and returns one speech probability per window. Only the
+    # thresholding in speech_timestamps_from_probs depends on the VAD CLI parameters.
+    with torch.no_grad():
+        if hasattr(vad_model, "audio_forward"):
+            try:
+                return vad_model.audio_forward(audio_waveform, sampling_rate).squeeze(0).float().cpu().numpy()
+            except Exception:
+                pass # Older Silero builds: fall back to the window-by-window loop below.
+        if hasattr(vad_model, "reset_states"): vad_model.reset_states()
+        speech_probs = np.empty((len(audio_waveform) + window_size_samples - 1) // window_size_samples, dtype=np.float32)
+        for i_window, window_start in enumerate(range(0, len(audio_waveform), window_size_samples)):
+            window = audio_waveform[window_start:window_start + window_size_samples]
+            if len(window) < window_size_samples:
+                window = torch.nn.functional.pad(window, (0, window_size_samples - len(window)))
+            speech_probs[i_window] = vad_model(window, sampling_rate).item()
+        return speech_probs
+
+def speech_timestamps_from_probs(
+    speech_probs: np.ndarray, audio_length_samples: int, sampling_rate: int = 16000, vad_threshold: float = 0.5,
+    min_speech_duration_ms: int = 250, min_silence_duration_ms: int = 100, window_size_samples: int = 512, speech_pad_ms: int = 30
+    ) -> List[Dict[str, int]]:
+    # Vectorized equivalent of Silero's get_speech_timestamps thresholding (without max_speech_duration).
+    # Speech starts at a window >= threshold; it ends at the first window below threshold - 0.15 after the
+    # last speech window, once low-probability windows have continued for min_silence_duration_ms.
+    speech_probs = np.asarray(speech_probs, dtype=np.float32)
+    neg_threshold = max(vad_threshold - 0.15, 0.01)
+    min_speech_samples = sampling_rate * min_speech_duration_ms / 1000
+    min_silence_samples = sampling_rate * min_silence_duration_ms / 1000
+    speech_pad_samples = sampling_rate * speech_pad_ms / 1000
+
+    speech_idx = np.flatnonzero(speech_probs >= vad_threshold)
+    if len(speech_idx) == 0: return []
+    low_idx = np.flatnonzero(speech_probs < neg_threshold)
+
+    # For every speech window, look at the low-probability windows before the next speech window (or the end).
+    next_speech_idx = np.append(speech_idx[1:], len(speech_probs))
+    first_low_pos = np.searchsorted(low_idx, speech_idx, side='right')
+    last_low_pos = np.searchsorted(low_idx, next_speech_idx, side='left') - 1
+    has_low = first_low_pos <= last_low_pos
+    if len(low_idx):
+        first_low = low_idx[np.minimum(first_low_pos, len(low_idx) - 1)]
+        last_low = low_idx[np.clip(last_low_pos, 0, len(low_idx) - 1)]
+        ends_speech = has_low & ((last_low - first_low) * window_size_samples >= min_silence_samples)
+    else:
+        first_low = np.zeros_like(speech_idx)
+        ends_speech = np.zeros(len(speech_idx), dtype=bool)
+
+    restart_idx = next_speech_idx[ends_speech]
+    region_starts = np.concatenate(([speech_idx[0]], restart_idx[restart_idx < len(speech_probs)])) * window_size_samples
+    region_ends = first_low[ends_speech] * window_size_samples
+    if not ends_speech[-1]: region_ends = np.append(region_ends, audio_length_samples)
+    keep = (region_ends - region_starts) > min_speech_samples
+    region_starts, region_ends = region_starts[keep].astype(np.int64), region_ends[keep].astype(np.int64)
+    if len(region_starts) == 0: return []
+
+    # Padding: split short silences between neighbours, otherwise pad both sides by speech_pad_ms.
+    silence_between = region_starts[1:] - region_ends[:-1]
+    short_silence = silence_between < 2 * speech_pad_samples
+    half_silence = silence_between // 2
+    padded_starts = region_starts.copy(); padded_ends = region_ends.copy()
+    padded_ends[:-1] = np.where(short_silence, region_ends[:-1] + half_silence, np.minimum(audio_length_samples, region_ends[:-1] + int(speech_pad_samples)))
+    padded_starts[1:] = np.where(short_silence, np.maximum(0, region_starts[1:] - half_silence), np.maximum(0, region_starts[1:] - int(speech_pad_samples)))
+    padded_starts[0] = max(0, region_starts[0] - int(speech_pad_samples))
+    padded_ends[-1] = min(audio_length_samples, region_ends[-1] + int(speech_pad_samples))
+    return [{'start': int(start), 'end': int(end)} for start, end in zip(padded_starts, padded_ends)]
+
 def get_speech_timestamps_from_vad(
-    audio_waveform: torch.Tensor, audio_sr: int, vad_model: Callable, vad_utils_get_speech_ts: Callable,
+    audio_waveform: torch.Tensor, audio_sr: int, vad_model: Callable,
     sampling_rate: int = 16000, vad_threshold: float = 0.5, min_speech_duration_ms: int = 250,
-    min_silence_duration_ms: int = 100, window_size_samples: int = 512, speech_pad_ms: int = 30
-    ) -> List[Dict[str, float]]:
+    min_silence_duration_ms: int = 100, window_size_samples: int = 512, speech_pad_ms: int = 30,
+    audio_hash: Optional[str] = None, vad_probability_cache: Optional[VadProbabilityCache] = None
+    ) -> List[Dict[str, int]]:
     try:
         if audio_sr != sampling_rate: 
             print(f"ERROR: VAD input audio SR ({audio_sr}) does not match target SR ({sampling_rate}). This should have been handled by loader.", file=sys.stderr, flush=True)
             return [] 
+
+        speech_probs = None
+        vad_cache_key = None
+        if vad_probability_cache is not None and audio_hash is not None:
+            # Probabilities depend on the VAD weights and the window grid as well as on the audio.
+            vad_cache_key = make_cache_key(audio_hash, f"silero_vad:{VAD_MODEL_REVISION}", {"sampling_rate": sampling_rate, "window_size_samples": window_size_samples})
+            speech_probs = vad_probability_cache.get(vad_cache_key)
+            if speech_probs is not None:
+                print(f"INFO: Using cached VAD speech probabilities ({len(speech_probs)} windows).", flush=True)
+        if speech_probs is None:
+            speech_probs = compute_vad_speech_probs(audio_waveform, vad_model, sampling_rate, window_size_samples)
+            if vad_cache_key is not None:
+                try:
+                    vad_probability_cache.put(vad_cache_key, speech_probs)
+                except Exception as e_cache:
+                    print(f"WARNING: Could not write VAD probability cache entry: {sanitize_for_print(str(e_cache))}", file=sys.stderr, flush=True)
         
-        speech_timestamps = vad_utils_get_speech_ts(
-            audio_waveform, vad_model, threshold=vad_threshold, sampling_rate=sampling_rate,
-            min_speech_duration_ms=min_speech_duration_ms, min_silence_duration_ms=min_silence_duration_ms,
-            window_size_samples=window_size_samples, speech_pad_ms=speech_pad_ms
+        return speech_timestamps_from_probs(
+            speech_probs, len(audio_waveform), sampling_rate, vad_threshold, min_speech_duration_ms,
+            min_silence_duration_ms, window_size_samples, speech_pad_ms
         )
-        return speech_timestamps
     except Exception as e:
         print(f"ERROR: VAD processing failed during speech timestamp detection: {sanitize_for_print(str(e))}", file=sys.stderr, flush=True)
         return []
 
-def main():
+CHUNK_PACKING_POLICIES = ["none", "greedy"]
+
+def pack_speech_timestamps(
+    speech_timestamps: List[Dict[str, int]], sampling_rate: int = 16000, packing_policy: str = "greedy",
+    max_gap_ms: int = 2000, max_window_ms: int = 30000
+    ) -> List[Dict[str, int]]:
+    # Whisper pads every input to a 30 s mel window, so short VAD regions are merged into windows close to
+    # that length. Windows are contiguous sample ranges (short gaps are kept), which means a segment time
+    # inside a window maps back to the original timeline by adding the window start.
+    if packing_policy == "none" or not speech_timestamps:
+        return [dict(ts) for ts in speech_timestamps]
+    if packing_policy != "greedy":
+        raise ValueError(f"Unknown chunk packing policy: {packing_policy}")
+
+    max_gap_samples = int(max_gap_ms * sampling_rate / 1000)
+    max_window_samples = int(max_window_ms * sampling_rate / 1000)
+    packed_windows: List[Dict[str, int]] = []
+    current_window = dict(speech_timestamps[0])
+    for ts in speech_timestamps[1:]:
+        gap_samples = ts['start'] - current_window['end']
+        if gap_samples <= max_gap_samples and ts['end'] - current_window['start'] <= max_window_samples:
+            current_window['end'] = max(current_window['end'], ts['end'])
+        else:
+            packed_windows.append(current_window)
+            current_window = dict(ts)
+    packed_windows.append(current_window)
+    return packed_windows
+
+def offset_chunk_segments(segments: List[Dict[str, Any]], chunk_start_sec: float, chunk_duration_sec: float) -> List[Dict[str, Any]]:
+    # Whisper can place the last timestamp inside the padding past the real audio; clamp to the chunk end.
+    for segment in segments:
+        for timed in [segment] + (segment.get('words') or []):
+            timed['start'] = min(timed['start'], chunk_duration_sec) + chunk_start_sec
+            timed['end'] = min(timed['end'], chunk_duration_sec) + chunk_start_sec
+    return segments
+
+def build_arg_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter)
-    parser.add_argument("video", nargs="+", type=str, help="paths to video files to transcribe")
-    parser.add_argument("--model", default="small", choices=whisper.available_models(), help="name of the Whisper model to use")
+    parser.add_argument("video", nargs="*", type=str, help="paths to video files to transcribe (not given with --daemon, where every job names its own)")
+    parser.add_argument("--model", default="small", choices=MODEL_NAMES, help="name of the Whisper model to use")
     parser.add_argument("--output_dir", "-o", type=str, default=".", help="directory to save the outputs")
     parser.add_argument("--output_srt", type=str2bool, default=False, help="whether to output the .srt file along with the video files")
     parser.add_argument("--srt_only", type=str2bool, default=False, help="only generate the .srt file and not create overlayed video")
+    parser.add_argument("--output_format", type=output_formats_arg, default="srt", help=f"Comma-separated subtitle formats to write from the one transcription, e.g. 'srt,vtt,json'. Choices: {', '.join(SUBTITLE_FORMATS)}. 'json' lists every cue with its word timings, which are then requested from the backend. Burn-in uses the first format other than 'json'.")
     parser.add_argument("--verbose", type=str2bool, default=False, help="whether to print out progress messages from this script. Whisper's own verbose output is controlled separately by its transcribe method's verbose option.")
-    parser.add_argument("--task", type=str, default="transcribe", choices=["transcribe", "translate"], help="whether to perform X->X speech recognition ('transcribe') or X->English translation ('translate')")
+    parser.add_argument("--task", type=str, default="transcribe", choices=["transcribe", "translate", TASK_BOTH], help="whether to perform X->X speech recognition ('transcribe') or X->English translation ('translate'). 'both' writes <name>.srt and <name>.en.srt from one run: each chunk's log-mel spectrogram and encoder pass are computed once and the decoder runs for both tasks. Burn-in uses the transcription.")
     parser.add_argument("--language", type=str, default="auto", choices=["auto","af","am","ar","as","az","ba","be","bg","bn","bo","br","bs","ca","cs","cy","da","de","el","en","es","et","eu","fa","fi","fo","fr","gl","gu","ha","haw","he","hi","hr","ht","hu","hy","id","is","it","ja","jw","ka","kk","km","kn","ko","la","lb","ln","lo","lt","lv","mg","mi","mk","ml","mn","mr","ms","mt","my","ne","nl","nn","no","oc","pa","pl","ps","pt","ro","ru","sa","sd","si","sk","sl","sn","so","sq","sr","su","sv","sw","ta","te","tg","th","tk","tl","tr","tt","uk","ur","uz","vi","yi","yo","zh"], help="What is the origin language of the video? If unset, it is detected automatically.")
+    parser.add_argument("--language_detection_chunks", type=int, default=3, help="With --language auto, detect the language once per file by a vote over this many VAD chunks spread across the file, then use it for every chunk. 0 lets each chunk detect its own language.")
     parser.add_argument("--ffmpeg_executable_path", type=str, default="ffmpeg", help="Full path to the ffmpeg executable. Defaults to 'ffmpeg' (expected in PATH).")
+    parser.add_argument("--audio_extraction", type=str, default="memory", choices=AUDIO_EXTRACTION_MODES, help="'memory' pipes ffmpeg's decoded audio straight into memory; 'tempfile' writes a temporary WAV file first. 'memory' falls back to 'tempfile' if piping fails.")
+    parser.add_argument("--pipeline", type=str2bool, default=True, help="When several videos are given, run extraction, VAD, transcription, SRT writing and burn-in as concurrent stages so different files overlap. False processes the files strictly one after another.")
+    parser.add_argument("--cross_file_scheduling", type=str2bool, default=True, help="When several videos are given and a worker pool is running, queue the VAD chunks of all files on the same pool instead of draining it after every file. Each SRT is written as soon as its last chunk completes.")
+    parser.add_argument("--pipeline_queue_depth", type=int, default=1, help="Maximum number of finished items waiting between two pipeline stages. Each waiting item before transcription holds one decoded waveform in memory.")
+    parser.add_argument("--cache_dir", type=str, default=None, help="Optional directory for a cache of raw Whisper segments keyed by the decoded audio, model and decode options, and of Silero speech probabilities keyed by the audio. Re-runs that only change post-processing options (e.g. --no_speech_threshold, --merge_repetitive_segments) skip transcription; re-runs that only change VAD parameters skip the VAD model.")
+    parser.add_argument("--chunk_retries", type=int, default=2, help="How many times a VAD chunk that fails or whose worker process dies is retried in the pool. Chunks that still fail are re-run in the main process; any left after that are listed in <name>.failures.json in the output directory.")
+    parser.add_argument("--resume", type=str2bool, default=False, help="Checkpoint every finished VAD chunk in a per-file journal and, when a file is processed again with the same audio, model and options, skip the chunks already in it. Lets an interrupted or stopped run pick up where it left off, at the cost of hashing each file's audio and one fsync'd journal write per chunk.")
+    parser.add_argument("--checkpoint_dir", type=str, default=None, help="Directory for the --resume chunk journals. Defaults to <cache_dir>/checkpoints, or a folder in the system temp directory without --cache_dir. A file's journal is deleted once all its chunks are done.")
+    parser.add_argument("--cache_max_mb", type=float, default=1024, help="Size cap in MB for each of the transcript and VAD caches in --cache_dir. Least recently used entries are evicted first.")
+    parser.add_argument("--backend", type=str, default="whisper", choices=BACKENDS, help="Inference engine. 'whisper' runs the openai-whisper PyTorch model; 'faster-whisper' runs a CTranslate2 conversion of the same model in int8 (needs the faster-whisper package and downloads its own model files). --mmap_model_weights, --quantize and --share_model_weights only apply to 'whisper'.")
+    parser.add_argument("--draft_model", default=None, choices=MODEL_NAMES, help="Cascade mode: transcribe everything with this fast model, then re-decode only the segments whose confidence (from avg_logprob, compression_ratio and no_speech_prob) is below --cascade_confidence_threshold with --model. Reports the share of audio that needed --model.")
+    parser.add_argument("--cascade_confidence_threshold", type=float, default=0.5, help="Cascade mode: draft segments scoring below this (0.0-1.0; roughly the mean token probability, scaled down by the no-speech probability and set to 0 for repetitive output) are re-decoded with --model.")
     parser.add_argument("--model_download_root", type=str, default=None, help="Optional root directory for Whisper model cache. Whisper will create a 'whisper' subdir here.")
+    parser.add_argument("--mmap_model_weights", type=str2bool, default=True, help="On the first load of a model, verify its checkpoint and save a memory-mappable float32 copy of the weights (plus a marker with the checksum, size and mtime) next to it. Later loads, in this and later runs, map that copy instead of reading and re-hashing the checkpoint. The copy is kept alongside the checkpoint and, being float32, is about twice its size, so each model takes roughly three times the checkpoint's disk space; pass False to skip it. Falls back to a plain whisper.load_model if the installed whisper does not expose the model tables the conversion relies on.")
+    parser.add_argument("--quantize", type=str, default="none", choices=QUANTIZATION_MODES, help="'int8' applies dynamic int8 quantization to the Whisper linear layers for faster CPU inference at a small accuracy cost. The quantized model is cached next to the checkpoint (about half the checkpoint's size on disk), so it is only computed once. Always runs on the CPU.")
     parser.add_argument("--no_speech_threshold", type=float, default=0.6, help="Whisper's segment no_speech_prob threshold. Segments above this will be skipped. Range 0.0-1.0. Default is 0.6.")
     parser.add_argument("--merge_repetitive_segments", type=str2bool, default=True, help="Whether to merge consecutive subtitle segments if their text is identical. Default is True.")
     parser.add_argument("--use_vad", type=str2bool, default=True, help="Whether to use Silero VAD to pre-segment audio before sending to Whisper. Default is True.")
     parser.add_argument("--vad_threshold", type=float, default=0.5, help="VAD threshold for speech detection. Range 0.0-1.0. Higher is more sensitive to speech. Default is 0.5.")
     parser.add_argument("--min_speech_duration_ms", type=int, default=250, help="VAD: Minimum duration for a speech segment in milliseconds. Default is 250.")
     parser.add_argument("--min_silence_duration_ms", type=int, default=100, help="VAD: Minimum duration for a silence gap in milliseconds. Default is 100.")
-    parser.add_argument("--num_workers", type=int, default=1, help="Number of CPU worker processes for transcribing VAD chunks. Default is 1 (no multiprocessing). Set to 0 to use os.cpu_count().")
+    parser.add_argument("--chunk_packing", type=str, default="greedy", choices=CHUNK_PACKING_POLICIES, help="How VAD speech regions are grouped before transcription. 'greedy' merges adjacent regions into windows of up to --chunk_max_window_ms; 'none' transcribes every VAD region on its own.")
+    parser.add_argument("--chunk_max_gap_ms", type=int, default=2000, help="Chunk packing: largest silence gap in milliseconds that may be bridged when merging adjacent VAD regions.")
+    parser.add_argument("--chunk_max_window_ms", type=int, default=30000, help="Chunk packing: maximum length in milliseconds of a packed transcription window. Whisper's native window is 30000.")
+    parser.add_argument("--batch_size", type=int, default=1, help="Number of VAD chunks (each up to 30 s) to run through the Whisper encoder and decoder together as one batch. Default is 1 (one transcribe() call per chunk).")
+    parser.add_argument("--num_workers", type=int, default=1, help="Number of CPU worker processes for transcribing VAD chunks. Default is 1 (no multiprocessing). Set to 0 to size the pool from the physical core count and --threads_per_worker.")
+    parser.add_argument("--share_model_weights", type=str2bool, default=True, help="With a worker pool on CPU, load the Whisper weights once in the main process into shared memory and let every worker (and the main process) use that one copy instead of loading its own. Per-worker unique memory is reported when the pool closes.")
+    parser.add_argument("--threads_per_worker", type=threads_per_worker_arg, default="auto", help="Torch intra-op threads per worker process. 'auto' divides the physical cores between the workers, or with --num_workers 0 picks a per-worker thread count from the model size.")
+    parser.add_argument("--progress_format", type=str, default="text", choices=PROGRESS_FORMATS, help="'jsonl' additionally writes typed progress events as JSON lines to --progress_fd: stage start/end, files planned and finished, every finished chunk with its audio seconds, the real-time factor and an ETA, detected languages and errors. The human-readable log is unchanged. With --daemon, set it when starting the daemon.")
+    parser.add_argument("--progress_fd", type=int, default=2, help="File descriptor for --progress_format jsonl events; 2 is stderr. On Windows, pass an inheritable OS handle instead of a descriptor other than 0-2.")
+    parser.add_argument("--daemon", type=str2bool, default=False, help="Stay running and take jobs as JSON lines ({\"id\": ..., \"args\": [<video>, <options>...]}) on stdin; {\"command\": \"cancel\", \"id\": ...} stops a job without stopping the daemon. Models, VAD and the worker pool stay loaded between jobs; options given with --daemon become the defaults for every job. Replies are JSON lines with per-job timings.")
+    return parser
 
+def main():
+    global PROGRESS
+    parser = build_arg_parser()
     args_dict = parser.parse_args().__dict__
+    progress_format: str = args_dict.pop("progress_format")
+    progress_fd: int = args_dict.pop("progress_fd")
+    if progress_format == "jsonl":
+        try:
+            PROGRESS = ProgressReporter(open_progress_stream(progress_fd))
+        except (OSError, ValueError) as e_progress:
+            parser.error(f"--progress_fd {progress_fd} cannot be written to: {e_progress}")
+    if args_dict.pop("daemon"):
+        run_daemon(parser, args_dict)
+        return
+    if not args_dict["video"]:
+        parser.error("the following arguments are required: video")
+    resident_models = ResidentModels()
+    try:
+        run_subtitle_job(parser, args_dict, resident_models)
+    finally:
+        resident_models.close()
+
+def run_daemon(parser: argparse.ArgumentParser, daemon_args: Dict[str, Any]):
+    # Serves JSON-lines requests one at a time: {"id": <any>, "args": [<video>..., <CLI options>...]} runs a job,
+    # {"command": "cancel", "id": <any>} stops that job (running or still queued) at its next stage or chunk while
+    # the daemon and its models stay up, and {"command": "shutdown"} (or the end of stdin) stops the daemon.
+    # Replies are JSON lines starting with {"event": ...}; log output keeps going to stdout as plain lines, as in a
+    # normal run. Jobs only come from the process that started the daemon: they may name any ffmpeg executable
+    # and output directory.
+    daemon_args.pop("video")
+    parser.set_defaults(**daemon_args) # Options given when starting the daemon apply to every job.
+    resident_models = ResidentModels()
+    reply_lock = threading.Lock()
+    running_job = {"id": None}
+    cancelled_job_ids = set() # Cancelled before they started.
+    job_requests: queue.Queue = queue.Queue()
+
+    def reply_on_stdout(event: Dict[str, Any]):
+        with reply_lock: print(json.dumps(event, ensure_ascii=False), flush=True)
+
+    def read_requests():
+        # Cancels take effect right away; every other request waits its turn on job_requests.
+        for request_line in sys.stdin:
+            try:
+                request = json.loads(request_line)
+            except ValueError:
+                request = None
+            if isinstance(request, dict) and request.get("command") == "cancel":
+                with reply_lock:
+                    if request.get("id") == running_job["id"]: JOB_CANCEL.set()
+                    else: cancelled_job_ids.add(request.get("id"))
+                continue
+            job_requests.put(request_line)
+        job_requests.put(None)
+
+    def handle_request(request_line: str, reply: Callable[[Dict[str, Any]], None]) -> bool:
+        # Returns False once the daemon should stop.
+        if not request_line.strip(): return True
+        try:
+            request = json.loads(request_line)
+        except ValueError as e_json:
+            reply({"event": "error", "error": f"not a JSON request: {e_json}"})
+            return True
+        if request.get("command") == "shutdown": return False
+        job_id = request.get("id")
+        with reply_lock:
+            if job_id in cancelled_job_ids:
+                cancelled_job_ids.discard(job_id)
+                job_id_cancelled = True
+            else:
+                job_id_cancelled = False
+                running_job["id"] = job_id
+                JOB_CANCEL.clear()
+        if job_id_cancelled:
+            reply({"event": "job_cancelled", "id": job_id})
+            return True
+        try:
+            return run_job(request, job_id, reply)
+        finally:
+            with reply_lock: running_job["id"] = None
+
+    def run_job(request: Dict[str, Any], job_id: Any, reply: Callable[[Dict[str, Any]], None]) -> bool:
+        reply({"event": "job_started", "id": job_id})
+        try:
+            job_args = parser.parse_args([str(arg) for arg in request.get("args", [])]).__dict__
+        except SystemExit:
+            reply({"event": "job_failed", "id": job_id, "error": "invalid arguments (see the usage message on stderr)"})
+            return True
+        for process_option in ("daemon", "progress_format", "progress_fd"): job_args.pop(process_option)
+        if not job_args["video"]:
+            reply({"event": "job_failed", "id": job_id, "error": "no video given"})
+            return True
+        try:
+            job_result = run_subtitle_job(parser, job_args, resident_models)
+        except JobCancelledError:
+            # Chunks of the job may still be queued on the workers; a fresh pool is started by the next job that needs one.
+            resident_models.release("workers")
+            print(f"INFO: Daemon job {sanitize_for_print(str(job_id))} cancelled.", flush=True)
+            reply({"event": "job_cancelled", "id": job_id})
+            return True
+        except (Exception, SystemExit) as e_job:
+            print(f"ERROR: Daemon job {sanitize_for_print(str(job_id))} failed: {sanitize_for_print(str(e_job))}", file=sys.stderr, flush=True)
+            reply({"event": "job_failed", "id": job_id, "error": str(e_job)})
+            return True
+        timings = job_result["timings"]
+        stage_summary = ", ".join(f"{stage_name} {busy:.1f}s" for stage_name, busy in timings["stages"].items())
+        print(f"INFO: Daemon job {sanitize_for_print(str(job_id))} finished in {timings['total_sec']:.1f}s; model loading {timings['model_load_sec']:.1f}s; {stage_summary}.", flush=True)
+        reply({"event": "job_finished", "id": job_id, "ok": all(job_result["srt"].values()), "srt": job_result["srt"], "timings": timings})
+        return True
+
+    try:
+        reply_on_stdout({"event": "ready", "pid": os.getpid()})
+        threading.Thread(target=read_requests, name="daemon-requests", daemon=True).start()
+        for request_line in iter(job_requests.get, None):
+            if not handle_request(request_line, reply_on_stdout): break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        resident_models.close()
+
+def run_subtitle_job(parser: argparse.ArgumentParser, args_dict: Dict[str, Any], resident_models: ResidentModels) -> Dict[str, Any]:
+    # One CLI invocation's worth of work (every file in args_dict["video"]). Models and the worker pool come
+    # from resident_models, so a daemon job reuses whatever the previous job already loaded. Returns the SRT
+    # path (or None) per video and the job's timings.
+    job_started_at = time.perf_counter()
+    if not is_backend_available(args_dict["backend"]):
+        parser.error(f"--backend {args_dict['backend']} needs the {args_dict['backend']} package (pip install {args_dict['backend']})")
     video_files: List[str] = args_dict.pop("video")
     model_name: str = args_dict.pop("model")
     output_dir: str = args_dict.pop("output_dir")
     output_srt: bool = args_dict.pop("output_srt")
     srt_only: bool = args_dict.pop("srt_only")
+    output_formats: List[str] = args_dict.pop("output_format")
+    if not srt_only and output_formats == ["json"]:
+        parser.error("--output_format json cannot be burned into the video; add srt, vtt or ass, or pass --srt_only True")
     language: str = args_dict.pop("language")
     ffmpeg_exec_path: str = args_dict.pop("ffmpeg_executable_path")
     model_download_root_path: Optional[str] = args_dict.pop("model_download_root")
+    backend_name: str = args_dict.pop("backend")
+    draft_model_name: Optional[str] = args_dict.pop("draft_model")
+    cascade_confidence_threshold: float = args_dict.pop("cascade_confidence_threshold")
+    mmap_model_weights: bool = args_dict.pop("mmap_model_weights")
+    quantize_mode: str = args_dict.pop("quantize")
     no_speech_threshold_value: float = args_dict.pop("no_speech_threshold")
     merge_repetitions: bool = args_dict.pop("merge_repetitive_segments")
     use_vad_filter: bool = args_dict.pop("use_vad")
     num_workers_arg: int = args_dict.pop("num_workers")
-    vad_parameters = {"vad_threshold": args_dict.pop("vad_threshold"), "min_speech_duration_ms": args_dict.pop("min_speech_duration_ms"), "min_silence_duration_ms": args_dict.pop("min_silence_duration_ms")}
+    threads_per_worker_setting: Union[str, int] = args_dict.pop("threads_per_worker")
+    share_model_weights: bool = args_dict.pop("share_model_weights")
+    batch_size_arg: int = max(1, args_dict.pop("batch_size"))
+    audio_extraction_mode: str = args_dict.pop("audio_extraction")
+    use_pipeline: bool = args_dict.pop("pipeline")
+    language_detection_chunks: int = args_dict.pop("language_detection_chunks")
+    cache_dir: Optional[str] = args_dict.pop("cache_dir")
+    resume_from_checkpoint: bool = args_dict.pop("resume")
+    chunk_retries: int = max(0, args_dict.pop("chunk_retries"))
+    checkpoint_dir: str = args_dict.pop("checkpoint_dir") or os.path.join(cache_dir or tempfile.gettempdir(), "checkpoints" if cache_dir else "auto_subtitle_checkpoints")
+    cache_max_mb: float = args_dict.pop("cache_max_mb")
+    pipeline_queue_depth: int = max(1, args_dict.pop("pipeline_queue_depth"))
+    use_cross_file_scheduling: bool = args_dict.pop("cross_file_scheduling")
+    vad_parameters = {"vad_threshold": args_dict.pop("vad_threshold"), "min_speech_duration_ms": args_dict.pop("min_speech_duration_ms"), "min_silence_duration_ms": args_dict.pop("min_silence_duration_ms"),
+                      "chunk_packing": args_dict.pop("chunk_packing"), "chunk_max_gap_ms": args_dict.pop("chunk_max_gap_ms"), "chunk_max_window_ms": args_dict.pop("chunk_max_window_ms")}
     script_verbose_logging: bool = args_dict.pop("verbose") 
     
     os.makedirs(output_dir, exist_ok=True)
+    job_timings: Dict[str, Any] = {"model_load_sec": 0.0, "stages": {}}
     
+    model_load_started_at = time.perf_counter()
     if use_vad_filter: load_vad_model() 
     
     whisper_transcribe_options = args_dict.copy() 
+    # JSON cues list their words, so the backends are asked for word timings; the option is part of the cache key like every decode option.
+    if "json" in output_formats: whisper_transcribe_options["word_timestamps"] = True
     
-    if model_name.endswith(".en"):
+    cascade: Optional[ModelCascade] = None
+    if draft_model_name is not None and draft_model_name != model_name:
+        cascade = resident_models.get(
+            "cascade", (backend_name, model_name, model_download_root_path, cascade_confidence_threshold, mmap_model_weights, quantize_mode),
+            lambda: ModelCascade(backend_name, model_name, model_download_root_path, cascade_confidence_threshold, mmap_model_weights, quantize_mode)
+        )
+        cascade.start_run(script_verbose_logging)
+        # From here on model_name is the model that transcribes every chunk (main process and workers).
+        model_name = draft_model_name
+        if script_verbose_logging: print(f"INFO: Cascade mode: drafting with '{sanitize_for_print(draft_model_name)}', re-decoding segments below confidence {cascade_confidence_threshold:.2f} with '{sanitize_for_print(cascade.model_name)}'.", flush=True)
+    else:
+        resident_models.release("cascade")
+
+    english_only_model = next((name for name in (model_name, cascade.model_name if cascade else "") if name.endswith(".en")), None)
+    if english_only_model is not None and whisper_transcribe_options["task"] == TASK_BOTH:
+        parser.error(f"--task {TASK_BOTH} needs a multilingual model; {english_only_model} only transcribes English")
+    if english_only_model is not None:
         if language != "en":
-            warnings.warn(f"{sanitize_for_print(model_name)} is an English-only model, forcing English detection.")
+            warnings.warn(f"{sanitize_for_print(english_only_model)} is an English-only model, forcing English detection.")
         whisper_transcribe_options["language"] = "en"
     elif language != "auto": 
         whisper_transcribe_options["language"] = language
     
-    main_whisper_model = whisper.load_model(model_name, download_root=model_download_root_path)
-    audios = get_audio(video_files, ffmpeg_exec_path)
-    
-    actual_num_workers = max(1, os.cpu_count() or 1) if num_workers_arg == 0 else max(1, num_workers_arg)
+    if backend_name != "whisper" and quantize_mode != "none":
+        print(f"WARNING: --quantize {quantize_mode} only applies to the whisper backend; {backend_name} always runs int8.", file=sys.stderr, flush=True)
+        quantize_mode = "none"
+    if quantize_mode != "none" and torch.cuda.is_available():
+        print(f"WARNING: --quantize {quantize_mode} runs on the CPU; the GPU will not be used.", file=sys.stderr, flush=True)
+
+    vad_enabled_for_run = use_vad_filter and VAD_MODEL not in [None, "error"]
+    actual_num_workers, torch_threads_per_worker, torch_threads_main = plan_thread_budget(num_workers_arg, threads_per_worker_setting, model_name, vad_enabled_for_run)
+    apply_torch_thread_budget(torch_threads_main)
     if script_verbose_logging: print(f"INFO: Using up to {actual_num_workers} worker(s) for VAD chunk transcription.", flush=True)
+    if script_verbose_logging: print(f"INFO: Thread budget: {get_physical_core_count()} physical core(s) -> {actual_num_workers} worker(s) x {torch_threads_per_worker} torch thread(s); main process uses {torch_threads_main} thread(s).", flush=True)
 
-    subtitles = get_subtitles(
-        audios, main_whisper_model, model_name, model_download_root_path,
-        whisper_transcribe_options, output_srt or srt_only, output_dir,
-        no_speech_threshold_value, merge_repetitions,
-        use_vad_filter and VAD_MODEL not in [None, "error"], 
-        vad_parameters, actual_num_workers, script_verbose_logging
-    )
+    main_backend: Optional[TranscriptionBackend] = None
+    warm_pool: Optional[WarmWorkerPool] = None
+    if vad_enabled_for_run and actual_num_workers > 1:
+        # Quantized layers re-pack their int8 weights privately when they are rebuilt, so they are not shared.
+        share_weights = share_model_weights and backend_name == "whisper" and quantize_mode == "none" and not torch.cuda.is_available()
+        worker_resources = resident_models.get(
+            "workers", (actual_num_workers, model_name, model_download_root_path, torch_threads_per_worker, share_weights, mmap_model_weights, quantize_mode, backend_name),
+            lambda: start_worker_resources(
+                actual_num_workers, model_name, model_download_root_path, torch_threads_per_worker, share_weights, mmap_model_weights, quantize_mode, backend_name, script_verbose_logging
+            ),
+            close_worker_resources
+        )
+        warm_pool, main_backend = worker_resources["warm_pool"], worker_resources["main_backend"]
+    else:
+        resident_models.release("workers")
+
+    transcription_cache = TranscriptionCache(cache_dir, cache_max_mb) if cache_dir else None
+    vad_probability_cache = VadProbabilityCache(cache_dir, cache_max_mb) if cache_dir and vad_enabled_for_run else None
+
+    def extract_stage(video_file: str) -> Dict[str, Any]:
+        return {"video": video_file, "audio": get_audio([video_file], ffmpeg_exec_path, audio_extraction_mode).get(video_file)}
+
+    def vad_stage(job: Dict[str, Any]) -> Dict[str, Any]:
+        if job["audio"] is not None:
+            print(f"Generating subtitles for {sanitize_for_print(filename(job['video']))}... This might take a while.", flush=True)
+            audio_hash = hash_audio(job["audio"]) if cache_dir or resume_from_checkpoint else None
+            if audio_hash is not None:
+                job["cache_key"] = get_transcription_cache_key(
+                    audio_hash, model_name, whisper_transcribe_options, vad_enabled_for_run, vad_parameters, batch_size_arg, quantize_mode, backend_name,
+                    cascade.cache_params() if cascade is not None else None, language_detection_chunks
+                )
+            if transcription_cache is not None:
+                cached_segments = load_cached_segments(transcription_cache, job["cache_key"], job["video"])
+                if cached_segments is not None:
+                    job["segments"] = cached_segments
+                    return job
+            job["prepared"] = prepare_audio_for_transcription(
+                job["video"], job["audio"], vad_enabled_for_run, vad_parameters, script_verbose_logging, audio_hash, vad_probability_cache
+            )
+        return job
+
+    def make_subtitle_writer(video_file: str) -> Union[StreamingSubtitleWriter, MultiTaskSubtitleWriter]:
+        return make_streaming_subtitle_writer(
+            video_file, output_srt or srt_only, output_dir, output_formats, whisper_transcribe_options["task"], no_speech_threshold_value, merge_repetitions, script_verbose_logging
+        )
+
+    def make_chunk_journal(job: Dict[str, Any]) -> Optional[ChunkJournal]:
+        # Keyed like the transcription cache, so only chunks decoded with the same settings are reused.
+        return ChunkJournal(checkpoint_dir, job["cache_key"]) if resume_from_checkpoint and job.get("cache_key") else None
+
+    def transcribe_stage(job: Dict[str, Any]) -> Dict[str, Any]:
+        if job.get("prepared") is not None:
+            job["subtitle_writer"] = make_subtitle_writer(job["video"])
+            transcribed_segments = transcribe_prepared_audio(
+                job["video"], job["prepared"], main_backend, model_name, model_download_root_path,
+                whisper_transcribe_options, actual_num_workers, script_verbose_logging, warm_pool, batch_size_arg, language_detection_chunks,
+                job["subtitle_writer"], make_chunk_journal(job), chunk_retries, cascade, collect_segments=transcription_cache is not None
+            )
+            job["failed_chunks"] = job["prepared"].get("failed_chunks", [])
+            if not job["failed_chunks"]: store_cached_segments(transcription_cache, job.get("cache_key"), transcribed_segments)
+            del transcribed_segments
+        job.pop("prepared", None); job.pop("audio", None) # Release the waveform before the job moves on.
+        return job
+
+    def write_srt_stage(job: Dict[str, Any]) -> Dict[str, Any]:
+        job["srt"] = None
+        write_failure_manifest(job["video"], job.pop("failed_chunks", []), output_dir)
+        if "subtitle_writer" in job:
+            job["srt"] = job.pop("subtitle_writer").close()
+        elif "segments" in job:
+            job["srt"] = write_subtitles_for_file(
+                job["video"], job.pop("segments"), output_srt or srt_only, output_dir,
+                no_speech_threshold_value, merge_repetitions, script_verbose_logging, output_formats, whisper_transcribe_options["task"]
+            )
+        srt_paths[job["video"]] = job["srt"]
+        PROGRESS.file_finished(job["video"], job["srt"])
+        return job
 
-    if srt_only: return
+    def burn_in_stage(job: Dict[str, Any]) -> Dict[str, Any]:
+        burn_subtitles_into_video(job["video"], job["srt"], output_dir, ffmpeg_exec_path)
+        return job
 
-    for path, srt_path in subtitles.items():
-        if not srt_path: 
-            print(f"Skipping video overlay for {sanitize_for_print(filename(path))} as no valid SRT was generated.", flush=True)
+    stage_lock = threading.Lock()
+
+    def timed_stage(stage_name: str, stage_func: Callable[[Any], Any]) -> Callable[[Any], Any]:
+        # Busy seconds per stage for the job's timings, summed over files (and threads in pipeline mode).
+        def run_timed_stage(item: Any) -> Any:
+            raise_if_job_cancelled()
+            stage_video = item if isinstance(item, str) else item.get("video") if isinstance(item, dict) else None
+            PROGRESS.emit("stage_started", stage=stage_name, video=stage_video)
+            stage_started_at = time.perf_counter()
+            try:
+                return stage_func(item)
+            finally:
+                stage_sec = time.perf_counter() - stage_started_at
+                with stage_lock:
+                    job_timings["stages"][stage_name] = job_timings["stages"].get(stage_name, 0.0) + stage_sec
+                PROGRESS.emit("stage_finished", stage=stage_name, video=stage_video, sec=round(stage_sec, 3))
+        return run_timed_stage
+
+    extract_stage, vad_stage, transcribe_stage = timed_stage("extract", extract_stage), timed_stage("vad", vad_stage), timed_stage("transcribe", transcribe_stage)
+    write_srt_stage, burn_in_stage = timed_stage("write_srt", write_srt_stage), timed_stage("burn_in", burn_in_stage)
+    pipeline_stages = [("extract", extract_stage), ("vad", vad_stage), ("transcribe", transcribe_stage), ("write_srt", write_srt_stage)]
+    if not srt_only: pipeline_stages.append(("burn_in", burn_in_stage))
+
+    # Cross-file batch mode: the producer thread detects languages and transcribes non-VAD files while the
+    # consumer may run a fallback transcription, so main-model calls are serialized.
+    main_model_lock = threading.Lock()
+
+    def prepare_cross_file_job(video_file: str) -> Dict[str, Any]:
+        job = vad_stage(extract_stage(video_file))
+        prepared = job.get("prepared")
+        if prepared is not None and prepared["use_vad"] and prepared["vad_chunks"] and prepared["waveform"] is not None:
+            vad_chunks = prepared["vad_chunks"]
+            chunk_batches = [vad_chunks[i:i + batch_size_arg] for i in range(0, len(vad_chunks), max(1, batch_size_arg))]
+            job["batch_index_by_start"] = {chunk_batch[0][2]: i for i, chunk_batch in enumerate(chunk_batches)}
+            job["chunk_batches"] = chunk_batches
+            job["chunk_journal"] = make_chunk_journal(job)
+            recovered_batches = recover_journaled_batches(job["video"], chunk_batches, job["chunk_journal"])
+            report_file_plan(job["video"], chunk_batches, recovered_batches)
+            job["pool_failed_batches"] = {}
+            job["subtitle_writer"] = make_subtitle_writer(job["video"])
+            for i_batch, recovered_segments in recovered_batches.items(): job["subtitle_writer"].add_chunk(i_batch, recovered_segments)
+            # Segments stay with the job only for the transcription cache; the writer has its own copy.
+            job["finished_batches"] = set(recovered_batches)
+            job["segments_by_batch"] = recovered_batches if transcription_cache is not None else {}
+            del recovered_batches
+            pending_batches = [chunk_batch for i, chunk_batch in enumerate(chunk_batches) if i not in job["finished_batches"]]
+            if pending_batches:
+                with main_model_lock:
+                    job["chunk_options"] = get_chunk_options_for_file(
+                        job["video"], main_backend, prepared["waveform"], vad_chunks, whisper_transcribe_options, language_detection_chunks
+                    )
+                job["shared_audio_block"] = create_shared_audio_block(prepared["waveform"])
+                job["total_samples"] = len(prepared["waveform"])
+                job["pool_tasks"] = make_pool_tasks(
+                    job["shared_audio_block"], job["total_samples"], pending_batches, model_name, model_download_root_path, job["chunk_options"], batch_size_arg, backend_name
+                )
+            if isinstance(prepared["audio"], np.ndarray): prepared["audio"] = None # The shared block holds the only copy now.
+            prepared["waveform"] = None
+            return job
+        with main_model_lock:
+            return transcribe_stage(job)
+
+    def record_cross_file_batch(job: Dict[str, Any], i_batch: int, batch_segments: List[Dict[str, Any]]):
+        if cascade is not None:
+            waveform_view = np.ndarray((job["total_samples"],), dtype=np.float32, buffer=job["shared_audio_block"].buf)
+            batch_segments = cascade.refine(job["video"], waveform_view, job["chunk_batches"][i_batch], batch_segments, job["chunk_options"], batch_size_arg)
+            del waveform_view
+        job["finished_batches"].add(i_batch)
+        if transcription_cache is not None: job["segments_by_batch"][i_batch] = batch_segments
+        PROGRESS.chunk_done(job["video"], chunk_batch_audio_sec(job["chunk_batches"][i_batch]), len(job["chunk_batches"][i_batch]))
+        if job["chunk_journal"] is not None: job["chunk_journal"].append(list(chunk_batch_ranges(job["chunk_batches"][i_batch])), batch_segments)
+        job["subtitle_writer"].add_chunk(i_batch, batch_segments)
+
+    def stream_cross_file_result(job: Dict[str, Any], task_result: Dict[str, Any]):
+        i_batch = job["batch_index_by_start"][task_result["chunk_start_sec"]]
+        if task_result["error"] is None:
+            record_cross_file_batch(job, i_batch, task_result["segments"])
+        else:
+            job["pool_failed_batches"][i_batch] = (task_result["error"], task_result["attempts"])
+
+    def finish_cross_file_job(job: Dict[str, Any]):
+        if "segments_by_batch" in job:
+            shared_audio_block = job.get("shared_audio_block")
+            chunk_journal = job["chunk_journal"]
+            job["failed_chunks"] = []
+            try:
+                raise_if_job_cancelled() # Before the journal is removed or a partial transcript cached; the shared audio is still released.
+                pool_failed_batches = job["pool_failed_batches"]
+                if pool_failed_batches:
+                    # Only the chunks that failed every pool retry are re-run, on the main model.
+                    print(f"WARNING: {len(pool_failed_batches)} VAD task(s) of {sanitize_for_print(filename(job['video']))} failed in the worker pool after retries. Re-running only those in the main process.", file=sys.stderr, flush=True)
+                    waveform_view = np.ndarray((job["total_samples"],), dtype=np.float32, buffer=shared_audio_block.buf)
+                    for i_batch, (_, pool_attempts) in sorted(pool_failed_batches.items()):
+                        with main_model_lock:
+                            batch_segments, batch_error, attempts = transcribe_chunk_batch_in_main_process(
+                                main_backend, waveform_view, job["chunk_batches"][i_batch], job["chunk_options"], batch_size_arg, chunk_retries
+                            )
+                        if batch_error is None:
+                            record_cross_file_batch(job, i_batch, batch_segments)
+                        else:
+                            job["failed_chunks"].append(describe_failed_chunk_batch(job["chunk_batches"][i_batch], batch_error, pool_attempts + attempts))
+                            PROGRESS.chunk_done(job["video"], chunk_batch_audio_sec(job["chunk_batches"][i_batch]), len(job["chunk_batches"][i_batch]), batch_error)
+                            job["finished_batches"].add(i_batch)
+                            job["subtitle_writer"].add_chunk(i_batch, [])
+                    del waveform_view
+                if job["failed_chunks"]:
+                    print(f"ERROR: {len(job['failed_chunks'])} VAD task(s) of {sanitize_for_print(filename(job['video']))} could not be transcribed; their time ranges are missing from the subtitles.", file=sys.stderr, flush=True)
+                    PROGRESS.error(f"{len(job['failed_chunks'])} VAD task(s) could not be transcribed", job["video"])
+                else:
+                    if chunk_journal is not None: chunk_journal.remove()
+                    if transcription_cache is not None:
+                        segments_by_batch = job["segments_by_batch"]
+                        store_cached_segments(transcription_cache, job.get("cache_key"), [segment for i_batch in sorted(segments_by_batch) for segment in segments_by_batch[i_batch]])
+            finally:
+                job.pop("shared_audio_block", None)
+                if shared_audio_block is not None: release_shared_audio_block(shared_audio_block)
+            if cascade is not None: cascade.report_file(job["video"])
+        for job_key in (
+            "prepared", "audio", "pool_tasks", "pool_results", "pool_failed_batches", "batch_index_by_start", "chunk_batches",
+            "finished_batches", "segments_by_batch", "chunk_journal", "chunk_options", "total_samples"
+        ): job.pop(job_key, None)
+        job = write_srt_stage(job)
+        if not srt_only: burn_in_stage(job)
+
+    srt_paths: Dict[str, Optional[str]] = {}
+    try:
+        if main_backend is None:
+            main_backend = resident_models.get(
+                "main_backend", (backend_name, model_name, model_download_root_path, mmap_model_weights, quantize_mode),
+                lambda: load_backend(backend_name, model_name, model_download_root_path, mmap_model_weights, quantize=quantize_mode, cpu_threads=torch_threads_main)
+            )
+        else:
+            resident_models.release("main_backend") # The shared-weights model from the workers slot is used instead.
+        job_timings["model_load_sec"] = time.perf_counter() - model_load_started_at
+
+        if use_cross_file_scheduling and warm_pool is not None and len(video_files) > 1:
+            if script_verbose_logging: print(f"INFO: Scheduling VAD chunks of {len(video_files)} files on one shared queue across {warm_pool.num_workers} worker(s).", flush=True)
+            timed_stage("cross_file_batch", lambda items: run_cross_file_batch(
+                items, prepare_cross_file_job, finish_cross_file_job, warm_pool, max(2, warm_pool.num_workers), script_verbose_logging, stream_cross_file_result, chunk_retries
+            ))(video_files)
+        elif use_pipeline and len(video_files) > 1:
+            run_staged_pipeline(video_files, pipeline_stages, pipeline_queue_depth, script_verbose_logging)
+        else:
+            # One file at a time, so only one decoded waveform is held in memory.
+            for video_file in video_files:
+                job = video_file
+                for _, stage_func in pipeline_stages: job = stage_func(job)
+        raise_if_job_cancelled() # The pipeline and the cross-file batch skip the files left after a cancel instead of raising.
+        if cascade is not None: cascade.report_run()
+    finally:
+        job_timings["total_sec"] = time.perf_counter() - job_started_at
+    for video_file in video_files: srt_paths.setdefault(video_file, None)
+    PROGRESS.emit("run_finished", files=len(video_files), srt_written=sum(srt_path is not None for srt_path in srt_paths.values()), sec=round(job_timings["total_sec"], 3))
+    return {"srt": srt_paths, "timings": job_timings}
+
+AUDIO_EXTRACTION_MODES = ["memory", "tempfile"]
+
+def get_ffprobe_cmd(ffmpeg_cmd: str) -> str:
+    ffmpeg_dir, ffmpeg_base = os.path.split(ffmpeg_cmd)
+    return os.path.join(ffmpeg_dir, ffmpeg_base.replace("ffmpeg", "ffprobe", 1))
+
+def probe_duration_sec(path: str, ffmpeg_cmd: str = "ffmpeg") -> Optional[float]:
+    try:
+        probe_info = ffmpeg.probe(path, cmd=get_ffprobe_cmd(ffmpeg_cmd))
+        return float(probe_info["format"]["duration"])
+    except Exception:
+        return None
+
+def load_audio_into_memory(path: str, ffmpeg_cmd: str = "ffmpeg", sampling_rate: int = 16000) -> np.ndarray:
+    # ffmpeg writes raw mono s16le to stdout, which is read straight into a buffer sized from the probed
+    # duration (grown if the probe was short or unavailable) and converted once to float32 in [-1, 1).
+    duration_sec = probe_duration_sec(path, ffmpeg_cmd)
+    capacity_samples = int((duration_sec + 1.0) * sampling_rate) if duration_sec else 600 * sampling_rate
+    pcm_buffer = np.empty(capacity_samples, dtype=np.int16)
+
+    process = (
+        ffmpeg.input(path)
+        .output("pipe:", format="s16le", acodec="pcm_s16le", ac=1, ar=sampling_rate)
+        .global_args("-loglevel", "error", "-nostdin")
+        .run_async(cmd=ffmpeg_cmd, pipe_stdout=True, pipe_stderr=True)
+    )
+    stderr_chunks: List[bytes] = []
+    stderr_reader = threading.Thread(target=lambda: stderr_chunks.append(process.stderr.read()), daemon=True)
+    stderr_reader.start()
+
+    filled_bytes = 0
+    while True:
+        buffer_bytes = memoryview(pcm_buffer).cast("B")
+        if filled_bytes == len(buffer_bytes):
+            del buffer_bytes
+            grown_buffer = np.empty(len(pcm_buffer) * 2, dtype=np.int16)
+            grown_buffer[:len(pcm_buffer)] = pcm_buffer
+            pcm_buffer = grown_buffer
             continue
+        bytes_read = process.stdout.readinto(buffer_bytes[filled_bytes:])
+        del buffer_bytes
+        if not bytes_read: break
+        filled_bytes += bytes_read
 
-        out_path = os.path.join(output_dir, f"{filename(path)}.mp4")
-        print(f"Adding subtitles to {sanitize_for_print(filename(path))}...")
+    process.stdout.close()
+    return_code = process.wait()
+    stderr_reader.join()
+    if return_code != 0:
+        raise ffmpeg.Error("ffmpeg", b"", b"".join(stderr_chunks))
 
-        video = ffmpeg.input(path)
-        audio = video.audio 
+    audio = pcm_buffer[:filled_bytes // 2].astype(np.float32)
+    audio *= 1.0 / 32768.0
+    return audio
 
-        try:
-            ffmpeg.concat(
-                video.filter('subtitles', srt_path, force_style="OutlineColour=&H40000000,BorderStyle=3"), audio, v=1, a=1
-            ).output(out_path).run(cmd=ffmpeg_exec_path, quiet=True, overwrite_output=True)
-            print(f"Saved subtitled video to {sanitize_for_print(os.path.abspath(out_path))}.")
-        except ffmpeg.Error as e:
-            
-            error_message = e.stderr.decode('utf8', errors='ignore') if e.stderr else str(e)
-            print(f"Error during FFmpeg processing for {sanitize_for_print(filename(path))}: {sanitize_for_print(error_message)}", file=sys.stderr, flush=True)
-            print(f"Failed to add subtitles to {sanitize_for_print(filename(path))}. SRT file may still be available at: {sanitize_for_print(srt_path)}", file=sys.stderr, flush=True)
+def extract_audio_to_tempfile(path: str, ffmpeg_cmd: str = "ffmpeg") -> str:
+    output_path = os.path.join(tempfile.gettempdir(), f"{filename(path)}.wav")
+    ffmpeg.input(path).output(
+        output_path,
+        acodec="pcm_s16le", 
+        ac=1,              
+        ar="16k"           
+    ).run(cmd=ffmpeg_cmd, quiet=True, overwrite_output=True)
+    return output_path
 
-def get_audio(paths: List[str], ffmpeg_cmd: str = "ffmpeg") -> Dict[str, str]:
-    temp_dir = tempfile.gettempdir()
-    audio_paths: Dict[str, str] = {}
+def get_audio(paths: List[str], ffmpeg_cmd: str = "ffmpeg", extraction_mode: str = "memory") -> Dict[str, Union[str, np.ndarray]]:
+    # In "memory" mode each value is the decoded 16 kHz float32 waveform, shared by VAD, chunking and
+    # full-file transcription. The temp WAV path is used in "tempfile" mode or when piping fails.
+    audio_paths: Dict[str, Union[str, np.ndarray]] = {}
 
     for path in paths:
         print(f"Extracting audio from {sanitize_for_print(filename(path))}...")
-        
-        base_name = filename(path)
-        
-        
-        output_path = os.path.join(temp_dir, f"{base_name}.wav")
+
+        if extraction_mode == "memory":
+            try:
+                audio_paths[path] = load_audio_into_memory(path, ffmpeg_cmd)
+                continue
+            except Exception as e_mem:
+                error_message = e_mem.stderr.decode('utf8', errors='ignore') if isinstance(e_mem, ffmpeg.Error) and e_mem.stderr else str(e_mem)
+                print(f"WARNING: In-memory audio extraction failed for {sanitize_for_print(filename(path))}: {sanitize_for_print(error_message)}. Falling back to a temporary WAV file.", file=sys.stderr, flush=True)
 
         try:
-            ffmpeg.input(path).output(
-                output_path,
-                acodec="pcm_s16le", 
-                ac=1,              
-                ar="16k"           
-            ).run(cmd=ffmpeg_cmd, quiet=True, overwrite_output=True)
-            audio_paths[path] = output_path
+            audio_paths[path] = extract_audio_to_tempfile(path, ffmpeg_cmd)
         except ffmpeg.Error as e:
             error_message = e.stderr.decode('utf8', errors='ignore') if e.stderr else str(e)
             print(f"Error extracting audio from {sanitize_for_print(filename(path))}: {sanitize_for_print(error_message)}", file=sys.stderr, flush=True)
+            PROGRESS.error(f"Audio extraction failed: {error_message.strip().splitlines()[-1] if error_message.strip() else 'ffmpeg error'}", path)
             
             continue 
     return audio_paths
 
-def get_subtitles(
-    audio_paths: Dict[str, str], main_whisper_model_obj: whisper.Whisper, model_name_for_worker: str,
-    model_root_for_worker: Optional[str], whisper_options_base: Dict[str, Any], output_srt_flag: bool,
-    output_dir_path: str, no_speech_thresh_val: float, merge_repetitive: bool, use_vad_processing: bool,
-    vad_params: Dict[str, Any], num_workers_for_pool: int, script_verbose_flag: bool
-) -> Dict[str, Optional[str]]:
+def prepare_audio_for_transcription(
+    original_video_path: str, current_audio_path: Union[str, np.ndarray], use_vad_processing: bool,
+    vad_params: Dict[str, Any], script_verbose_flag: bool,
+    audio_hash: Optional[str] = None, vad_probability_cache: Optional[VadProbabilityCache] = None
+) -> Dict[str, Any]:
+    # VAD stage: returns the audio source plus, when VAD succeeded, the (offset, length, start_sec)
+    # descriptors of the packed speech windows and the float32 waveform they index into.
+    SAMPLING_RATE = 16000
+    prepared_audio: Dict[str, Any] = {"audio": current_audio_path, "waveform": None, "vad_chunks": [], "use_vad": False}
+    full_waveform_for_vad = None
 
-    subtitles_path_map: Dict[str, Optional[str]] = {}
-    SAMPLING_RATE = 16000 
+    if use_vad_processing and VAD_MODEL and VAD_UTILS: 
+        if script_verbose_flag: print(f"INFO: Using Silero VAD for {sanitize_for_print(filename(original_video_path))}.", flush=True)
 
-    for original_video_path, current_audio_path in audio_paths.items():
-        if current_audio_path is None : 
-            subtitles_path_map[original_video_path] = None
-            continue
+        if isinstance(current_audio_path, np.ndarray):
+            loaded_audio_data = (torch.from_numpy(current_audio_path), SAMPLING_RATE)
+        else:
+            loaded_audio_data = load_audio_for_vad(current_audio_path, SAMPLING_RATE)
+        if loaded_audio_data:
+            full_waveform_for_vad, sr_for_vad = loaded_audio_data
+            if sr_for_vad == SAMPLING_RATE: 
+                prepared_audio["use_vad"] = True
+            else:
+                print(f"ERROR: VAD audio SR is {sr_for_vad}, expected {SAMPLING_RATE} for {sanitize_for_print(filename(original_video_path))}. Skipping VAD.", file=sys.stderr, flush=True)
+        else:
+            print(f"ERROR: VAD audio load failed for {sanitize_for_print(filename(original_video_path))}. Skipping VAD for this file.", file=sys.stderr, flush=True)
 
-        
-        srt_file_name = f"{filename(original_video_path)}.srt"
-        target_srt_path = os.path.join(output_dir_path if output_srt_flag else tempfile.gettempdir(), srt_file_name)
-        
-        print(f"Generating subtitles for {sanitize_for_print(filename(original_video_path))}... This might take a while.", flush=True)
-        
-        all_transcribed_segments: List[Dict[str, Any]] = []
-        use_vad_for_this_file = False 
-        full_waveform_for_vad = None
+        if prepared_audio["use_vad"] and full_waveform_for_vad is not None:
+            speech_ts_from_vad = get_speech_timestamps_from_vad(
+                full_waveform_for_vad, sr_for_vad, VAD_MODEL, SAMPLING_RATE,
+                vad_params["vad_threshold"], vad_params["min_speech_duration_ms"], vad_params["min_silence_duration_ms"],
+                audio_hash=audio_hash, vad_probability_cache=vad_probability_cache
+            )
+
+            if not speech_ts_from_vad:
+                if script_verbose_flag: print(f"INFO: VAD found no speech in {sanitize_for_print(filename(original_video_path))}.", flush=True)
+            else:
+                packed_speech_windows = pack_speech_timestamps(
+                    speech_ts_from_vad, SAMPLING_RATE, vad_params.get("chunk_packing", "none"),
+                    vad_params.get("chunk_max_gap_ms", 2000), vad_params.get("chunk_max_window_ms", 30000)
+                )
+                # Progress parsers in the GUIs count "VAD found N speech segments" against finished chunks,
+                # so N is the number of packed transcription windows.
+                if script_verbose_flag: print(f"INFO: VAD found {len(packed_speech_windows)} speech segments (packed from {len(speech_ts_from_vad)} VAD regions, policy '{vad_params.get('chunk_packing', 'none')}'). Preparing for transcription.", flush=True)
+                
+                full_waveform_np = np.ascontiguousarray(full_waveform_for_vad.numpy(), dtype=np.float32)
+                for ts_chunk in packed_speech_windows:
+                    cs_s, cs_e = ts_chunk['start'], ts_chunk['end'] 
+                    c_start_sec = cs_s / SAMPLING_RATE 
+                    
+                    chunk_length = min(cs_e, len(full_waveform_np)) - cs_s
+                    
+                    
+                    if chunk_length < 0.05 * SAMPLING_RATE: 
+                        if script_verbose_flag: print(f"INFO: Skipping very short VAD chunk (pre-pool) at {c_start_sec:.2f}s ({chunk_length/SAMPLING_RATE:.3f}s)", flush=True)
+                        continue
 
-        if use_vad_processing and VAD_MODEL and VAD_UTILS: 
-            if script_verbose_flag: print(f"INFO: Using Silero VAD for {sanitize_for_print(filename(original_video_path))}.", flush=True)
-            (get_speech_timestamps_util, _, _, _, _) = VAD_UTILS 
+                    prepared_audio["vad_chunks"].append((cs_s, chunk_length, c_start_sec))
 
-            loaded_audio_data = load_audio_for_vad(current_audio_path, SAMPLING_RATE)
-            if loaded_audio_data:
-                full_waveform_for_vad, sr_for_vad = loaded_audio_data
-                if sr_for_vad == SAMPLING_RATE: 
-                    use_vad_for_this_file = True
-                else:
-                    print(f"ERROR: VAD audio SR is {sr_for_vad}, expected {SAMPLING_RATE} for {sanitize_for_print(filename(original_video_path))}. Skipping VAD.", file=sys.stderr, flush=True)
+                if prepared_audio["vad_chunks"]:
+                    prepared_audio["waveform"] = full_waveform_np
+                else: 
+                    if script_verbose_flag: print(f"INFO: No VAD tasks to process for {sanitize_for_print(filename(original_video_path))}. Transcribing full audio if VAD found no speech, or if all chunks were skipped.", flush=True)
+                    prepared_audio["use_vad"] = False 
+
+    return prepared_audio
+
+def detect_language_for_file(
+    backend: TranscriptionBackend, full_waveform_np: np.ndarray, vad_chunks: List[Tuple[int, int, float]], num_sample_chunks: int = 3
+) -> Tuple[str, float]:
+    # Language vote over a few VAD chunks spread across the file (one batched encoder pass on the whisper
+    # backend), with the per-chunk language distributions weighted by chunk length.
+    sample_positions = sorted(set(np.linspace(0, len(vad_chunks) - 1, min(num_sample_chunks, len(vad_chunks))).round().astype(int).tolist()))
+    sampled_chunks = [vad_chunks[i] for i in sample_positions]
+    language_probs_per_chunk = backend.detect_language([full_waveform_np[offset:offset + length] for offset, length, _ in sampled_chunks])
+
+    language_votes: Dict[str, float] = {}
+    total_weight = float(sum(min(length, whisper.audio.N_SAMPLES) for _, length, _ in sampled_chunks))
+    for (_, length, _), language_probs in zip(sampled_chunks, language_probs_per_chunk):
+        for language_code, probability in language_probs.items():
+            language_votes[language_code] = language_votes.get(language_code, 0.0) + probability * min(length, whisper.audio.N_SAMPLES) / total_weight
+    detected_language = max(language_votes, key=language_votes.get)
+    return detected_language, language_votes[detected_language]
+
+def filter_no_speech_segments(
+    segments: Iterable[Dict[str, Any]], no_speech_thresh_val: float, original_video_path: str, script_verbose_flag: bool
+) -> Iterator[Dict[str, Any]]:
+    for segment in segments:
+        seg_no_speech_p = segment.get("no_speech_prob", 0.0) 
+        if seg_no_speech_p < no_speech_thresh_val:
+            yield segment
+        elif script_verbose_flag:
+            txt_prev = segment.get('text', '').strip()
+            txt_prev_display = (txt_prev[:27] + "...") if len(txt_prev) > 30 else txt_prev
+            print(f"INFO: Skipping silent segment ({segment['start']:.2f}s-{segment['end']:.2f}s) for '{sanitize_for_print(filename(original_video_path))}' (prob: {seg_no_speech_p:.2f} >= {no_speech_thresh_val:.2f}). Text: '{sanitize_for_print(txt_prev_display)}'", flush=True)
+
+def merge_repetitive_segments(
+    segments: Iterable[Dict[str, Any]], original_video_path: str, script_verbose_flag: bool
+) -> Iterator[Dict[str, Any]]:
+    # Holds back one segment so a following repeat of the same text can extend it.
+    last_add_seg: Optional[Dict[str, Any]] = None
+    for curr_seg in segments:
+        if last_add_seg is not None:
+            curr_txt_norm = normalize_text_for_comparison(curr_seg.get('text', ''))
+            if curr_txt_norm == normalize_text_for_comparison(last_add_seg.get('text', '')) and curr_txt_norm != "": 
+                last_add_seg['end'] = curr_seg['end'] 
+                if curr_seg.get('words'): last_add_seg['words'] = (last_add_seg.get('words') or []) + curr_seg['words']
+                if script_verbose_flag: 
+                    text_content = curr_seg.get('text', '').strip() 
+                    print(f"INFO: Merged repetitive segment ({curr_seg['start']:.2f}s-{curr_seg['end']:.2f}s) for '{sanitize_for_print(filename(original_video_path))}'. Text: '{sanitize_for_print(text_content)}'", flush=True)
+                continue
+            yield last_add_seg
+        last_add_seg = dict(curr_seg)
+    if last_add_seg is not None:
+        yield last_add_seg
+
+class StreamingSubtitleWriter:
+    """Writes a file's subtitles while its chunks are still being transcribed.
+
+    Chunks may complete in any order; ``add_chunk`` releases them in timeline order behind an
+    ordered-completion watermark (the lowest chunk index not yet completed). Released segments flow
+    through the no-speech filter and repetition merge on a writer thread and are appended as finished
+    cues to one file per output format. Cues are flushed whenever the writer has caught up with the
+    released segments, so partial output is on disk during the run at one write per chunk, not per cue.
+    """
+
+    def __init__(self, original_video_path: str, target_paths: Dict[str, str], no_speech_thresh_val: float, merge_repetitive: bool, script_verbose_flag: bool):
+        # target_paths maps output format to file path; the first one is the path close() returns.
+        self.original_video_path = original_video_path
+        self.target_paths = target_paths
+        self.no_speech_thresh_val = no_speech_thresh_val
+        self.merge_repetitive = merge_repetitive
+        self.script_verbose_flag = script_verbose_flag
+        self._start()
+
+    def _start(self):
+        self.completed_chunks: Dict[int, List[Dict[str, Any]]] = {}
+        self.watermark = 0
+        self.segments_received = 0
+        self.cues_written = 0
+        self.write_failed = False
+        self.segment_queue: queue.Queue = queue.Queue()
+        self.writer_thread = threading.Thread(target=self._write_cues, name=f"srt-writer-{filename(self.original_video_path)}", daemon=True)
+        self.writer_thread.start()
+
+    def _write_cues(self):
+        released_segments = iter(self.segment_queue.get, _PIPELINE_END)
+        cues = filter_no_speech_segments(released_segments, self.no_speech_thresh_val, self.original_video_path, self.script_verbose_flag)
+        if self.merge_repetitive: cues = merge_repetitive_segments(cues, self.original_video_path, self.script_verbose_flag)
+        subtitle_writers = {}
+        target_path = None
+        try:
+            for cue in cues:
+                if not subtitle_writers:
+                    for output_format, target_path in self.target_paths.items():
+                        subtitle_writers[output_format] = SUBTITLE_FORMATS[output_format](open(target_path, "w", encoding="utf-8"))
+                for output_format, subtitle_writer in subtitle_writers.items():
+                    target_path = self.target_paths[output_format]
+                    subtitle_writer.write(cue)
+                    if self.segment_queue.empty(): subtitle_writer.flush()
+                self.cues_written += 1
+            for output_format, subtitle_writer in subtitle_writers.items():
+                target_path = self.target_paths[output_format]
+                subtitle_writer.close()
+        except IOError as e_io:
+            print(f"ERROR: Could not write subtitle file to {sanitize_for_print(str(target_path))}: {sanitize_for_print(str(e_io))}", file=sys.stderr, flush=True)
+            self.write_failed = True
+            for _ in released_segments: pass # Drain so add_chunk never blocks on a dead writer.
+        finally:
+            for subtitle_writer in subtitle_writers.values(): subtitle_writer.file.close()
+
+    def add_chunk(self, chunk_index: int, segments: List[Dict[str, Any]]):
+        self.completed_chunks[chunk_index] = segments
+        while self.watermark in self.completed_chunks:
+            for segment in self.completed_chunks.pop(self.watermark):
+                self.segment_queue.put(segment)
+                self.segments_received += 1
+            self.watermark += 1
+
+    def close(self) -> Optional[str]:
+        # Returns the first target path, or None (and removes any stale subtitle files) when nothing was written.
+        self.segment_queue.put(_PIPELINE_END)
+        self.writer_thread.join()
+        if self.completed_chunks:
+            print(f"WARNING: {len(self.completed_chunks)} chunk(s) of '{sanitize_for_print(filename(self.original_video_path))}' completed after a missing earlier chunk and were not written.", file=sys.stderr, flush=True)
+        if self.cues_written > 0 and not self.write_failed:
+            return next(iter(self.target_paths.values()))
+        if self.script_verbose_flag and not self.write_failed:
+            if self.segments_received == 0:
+                print(f"INFO: No segments transcribed for '{sanitize_for_print(filename(self.original_video_path))}'.", flush=True)
             else:
-                print(f"ERROR: VAD audio load failed for {sanitize_for_print(filename(original_video_path))}. Skipping VAD for this file.", file=sys.stderr, flush=True)
+                print(f"INFO: All segments for '{sanitize_for_print(filename(self.original_video_path))}' were filtered by no-speech threshold or transcription failed. No subtitles generated.", flush=True)
+        for target_path in self.target_paths.values():
+            if os.path.exists(target_path): 
+                try: os.remove(target_path)
+                except OSError: pass 
+        return None
 
-            if use_vad_for_this_file and full_waveform_for_vad is not None:
-                speech_ts_from_vad = get_speech_timestamps_from_vad(
-                    full_waveform_for_vad, sr_for_vad, VAD_MODEL, get_speech_timestamps_util, SAMPLING_RATE,
-                    vad_params["vad_threshold"], vad_params["min_speech_duration_ms"], vad_params["min_silence_duration_ms"]
-                )
+class MultiTaskSubtitleWriter:
+    """The StreamingSubtitleWriter interface for ``--task both``: every chunk's segments are split by their
+    ``task`` tag and streamed to one writer per task."""
 
-                if not speech_ts_from_vad:
-                    if script_verbose_flag: print(f"INFO: VAD found no speech in {sanitize_for_print(filename(original_video_path))}.", flush=True)
-                else:
-                    if script_verbose_flag: print(f"INFO: VAD found {len(speech_ts_from_vad)} speech segments. Preparing for transcription.", flush=True)
-                    
-                    tasks_for_pool = []
-                    for ts_chunk in speech_ts_from_vad:
-                        cs_s, cs_e = ts_chunk['start'], ts_chunk['end'] 
-                        c_start_sec = cs_s / SAMPLING_RATE 
-                        
-                        audio_chunk_np = full_waveform_for_vad[cs_s:cs_e].numpy().astype(np.float32)
-                        
-                        
-                        if len(audio_chunk_np) < 0.05 * SAMPLING_RATE: 
-                            if script_verbose_flag: print(f"INFO: Skipping very short VAD chunk (pre-pool) at {c_start_sec:.2f}s ({len(audio_chunk_np)/SAMPLING_RATE:.3f}s)", flush=True)
-                            continue
-
-                        worker_opts_for_pool = whisper_options_base.copy()
-                        worker_opts_for_pool["verbose"] = False 
-                        tasks_for_pool.append((audio_chunk_np, model_name_for_worker, model_root_for_worker, worker_opts_for_pool, c_start_sec))
-
-                    if full_waveform_for_vad is not None: 
-                        del full_waveform_for_vad; full_waveform_for_vad = None
-                        if torch.cuda.is_available(): torch.cuda.empty_cache()
-                        gc.collect()
-
-                    if tasks_for_pool:
-                        if num_workers_for_pool > 1 and len(tasks_for_pool) > 1 : 
-                            if script_verbose_flag: print(f"INFO: Using multiprocessing pool ({num_workers_for_pool} workers) for {len(tasks_for_pool)} VAD tasks.", flush=True)
-                            try:
-                                
-                                ctx = multiprocessing.get_context('spawn') 
-                                with ctx.Pool(processes=num_workers_for_pool) as pool:
-                                    results_from_pool = pool.map(transcribe_chunk_worker, tasks_for_pool)
-                                
-                                if script_verbose_flag: print(f"INFO: Pool.map finished. Received {len(results_from_pool)} result sets.", flush=True)
-                                for result_list in results_from_pool: 
-                                    all_transcribed_segments.extend(result_list)
-                            except Exception as e_pool:
-                                print(f"ERROR: Multiprocessing pool failed for {sanitize_for_print(filename(original_video_path))}: {sanitize_for_print(str(e_pool))}. Falling back to serial VAD processing for this file.", file=sys.stderr, flush=True)
-                                all_transcribed_segments = [] 
-                                use_vad_for_this_file = False 
-                        else: 
-                            if script_verbose_flag: print(f"INFO: Processing {len(tasks_for_pool)} VAD tasks serially for {sanitize_for_print(filename(original_video_path))}.", flush=True)
-                            for i_task, task_args_serial in enumerate(tasks_for_pool):
-                                audio_np_s, _, _, opts_s, start_s_s = task_args_serial
-                                if script_verbose_flag: print(f"INFO: Serial VAD task {i_task+1}/{len(tasks_for_pool)} starting for chunk at {start_s_s:.2f}s", flush=True)
-                                opts_s["verbose"] = False 
-                                with warnings.catch_warnings(): 
-                                    warnings.simplefilter("ignore")
-                                    result_s = main_whisper_model_obj.transcribe(audio_np_s, **opts_s)
-                                segs_s = result_s.get("segments", [])
-                                for s_s_item in segs_s: 
-                                    s_s_item['start'] += start_s_s 
-                                    s_s_item['end'] += start_s_s
-                                    all_transcribed_segments.append(s_s_item)
-                                if script_verbose_flag: print(f"INFO: Serial VAD task {i_task+1}/{len(tasks_for_pool)} finished. Found {len(segs_s)} segments.", flush=True)
-                    else: 
-                        if script_verbose_flag: print(f"INFO: No VAD tasks to process for {sanitize_for_print(filename(original_video_path))}. Transcribing full audio if VAD found no speech, or if all chunks were skipped.", flush=True)
-                        if not speech_ts_from_vad: 
-                             pass 
-                        else: 
-                             use_vad_for_this_file = False 
-
-        if not use_vad_for_this_file: 
-            if script_verbose_flag: print(f"INFO: VAD not used for {sanitize_for_print(filename(original_video_path))}. Transcribing full audio.", flush=True)
-            
-            current_whisper_opts = whisper_options_base.copy()
-            
-            current_whisper_opts["verbose"] = True if script_verbose_flag else None 
+    def __init__(self, writers_by_task: Dict[str, StreamingSubtitleWriter]):
+        self.writers_by_task = writers_by_task
+
+    def add_chunk(self, chunk_index: int, segments: List[Dict[str, Any]]):
+        for task, subtitle_writer in self.writers_by_task.items():
+            subtitle_writer.add_chunk(chunk_index, [segment for segment in segments if segment.get("task") == task])
+
+    def close(self) -> Optional[str]:
+        # Closes every writer and returns the transcription's path, which is the one burned in.
+        target_paths = {task: subtitle_writer.close() for task, subtitle_writer in self.writers_by_task.items()}
+        return target_paths[BOTH_TASKS[0]]
+
+# File name suffix per task for --task both: name.srt holds the transcription, name.en.srt the English translation.
+TASK_FILE_SUFFIXES = {"transcribe": "", "translate": ".en"}
+
+def get_subtitle_target_paths(
+    original_video_path: str, output_srt_flag: bool, output_dir_path: str, output_formats: List[str], file_suffix: str = ""
+) -> Dict[str, str]:
+    # Without --output_srt the subtitles only feed the burn-in and go to the temp directory. JSON comes last
+    # so that the first path, the one used for burn-in, is a format ffmpeg can render.
+    target_dir = output_dir_path if output_srt_flag else tempfile.gettempdir()
+    return {
+        output_format: os.path.join(target_dir, f"{filename(original_video_path)}{file_suffix}{SUBTITLE_FORMATS[output_format].extension}")
+        for output_format in sorted(output_formats, key=lambda output_format: output_format == "json")
+    }
+
+def make_streaming_subtitle_writer(
+    original_video_path: str, output_srt_flag: bool, output_dir_path: str, output_formats: List[str], task: str,
+    no_speech_thresh_val: float, merge_repetitive: bool, script_verbose_flag: bool
+) -> Union[StreamingSubtitleWriter, MultiTaskSubtitleWriter]:
+    if task != TASK_BOTH:
+        return StreamingSubtitleWriter(
+            original_video_path, get_subtitle_target_paths(original_video_path, output_srt_flag, output_dir_path, output_formats),
+            no_speech_thresh_val, merge_repetitive, script_verbose_flag
+        )
+    return MultiTaskSubtitleWriter({
+        task_name: StreamingSubtitleWriter(
+            original_video_path, get_subtitle_target_paths(original_video_path, output_srt_flag, output_dir_path, output_formats, TASK_FILE_SUFFIXES[task_name]),
+            no_speech_thresh_val, merge_repetitive, script_verbose_flag
+        )
+        for task_name in BOTH_TASKS
+    })
+
+def get_chunk_options_for_file(
+    original_video_path: str, main_backend: TranscriptionBackend, full_waveform_np: np.ndarray,
+    vad_chunks: List[Tuple[int, int, float]], whisper_options_base: Dict[str, Any], language_detection_chunks: int = 3
+) -> Dict[str, Any]:
+    # Decode options shared by every VAD chunk of one file, with the language pinned by a file-level vote.
+    worker_opts_for_pool = whisper_options_base.copy()
+    worker_opts_for_pool["verbose"] = False 
+    if worker_opts_for_pool.get("language") is None and main_backend.is_multilingual and language_detection_chunks > 0:
+        # Pin the language for every chunk instead of letting each transcribe() call detect it on its own.
+        try:
+            detected_language, language_probability = detect_language_for_file(main_backend, full_waveform_np, vad_chunks, language_detection_chunks)
+            worker_opts_for_pool["language"] = detected_language
+            PROGRESS.emit("language_detected", video=original_video_path, language=detected_language, probability=round(language_probability, 4))
+            print(f"INFO: Detected language: {whisper.tokenizer.LANGUAGES.get(detected_language, detected_language)} ({detected_language}, probability {language_probability:.2f}) for {sanitize_for_print(filename(original_video_path))}, "
+                  f"from {min(language_detection_chunks, len(vad_chunks))} sampled chunk(s) in one encoder pass; saves {len(vad_chunks)} per-chunk detection pass(es).", flush=True)
+        except Exception as e_lang:
+            print(f"WARNING: File-level language detection failed for {sanitize_for_print(filename(original_video_path))}: {sanitize_for_print(str(e_lang))}. Each chunk will detect its own language.", file=sys.stderr, flush=True)
+    return worker_opts_for_pool
+
+def make_pool_tasks(
+    shared_audio_block: shared_memory.SharedMemory, total_samples: int, chunk_batches: List[List[Tuple[int, int, float]]],
+    model_name_for_worker: str, model_root_for_worker: Optional[str], worker_opts_for_pool: Dict[str, Any], batch_size: int, backend_name: str = "whisper"
+) -> List[Tuple[Any, ...]]:
+    return [
+        (shared_audio_block.name, total_samples, chunk_batch, model_name_for_worker, model_root_for_worker, worker_opts_for_pool, batch_size, backend_name)
+        for chunk_batch in order_chunk_batches_longest_first(chunk_batches)
+    ]
+
+def chunk_batch_ranges(chunk_batch: List[Tuple[int, int, float]]) -> Tuple[Tuple[int, int], ...]:
+    return tuple((offset, length) for offset, length, _ in chunk_batch)
+
+def chunk_batch_audio_sec(chunk_batch: List[Tuple[int, int, float]]) -> float:
+    return sum(length for _, length, _ in chunk_batch) / 16000
 
+def report_file_plan(original_video_path: str, chunk_batches: List[List[Tuple[int, int, float]]], recovered_batches: Dict[int, Any]):
+    PROGRESS.file_planned(
+        original_video_path, sum(len(chunk_batch) for chunk_batch in chunk_batches), sum(chunk_batch_audio_sec(chunk_batch) for chunk_batch in chunk_batches),
+        sum(len(chunk_batches[i]) for i in recovered_batches), sum(chunk_batch_audio_sec(chunk_batches[i]) for i in recovered_batches)
+    )
+
+def recover_journaled_batches(
+    original_video_path: str, chunk_batches: List[List[Tuple[int, int, float]]], chunk_journal: Optional[ChunkJournal]
+) -> Dict[int, List[Dict[str, Any]]]:
+    # Segments of chunk batches finished by an earlier, interrupted run, by batch index.
+    if chunk_journal is None: return {}
+    journaled_batches = chunk_journal.load()
+    recovered_batches = {
+        i: journaled_batches[chunk_batch_ranges(chunk_batch)] for i, chunk_batch in enumerate(chunk_batches) if chunk_batch_ranges(chunk_batch) in journaled_batches
+    }
+    if recovered_batches:
+        recovered_sec = sum(length for i in recovered_batches for _, length, _ in chunk_batches[i]) / 16000
+        total_sec = sum(length for chunk_batch in chunk_batches for _, length, _ in chunk_batch) / 16000
+        print(f"INFO: Resuming {sanitize_for_print(filename(original_video_path))}: recovered {len(recovered_batches)} of {len(chunk_batches)} VAD task(s) "
+              f"({recovered_sec:.1f}s of {total_sec:.1f}s speech audio) from the checkpoint journal.", flush=True)
+    return recovered_batches
+
+def transcribe_prepared_audio(
+    original_video_path: str, prepared_audio: Dict[str, Any], main_backend: TranscriptionBackend, model_name_for_worker: str,
+    model_root_for_worker: Optional[str], whisper_options_base: Dict[str, Any], num_workers_for_pool: int, script_verbose_flag: bool,
+    warm_pool: Optional[WarmWorkerPool] = None, batch_size: int = 1, language_detection_chunks: int = 3,
+    subtitle_writer: Optional[Union[StreamingSubtitleWriter, MultiTaskSubtitleWriter]] = None, chunk_journal: Optional[ChunkJournal] = None, chunk_retries: int = 2,
+    cascade: Optional[ModelCascade] = None, collect_segments: bool = True
+) -> List[Dict[str, Any]]:
+    # Transcription stage: VAD chunks go to the worker pool or the main model; without usable VAD the
+    # whole file is transcribed in one call. Completed chunks are refined by the cascade (if any), then
+    # streamed to subtitle_writer and checkpointed in chunk_journal; chunks already in the journal are not
+    # transcribed again. Chunks that still fail after retries are listed in prepared_audio["failed_chunks"].
+    # For VAD chunks the file's segments are only collected with collect_segments (or without a subtitle_writer);
+    # otherwise each chunk's segments are let go once the writer has them, and an empty list is returned.
+    SAMPLING_RATE = 16000
+    all_transcribed_segments: List[Dict[str, Any]] = []
+    use_vad_for_this_file = prepared_audio["use_vad"]
+    vad_chunks: List[Tuple[int, int, float]] = prepared_audio["vad_chunks"]
+    full_waveform_np: Optional[np.ndarray] = prepared_audio["waveform"]
+
+    if use_vad_for_this_file and vad_chunks and full_waveform_np is not None:
+        chunk_batches = [vad_chunks[i:i + batch_size] for i in range(0, len(vad_chunks), max(1, batch_size))]
+        batch_index_by_start = {chunk_batch[0][2]: i for i, chunk_batch in enumerate(chunk_batches)}
+        keep_segments = collect_segments or subtitle_writer is None
+        recovered_batches = recover_journaled_batches(original_video_path, chunk_batches, chunk_journal)
+        report_file_plan(original_video_path, chunk_batches, recovered_batches)
+        if subtitle_writer is not None:
+            for i_batch, recovered_segments in recovered_batches.items(): subtitle_writer.add_chunk(i_batch, recovered_segments)
+        finished_batches = set(recovered_batches)
+        segments_by_batch = recovered_batches if keep_segments else {}
+        del recovered_batches
+        pending_batches = [chunk_batch for i, chunk_batch in enumerate(chunk_batches) if i not in finished_batches]
+        if pending_batches:
+            worker_opts_for_pool = get_chunk_options_for_file(
+                original_video_path, main_backend, full_waveform_np, vad_chunks, whisper_options_base, language_detection_chunks
+            )
+        pool_failed_batches: Dict[int, Tuple[Optional[str], int]] = {} # Batch index -> (last error, attempts) after the pool gave up.
+        failed_chunks: List[Dict[str, Any]] = []
+
+        def record_batch_result(i_batch: int, batch_segments: List[Dict[str, Any]]):
+            if cascade is not None:
+                batch_segments = cascade.refine(original_video_path, full_waveform_np, chunk_batches[i_batch], batch_segments, worker_opts_for_pool, batch_size)
+            finished_batches.add(i_batch)
+            if keep_segments: segments_by_batch[i_batch] = batch_segments
+            PROGRESS.chunk_done(original_video_path, chunk_batch_audio_sec(chunk_batches[i_batch]), len(chunk_batches[i_batch]))
+            if chunk_journal is not None: chunk_journal.append(list(chunk_batch_ranges(chunk_batches[i_batch])), batch_segments)
+            if subtitle_writer is not None: subtitle_writer.add_chunk(i_batch, batch_segments)
+
+        def stream_task_result(task_result: Dict[str, Any]):
+            i_batch = batch_index_by_start[task_result["chunk_start_sec"]]
+            if task_result["error"] is None:
+                record_batch_result(i_batch, task_result["segments"])
+            else:
+                pool_failed_batches[i_batch] = (task_result["error"], task_result["attempts"])
+
+        if num_workers_for_pool > 1 and len(pending_batches) > 1 : 
+            if script_verbose_flag: print(f"INFO: Using multiprocessing pool ({num_workers_for_pool} workers) for {len(pending_batches)} VAD tasks.", flush=True)
+            shared_audio_block = None
             try:
-                with warnings.catch_warnings(): 
-                    warnings.simplefilter("ignore")
-                    transcription_result = main_whisper_model_obj.transcribe(current_audio_path, **current_whisper_opts)
-                all_transcribed_segments = transcription_result.get("segments", [])
-            except UnicodeEncodeError as e_uni: 
+                shared_audio_block = create_shared_audio_block(full_waveform_np)
+                tasks_for_pool = make_pool_tasks(
+                    shared_audio_block, len(full_waveform_np), pending_batches, model_name_for_worker, model_root_for_worker, worker_opts_for_pool, batch_size, main_backend.name
+                )
                 if script_verbose_flag:
-                    print(f"INFO: Whisper's verbose output (if enabled) caused a UnicodeEncodeError for {sanitize_for_print(filename(original_video_path))}: {sanitize_for_print(str(e_uni))}.", flush=True)
-                    print(f"INFO: Retrying transcription for {sanitize_for_print(filename(original_video_path))} with Whisper's internal verbose output disabled...", flush=True)
-                
-                current_whisper_opts["verbose"] = False 
-                try:
-                    with warnings.catch_warnings():
-                        warnings.simplefilter("ignore")
-                        transcription_result = main_whisper_model_obj.transcribe(current_audio_path, **current_whisper_opts)
-                    all_transcribed_segments = transcription_result.get("segments", [])
-                except Exception as e_retry:
-                    print(f"ERROR: Transcription failed for {sanitize_for_print(filename(original_video_path))} even after disabling verbose: {sanitize_for_print(str(e_retry))}", file=sys.stderr, flush=True)
-                    all_transcribed_segments = [] 
-            except Exception as e_initial:
-                print(f"ERROR: Transcription failed for {sanitize_for_print(filename(original_video_path))}: {sanitize_for_print(str(e_initial))}", file=sys.stderr, flush=True)
-                all_transcribed_segments = [] 
-        
-        
-        speech_segments_after_silence_filter: List[Dict[str, Any]] = []
-        if not all_transcribed_segments:
-            if script_verbose_flag: print(f"INFO: No segments transcribed for '{sanitize_for_print(filename(original_video_path))}'.", flush=True)
-        else:
-            for segment in all_transcribed_segments:
-                seg_no_speech_p = segment.get("no_speech_prob", 0.0) 
-                if seg_no_speech_p < no_speech_thresh_val:
-                    speech_segments_after_silence_filter.append(segment)
+                    ipc_bytes = sum(len(pickle.dumps(task)) for task in tasks_for_pool)
+                    audio_bytes_shared = sum(length for chunk_batch in pending_batches for _, length, _ in chunk_batch) * 4
+                    print(f"INFO: Pool tasks pickle to {ipc_bytes / 1024:.1f} KiB; {audio_bytes_shared / (1024 * 1024):.1f} MiB of chunk audio is read from shared memory instead.", flush=True)
+                if warm_pool is not None:
+                    results_from_pool, pool_wall_sec, pool_busy_sec, pool_utilization, pool_lost_tasks = run_pool_tasks_longest_first(
+                        warm_pool.pool, tasks_for_pool, warm_pool.num_workers, warm_pool.task_events, chunk_retries, stream_task_result
+                    )
+                    warm_pool.files_served += 1
+                    warm_pool.record_utilization(pool_wall_sec, pool_busy_sec, pool_lost_tasks)
                 else:
-                    if script_verbose_flag:
-                        txt_prev = segment.get('text', '').strip()
-                        txt_prev_display = (txt_prev[:27] + "...") if len(txt_prev) > 30 else txt_prev
-                        print(f"INFO: Skipping silent segment ({segment['start']:.2f}s-{segment['end']:.2f}s) for '{sanitize_for_print(filename(original_video_path))}' (prob: {seg_no_speech_p:.2f} >= {no_speech_thresh_val:.2f}). Text: '{sanitize_for_print(txt_prev_display)}'", flush=True)
-        
-        if not speech_segments_after_silence_filter:
-            if script_verbose_flag and len(all_transcribed_segments) > 0 : 
-                print(f"INFO: All segments for '{sanitize_for_print(filename(original_video_path))}' were filtered by no-speech threshold or transcription failed. No SRT generated.", flush=True)
-            subtitles_path_map[original_video_path] = None 
-            if os.path.exists(target_srt_path): 
-                try: os.remove(target_srt_path)
-                except OSError: pass 
-            continue 
-
-        
-        final_segments_to_write: List[Dict[str, Any]] = []
-        if merge_repetitive and speech_segments_after_silence_filter:
-            final_segments_to_write.append(dict(speech_segments_after_silence_filter[0])) 
-            for i in range(1, len(speech_segments_after_silence_filter)):
-                curr_seg = speech_segments_after_silence_filter[i]
-                last_add_seg = final_segments_to_write[-1] 
+                    ctx = multiprocessing.get_context('spawn') 
+                    task_events = ctx.SimpleQueue()
+                    with ctx.Pool(processes=num_workers_for_pool, initializer=init_task_event_reporter, initargs=(task_events,)) as pool:
+                        results_from_pool, pool_wall_sec, pool_busy_sec, pool_utilization, _ = run_pool_tasks_longest_first(
+                            pool, tasks_for_pool, num_workers_for_pool, task_events, chunk_retries, stream_task_result
+                        )
                 
-                curr_txt_norm = normalize_text_for_comparison(curr_seg.get('text', ''))
-                prev_txt_norm = normalize_text_for_comparison(last_add_seg.get('text', ''))
-
-                if curr_txt_norm == prev_txt_norm and curr_txt_norm != "": 
-                    last_add_seg['end'] = curr_seg['end'] 
-                    if script_verbose_flag: 
-                        text_content = curr_seg.get('text', '').strip() 
-                        print(f"INFO: Merged repetitive segment ({curr_seg['start']:.2f}s-{curr_seg['end']:.2f}s) for '{sanitize_for_print(filename(original_video_path))}'. Text: '{sanitize_for_print(text_content)}'", flush=True)
-                else:
-                    final_segments_to_write.append(dict(curr_seg)) 
-        elif speech_segments_after_silence_filter: 
-            final_segments_to_write = [dict(s) for s in speech_segments_after_silence_filter] 
-        
-        if not final_segments_to_write: 
-            if script_verbose_flag: print(f"INFO: No segments remaining for '{sanitize_for_print(filename(original_video_path))}' after all processing. No SRT.", flush=True)
-            subtitles_path_map[original_video_path] = None
-            if os.path.exists(target_srt_path): 
-                try: os.remove(target_srt_path)
-                except OSError: pass
-            continue
+                pool_capacity_sec = pool_wall_sec * (warm_pool.num_workers if warm_pool is not None else num_workers_for_pool)
+                print(f"INFO: Transcribed {len(results_from_pool)} VAD tasks longest-first in {pool_wall_sec:.2f}s; worker utilization {pool_utilization:.0%}, "
+                      f"{max(0.0, pool_capacity_sec - pool_busy_sec):.2f}s worker idle time for {sanitize_for_print(filename(original_video_path))}.", flush=True)
+            except JobCancelledError:
+                raise
+            except Exception as e_pool:
+                print(f"ERROR: Multiprocessing pool failed for {sanitize_for_print(filename(original_video_path))}: {sanitize_for_print(str(e_pool))}. Transcribing its unfinished VAD chunks in the main process.", file=sys.stderr, flush=True)
+                PROGRESS.error(f"Multiprocessing pool failed: {e_pool}", original_video_path, level="warning")
+            finally:
+                if shared_audio_block is not None: release_shared_audio_block(shared_audio_block)
 
-        
+        # Whatever the pool did not finish (chunks that failed every retry, or all chunks without a pool) runs here.
+        remaining_batch_indices = [i for i in range(len(chunk_batches)) if i not in finished_batches]
+        if pool_failed_batches:
+            print(f"WARNING: {len(pool_failed_batches)} VAD task(s) of {sanitize_for_print(filename(original_video_path))} failed in the worker pool after retries. Re-running only those in the main process.", file=sys.stderr, flush=True)
+        elif remaining_batch_indices and script_verbose_flag:
+            print(f"INFO: Processing {sum(len(chunk_batches[i]) for i in remaining_batch_indices)} VAD tasks serially (batch size {batch_size}) for {sanitize_for_print(filename(original_video_path))}.", flush=True)
+        for i_task, i_batch in enumerate(remaining_batch_indices):
+            raise_if_job_cancelled()
+            chunk_batch_serial = chunk_batches[i_batch]
+            if script_verbose_flag: print(f"INFO: Serial VAD task {i_task+1}/{len(remaining_batch_indices)} starting for chunk at {chunk_batch_serial[0][2]:.2f}s", flush=True)
+            batch_segments_s, batch_error_s, attempts_s = transcribe_chunk_batch_in_main_process(
+                main_backend, full_waveform_np, chunk_batch_serial, worker_opts_for_pool, batch_size, chunk_retries
+            )
+            if batch_error_s is None:
+                record_batch_result(i_batch, batch_segments_s)
+            else:
+                failed_chunks.append(describe_failed_chunk_batch(chunk_batch_serial, batch_error_s, pool_failed_batches.get(i_batch, (None, 0))[1] + attempts_s))
+                PROGRESS.chunk_done(original_video_path, chunk_batch_audio_sec(chunk_batch_serial), len(chunk_batch_serial), batch_error_s)
+                finished_batches.add(i_batch)
+                if subtitle_writer is not None: subtitle_writer.add_chunk(i_batch, []) # Leave the hole and keep later chunks flowing.
+            if script_verbose_flag: print(f"INFO: Serial VAD task {i_task+1}/{len(remaining_batch_indices)} finished. Found {len(batch_segments_s)} segments.", flush=True)
+
+        prepared_audio["failed_chunks"] = failed_chunks
+        all_transcribed_segments = [segment for i_batch in sorted(segments_by_batch) for segment in segments_by_batch[i_batch]]
+        if failed_chunks:
+            print(f"ERROR: {len(failed_chunks)} VAD task(s) of {sanitize_for_print(filename(original_video_path))} could not be transcribed; their time ranges are missing from the subtitles.", file=sys.stderr, flush=True)
+            PROGRESS.error(f"{len(failed_chunks)} VAD task(s) could not be transcribed", original_video_path)
+        elif chunk_journal is not None:
+            chunk_journal.remove()
+
+        if script_verbose_flag:
+            peak_rss_mb = get_peak_rss_mb()
+            if peak_rss_mb is not None: print(f"INFO: Peak RSS of the main process so far: {peak_rss_mb:.1f} MiB.", flush=True)
+
+    del full_waveform_np
+    prepared_audio["waveform"] = None
+    if torch.cuda.is_available(): torch.cuda.empty_cache()
+    gc.collect()
+
+    if not use_vad_for_this_file: 
+        # The whole file is one chunk; its length is only known up front for audio decoded into memory.
+        full_audio_sec = len(prepared_audio["audio"]) / SAMPLING_RATE if isinstance(prepared_audio["audio"], np.ndarray) else None
+        PROGRESS.file_planned(original_video_path, 1, full_audio_sec)
+        all_transcribed_segments = transcribe_full_audio(original_video_path, prepared_audio["audio"], main_backend, whisper_options_base, script_verbose_flag)
+        PROGRESS.chunk_done(original_video_path, full_audio_sec)
+        if cascade is not None and all_transcribed_segments:
+            full_audio = prepared_audio["audio"] if isinstance(prepared_audio["audio"], np.ndarray) else whisper.load_audio(prepared_audio["audio"])
+            all_transcribed_segments = cascade.refine(original_video_path, full_audio, [(0, len(full_audio), 0.0)], all_transcribed_segments, whisper_options_base)
+            del full_audio
+        if subtitle_writer is not None: subtitle_writer.add_chunk(0, all_transcribed_segments)
+
+    if cascade is not None: cascade.report_file(original_video_path)
+
+    return all_transcribed_segments
+
+def transcribe_full_audio(
+    original_video_path: str, current_audio_path: Union[str, np.ndarray], main_backend: TranscriptionBackend,
+    whisper_options_base: Dict[str, Any], script_verbose_flag: bool
+) -> List[Dict[str, Any]]:
+    # Used when VAD is off, found nothing usable, or the chunked pool path failed.
+    if script_verbose_flag: print(f"INFO: VAD not used for {sanitize_for_print(filename(original_video_path))}. Transcribing full audio.", flush=True)
+
+    current_whisper_opts = whisper_options_base.copy()
+
+    current_whisper_opts["verbose"] = True if script_verbose_flag else None 
+    progress_callback = None
+    if PROGRESS.enabled: progress_callback = lambda done_sec, total_sec: PROGRESS.file_progress(original_video_path, done_sec, total_sec)
+
+    try:
+        with warnings.catch_warnings(): 
+            warnings.simplefilter("ignore")
+            all_transcribed_segments = main_backend.transcribe_all_tasks(current_audio_path, current_whisper_opts, progress_callback)
+    except UnicodeEncodeError as e_uni: 
+        if script_verbose_flag:
+            print(f"INFO: Whisper's verbose output (if enabled) caused a UnicodeEncodeError for {sanitize_for_print(filename(original_video_path))}: {sanitize_for_print(str(e_uni))}.", flush=True)
+            print(f"INFO: Retrying transcription for {sanitize_for_print(filename(original_video_path))} with Whisper's internal verbose output disabled...", flush=True)
+
+        current_whisper_opts["verbose"] = False 
         try:
-            with open(target_srt_path, "w", encoding="utf-8") as srt_file:
-                write_srt(final_segments_to_write, file=srt_file)
-            subtitles_path_map[original_video_path] = target_srt_path
-        except IOError as e_io:
-            print(f"ERROR: Could not write SRT file to {sanitize_for_print(target_srt_path)}: {sanitize_for_print(str(e_io))}", file=sys.stderr, flush=True)
-            subtitles_path_map[original_video_path] = None
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                all_transcribed_segments = main_backend.transcribe_all_tasks(current_audio_path, current_whisper_opts, progress_callback)
+        except Exception as e_retry:
+            print(f"ERROR: Transcription failed for {sanitize_for_print(filename(original_video_path))} even after disabling verbose: {sanitize_for_print(str(e_retry))}", file=sys.stderr, flush=True)
+            PROGRESS.error(f"Transcription failed: {e_retry}", original_video_path)
+            all_transcribed_segments = [] 
+    except Exception as e_initial:
+        print(f"ERROR: Transcription failed for {sanitize_for_print(filename(original_video_path))}: {sanitize_for_print(str(e_initial))}", file=sys.stderr, flush=True)
+        PROGRESS.error(f"Transcription failed: {e_initial}", original_video_path)
+        all_transcribed_segments = []
+    return all_transcribed_segments
+
+def write_failure_manifest(original_video_path: str, failed_chunks: List[Dict[str, Any]], output_dir_path: str) -> Optional[str]:
+    # <name>.failures.json lists the time ranges missing from the subtitles; a stale manifest is removed.
+    manifest_path = os.path.join(output_dir_path, f"{filename(original_video_path)}.failures.json")
+    if not failed_chunks:
+        if os.path.exists(manifest_path):
+            try: os.remove(manifest_path)
+            except OSError: pass
+        return None
+    try:
+        with open(manifest_path, "w", encoding="utf-8") as manifest_file:
+            json.dump({"video": original_video_path, "failed_chunks": failed_chunks}, manifest_file, ensure_ascii=False, indent=2)
+        print(f"WARNING: Wrote failure manifest for {len(failed_chunks)} untranscribed VAD task(s) to {sanitize_for_print(manifest_path)}.", file=sys.stderr, flush=True)
+        return manifest_path
+    except IOError as e_io:
+        print(f"ERROR: Could not write failure manifest to {sanitize_for_print(manifest_path)}: {sanitize_for_print(str(e_io))}", file=sys.stderr, flush=True)
+        return None
+
+def write_subtitles_for_file(
+    original_video_path: str, all_transcribed_segments: List[Dict[str, Any]], output_srt_flag: bool, output_dir_path: str,
+    no_speech_thresh_val: float, merge_repetitive: bool, script_verbose_flag: bool, output_formats: Optional[List[str]] = None,
+    task: str = "transcribe"
+) -> Optional[str]:
+    # Post-processing stage for segments that are already complete, e.g. from the transcription cache.
+    subtitle_writer = make_streaming_subtitle_writer(
+        original_video_path, output_srt_flag, output_dir_path, output_formats or ["srt"], task,
+        no_speech_thresh_val, merge_repetitive, script_verbose_flag
+    )
+    subtitle_writer.add_chunk(0, all_transcribed_segments)
+    return subtitle_writer.close()
+
+def get_transcription_cache_key(
+    audio_hash: str, model_name: str, whisper_options: Dict[str, Any], use_vad_processing: bool,
+    vad_params: Dict[str, Any], batch_size: int, quantize: str = "none", backend: str = "whisper",
+    cascade_params: Optional[Dict[str, Any]] = None, language_detection_chunks: int = 3
+) -> str:
+    # Everything that changes the raw Whisper segments is part of the key; post-processing options are not.
+    decode_options = {key: value for key, value in whisper_options.items() if key != "verbose"}
+    if quantize != "none": model_name = f"{model_name}:{quantize}" # Unquantized keys stay as they were.
+    if backend != "whisper": model_name = f"{backend}:{model_name}"
+    key_options = {"whisper": decode_options, "vad": vad_params if use_vad_processing else None, "batch_size": batch_size}
+    if cascade_params is not None: key_options["cascade"] = cascade_params
+    # With --language auto and VAD, the per-file vote decides which language every chunk is decoded in.
+    if decode_options.get("language") is None and use_vad_processing: key_options["language_detection_chunks"] = language_detection_chunks
+    return make_cache_key(audio_hash, model_name, key_options)
+
+def load_cached_segments(
+    transcription_cache: Optional[TranscriptionCache], cache_key: Optional[str], original_video_path: str
+) -> Optional[List[Dict[str, Any]]]:
+    if transcription_cache is None or cache_key is None: return None
+    cached_segments = transcription_cache.get(cache_key)
+    if cached_segments is not None:
+        print(f"INFO: Using cached transcription for {sanitize_for_print(filename(original_video_path))} ({len(cached_segments)} segments). Skipping VAD and Whisper.", flush=True)
+    return cached_segments
+
+def store_cached_segments(
+    transcription_cache: Optional[TranscriptionCache], cache_key: Optional[str], segments: List[Dict[str, Any]]
+):
+    # Empty results are not cached: they are cheap to recompute and may come from a failed transcription.
+    if transcription_cache is None or cache_key is None or not segments: return
+    try:
+        transcription_cache.put(cache_key, segments)
+    except Exception as e_cache:
+        print(f"WARNING: Could not write transcription cache entry: {sanitize_for_print(str(e_cache))}", file=sys.stderr, flush=True)
+
+def burn_subtitles_into_video(path: str, srt_path: Optional[str], output_dir: str, ffmpeg_exec_path: str = "ffmpeg") -> Optional[str]:
+    if not srt_path: 
+        print(f"Skipping video overlay for {sanitize_for_print(filename(path))} as no valid SRT was generated.", flush=True)
+        return None
+
+    out_path = os.path.join(output_dir, f"{filename(path)}.mp4")
+    print(f"Adding subtitles to {sanitize_for_print(filename(path))}...")
+
+    video = ffmpeg.input(path)
+    audio = video.audio 
+
+    try:
+        ffmpeg.concat(
+            # An .ass file brings its own styles; the other formats get the default box style.
+            video.filter('subtitles', srt_path) if srt_path.endswith(".ass") else video.filter('subtitles', srt_path, force_style="OutlineColour=&H40000000,BorderStyle=3"), audio, v=1, a=1
+        ).output(out_path).run(cmd=ffmpeg_exec_path, quiet=True, overwrite_output=True)
+        print(f"Saved subtitled video to {sanitize_for_print(os.path.abspath(out_path))}.")
+        return out_path
+    except ffmpeg.Error as e:
+        
+        error_message = e.stderr.decode('utf8', errors='ignore') if e.stderr else str(e)
+        print(f"Error during FFmpeg processing for {sanitize_for_print(filename(path))}: {sanitize_for_print(error_message)}", file=sys.stderr, flush=True)
+        print(f"Failed to add subtitles to {sanitize_for_print(filename(path))}. SRT file may still be available at: {sanitize_for_print(srt_path)}", file=sys.stderr, flush=True)
+        return None
+
+_PIPELINE_END = object()
+
+def run_staged_pipeline(
+    items: List[Any], stages: List[Tuple[str, Callable[[Any], Any]]], queue_depth: int = 1, script_verbose_flag: bool = False
+) -> List[Any]:
+    # Each stage runs in its own thread and hands its output to the next stage through a bounded queue,
+    # so e.g. file N+1 is being extracted and file N-1 burned in while file N is transcribed. The queue
+    # depth caps how many finished-but-unconsumed items (and their waveforms) each stage may hold.
+    stage_queues: List[queue.Queue] = [queue.Queue(maxsize=max(1, queue_depth)) for _ in range(len(stages) + 1)]
+    stage_busy_seconds: Dict[str, float] = {stage_name: 0.0 for stage_name, _ in stages}
+
+    def feed_items():
+        for item in items: stage_queues[0].put(item)
+        stage_queues[0].put(_PIPELINE_END)
+
+    def run_stage(stage_index: int):
+        stage_name, stage_func = stages[stage_index]
+        in_queue, out_queue = stage_queues[stage_index], stage_queues[stage_index + 1]
+        while True:
+            item = in_queue.get()
+            if item is _PIPELINE_END: break
+            stage_started_at = time.perf_counter()
+            try:
+                out_queue.put(stage_func(item))
+            except JobCancelledError:
+                pass
+            except Exception as e_stage:
+                print(f"ERROR: Pipeline stage '{stage_name}' failed: {sanitize_for_print(str(e_stage))}", file=sys.stderr, flush=True)
+                PROGRESS.error(f"Pipeline stage '{stage_name}' failed: {e_stage}", item if isinstance(item, str) else item.get("video") if isinstance(item, dict) else None)
+            finally:
+                stage_busy_seconds[stage_name] += time.perf_counter() - stage_started_at
+        out_queue.put(_PIPELINE_END)
+
+    pipeline_started_at = time.perf_counter()
+    pipeline_threads = [threading.Thread(target=feed_items, name="pipeline-feed", daemon=True)]
+    pipeline_threads += [threading.Thread(target=run_stage, args=(i,), name=f"pipeline-{stages[i][0]}", daemon=True) for i in range(len(stages))]
+    for pipeline_thread in pipeline_threads: pipeline_thread.start()
+
+    results: List[Any] = []
+    while True:
+        result = stage_queues[-1].get()
+        if result is _PIPELINE_END: break
+        results.append(result)
+    for pipeline_thread in pipeline_threads: pipeline_thread.join()
+
+    if script_verbose_flag:
+        wall_seconds = time.perf_counter() - pipeline_started_at
+        stage_summary = ", ".join(f"{stage_name} {busy:.1f}s" for stage_name, busy in stage_busy_seconds.items())
+        print(f"INFO: Pipeline finished in {wall_seconds:.1f}s wall-clock; busy time per stage: {stage_summary}.", flush=True)
+    return results
+
+def run_cross_file_batch(
+    items: List[Any], prepare_job: Callable[[Any], Dict[str, Any]], finish_job: Callable[[Dict[str, Any]], Any],
+    warm_pool: WarmWorkerPool, max_files_in_flight: int, script_verbose_flag: bool = False,
+    on_task_result: Optional[Callable[[Dict[str, Any], Dict[str, Any]], None]] = None, chunk_retries: int = 2
+):
+    # Batch mode: a producer thread prepares one file after another and puts each file's chunk tasks
+    # ("pool_tasks" in the job) on the shared warm pool right away, so chunks from all files are served by the
+    # same workers and the pool does not drain between files. Results (after retries) are routed back to
+    # their file in job["pool_results"] on this thread; on_task_result sees every chunk as it arrives and takes
+    # its segments, which pool_results then leaves out. As soon as a file's last chunk completes it is handed
+    # to a finisher thread for finish_job (main-process fallback, SRT finalization, burn-in), so a long
+    # burn-in never holds up other files' results. Jobs
+    # without pool tasks are finished as they are. At most max_files_in_flight prepared files (and their
+    # shared audio) exist at once.
+    events: queue.Queue = queue.Queue()
+    files_in_flight = threading.Semaphore(max(1, max_files_in_flight))
+    task_runner = ChunkTaskRunner(warm_pool.pool, warm_pool.task_events, chunk_retries, lambda job, task_result: events.put(("result", job, task_result)))
+
+    def produce_jobs():
+        for item in items:
+            files_in_flight.acquire()
+            try:
+                job = prepare_job(item)
+            except JobCancelledError:
+                files_in_flight.release()
+                continue
+            except Exception as e_prepare:
+                print(f"ERROR: Preparing {sanitize_for_print(str(item))} for the cross-file batch failed: {sanitize_for_print(str(e_prepare))}", file=sys.stderr, flush=True)
+                PROGRESS.error(f"Preparing for the cross-file batch failed: {e_prepare}", str(item))
+                files_in_flight.release()
+                continue
+            pool_tasks = job.get("pool_tasks") or []
+            events.put(("scheduled", job, len(pool_tasks))) # Queued before any of its results can arrive.
+            if pool_tasks: warm_pool.files_served += 1
+            for pool_task in pool_tasks: task_runner.submit(pool_task, job)
+        events.put(("done", None, None))
+
+    finish_queue: queue.Queue = queue.Queue()
+
+    def finish_jobs():
+        for job in iter(finish_queue.get, _PIPELINE_END):
+            try:
+                finish_job(job)
+            except JobCancelledError:
+                pass
+            except Exception as e_finish:
+                print(f"ERROR: Finishing {sanitize_for_print(filename(job.get('video', '')))} in the cross-file batch failed: {sanitize_for_print(str(e_finish))}", file=sys.stderr, flush=True)
+                PROGRESS.error(f"Finishing in the cross-file batch failed: {e_finish}", job.get("video"))
+            finally:
+                files_in_flight.release()
+
+    producer_thread = threading.Thread(target=produce_jobs, name="cross-file-producer", daemon=True)
+    finisher_thread = threading.Thread(target=finish_jobs, name="cross-file-finisher", daemon=True)
+    batch_started_at = time.perf_counter()
+    producer_thread.start()
+    finisher_thread.start()
+
+    pending_jobs: Dict[int, Dict[str, Any]] = {}
+    producer_done = False
+    try:
+        while not producer_done or pending_jobs:
+            try:
+                event_kind, job, payload = events.get(timeout=JOB_CANCEL_POLL_SEC)
+            except queue.Empty:
+                event_kind = None
+            if JOB_CANCEL.is_set():
+                # Files still waiting for chunks are handed over as they are; finish_job stops at its cancellation check.
+                for pending_job in pending_jobs.values(): finish_queue.put(pending_job["job"])
+                pending_jobs.clear()
+            if event_kind is None: continue
+            if event_kind == "done":
+                producer_done = True
+                continue
+            if event_kind == "scheduled":
+                job["pool_results"] = []
+                if payload > 0 and not JOB_CANCEL.is_set():
+                    pending_jobs[id(job)] = {"job": job, "remaining": payload}
+                    continue
+            else:
+                if id(job) not in pending_jobs: continue # A late result of a file handed over after a cancel.
+                if on_task_result is not None:
+                    on_task_result(job, payload)
+                    payload = {key: value for key, value in payload.items() if key != "segments"}
+                job["pool_results"].append(payload)
+                pending_jobs[id(job)]["remaining"] -= 1
+                if pending_jobs[id(job)]["remaining"] > 0: continue
+                del pending_jobs[id(job)]
+                job["pool_results"].sort(key=lambda task_result: task_result["chunk_start_sec"])
+            finish_queue.put(job)
+        producer_thread.join()
+    finally:
+        finish_queue.put(_PIPELINE_END)
+        finisher_thread.join()
+        task_runner.close()
 
-    return subtitles_path_map
+    wall_sec = time.perf_counter() - batch_started_at
+    warm_pool.record_utilization(wall_sec, task_runner.busy_sec, task_runner.lost_tasks)
+    if script_verbose_flag:
+        capacity_sec = wall_sec * warm_pool.num_workers
+        print(f"INFO: Cross-file batch of {len(items)} file(s) finished in {wall_sec:.1f}s; worker utilization {min(1.0, task_runner.busy_sec / capacity_sec) if capacity_sec > 0 else 0.0:.0%} "
+              f"including extraction and VAD of the first file; {task_runner.retries} chunk retry(ies).", flush=True)
 
 if __name__ == '__main__':
     if os.name == 'nt': 
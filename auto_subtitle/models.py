@@ -0,0 +1,282 @@
+from __future__ import annotations
+import os
+import sys
+import json
+import hashlib
+import tempfile
+import warnings
+import itertools
+from dataclasses import asdict
+from typing import Any, Dict, Optional, Tuple, Union
+
+from .utils import LazyModule
+
+torch = LazyModule("torch")
+whisper = LazyModule("whisper")
+
+# Same list as whisper.available_models(), kept static so validating --model does not import whisper and torch.
+# New official models need adding here.
+MODEL_NAMES = [
+    "tiny.en", "tiny", "base.en", "base", "small.en", "small", "medium.en", "medium",
+    "large-v1", "large-v2", "large-v3", "large", "large-v3-turbo", "turbo",
+]
+
+# Bumped whenever the layout of the converted weights file changes, so older conversions are redone.
+MMAP_WEIGHTS_FORMAT_VERSION = 2
+
+QUANTIZATION_MODES = ["none", "int8"]
+
+
+def get_download_root(download_root: Optional[str]) -> str:
+    # Same default as whisper.load_model.
+    if download_root is not None: return download_root
+    default_cache = os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(os.getenv("XDG_CACHE_HOME", default_cache), "whisper")
+
+
+def resolve_checkpoint(model_name: str, download_root: Optional[str]) -> Optional[Tuple[str, Optional[str], Optional[bytes]]]:
+    # (checkpoint path, expected SHA256 or None, alignment heads dump or None) for an official model name
+    # or a checkpoint path. The checkpoint may not have been downloaded yet. Official names are looked up in
+    # whisper's private _MODELS / _ALIGNMENT_HEADS tables; None means this whisper version does not have
+    # them in the expected shape, and callers fall back to plain whisper.load_model.
+    model_urls = getattr(whisper, "_MODELS", None)
+    alignment_heads = getattr(whisper, "_ALIGNMENT_HEADS", None)
+    if not isinstance(model_urls, dict) or not isinstance(alignment_heads, dict):
+        return (model_name, None, None) if os.path.isfile(model_name) else None
+    if model_name in model_urls:
+        model_url = model_urls[model_name]
+        if not isinstance(model_url, str) or model_url.count("/") < 2: return None
+        return os.path.join(get_download_root(download_root), os.path.basename(model_url)), model_url.split("/")[-2], alignment_heads.get(model_name)
+    return model_name, None, None
+
+
+def warn_unresolved_checkpoint(model_name: str):
+    print(
+        f"WARNING: This whisper version does not expose the model tables needed to locate the checkpoint of '{model_name}'; "
+        "loading it with whisper.load_model without a memory-mapped or cached quantized copy.", file=sys.stderr, flush=True
+    )
+
+
+def get_mmap_weights_paths(checkpoint_path: str, variant: str = "mmap") -> Tuple[str, str]:
+    # The converted weights and their marker sit next to the original checkpoint; variant is "mmap" for the
+    # float32 conversion or a --quantize mode.
+    base_path = os.path.splitext(checkpoint_path)[0]
+    return f"{base_path}.{variant}.pt", f"{base_path}.{variant}.json"
+
+
+def sha256_of_file(path: str) -> str:
+    hasher = hashlib.sha256()
+    with open(path, "rb") as checkpoint_file:
+        for block in iter(lambda: checkpoint_file.read(1 << 20), b""):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+def read_mmap_weights_marker(checkpoint_path: str, expected_sha256: Optional[str], variant: str = "mmap") -> Optional[Dict[str, Any]]:
+    # The marker is trusted only while the checkpoint and the converted file still have the size and mtime
+    # recorded when the checksum was verified; any change means the checkpoint is hashed again.
+    weights_path, marker_path = get_mmap_weights_paths(checkpoint_path, variant)
+    try:
+        with open(marker_path, "r", encoding="utf-8") as marker_file:
+            marker = json.load(marker_file)
+        checkpoint_stat = os.stat(checkpoint_path)
+        weights_stat = os.stat(weights_path)
+    except (OSError, ValueError):
+        return None
+    if (
+        marker.get("format_version") != MMAP_WEIGHTS_FORMAT_VERSION
+        or (expected_sha256 is not None and marker.get("sha256") != expected_sha256)
+        or marker.get("checkpoint_size") != checkpoint_stat.st_size or marker.get("checkpoint_mtime_ns") != checkpoint_stat.st_mtime_ns
+        or marker.get("weights_size") != weights_stat.st_size or marker.get("weights_mtime_ns") != weights_stat.st_mtime_ns
+    ):
+        return None
+    return marker
+
+
+def write_atomically(target_path: str, write: Any):
+    # Written to a temp file in the same directory and renamed into place, so readers never see a partial file.
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(target_path) or ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as temp_file:
+            write(temp_file)
+        os.replace(temp_path, target_path)
+    except BaseException:
+        try: os.remove(temp_path)
+        except OSError: pass
+        raise
+
+
+def convert_checkpoint_to_mmap_weights(
+    model: whisper.Whisper, checkpoint_path: str, checkpoint_sha256: str, checkpoint_stat: os.stat_result, variant: str = "mmap"
+):
+    # The state dict is stored as the model runs it (float32 on CPU, where the original fp16 checkpoint is
+    # upcast on every load, or already quantized), so a later load can use the tensors as they are.
+    weights_path, marker_path = get_mmap_weights_paths(checkpoint_path, variant)
+    # The state dict object itself is saved: its _metadata carries the module versions quantized layers need.
+    state_dict = model.state_dict()
+    converted_weights = {"dims": asdict(model.dims), "model_state_dict": state_dict, "unsaved_buffers": get_unsaved_buffers(model)}
+    write_atomically(weights_path, lambda weights_file: torch.save(converted_weights, weights_file))
+    weights_stat = os.stat(weights_path)
+    marker = {
+        "format_version": MMAP_WEIGHTS_FORMAT_VERSION, "checkpoint": os.path.basename(checkpoint_path), "sha256": checkpoint_sha256,
+        "checkpoint_size": checkpoint_stat.st_size, "checkpoint_mtime_ns": checkpoint_stat.st_mtime_ns,
+        "weights_size": weights_stat.st_size, "weights_mtime_ns": weights_stat.st_mtime_ns,
+    }
+    write_atomically(marker_path, lambda marker_file: marker_file.write(json.dumps(marker, indent=2).encode("utf-8")))
+
+
+def build_empty_whisper_model(dims: Dict[str, Any]) -> whisper.Whisper:
+    # Floating-point tensors are created on the meta device, so no memory is allocated or randomly initialized
+    # for weights that load_whisper_state replaces anyway. This is torch.device("meta") except for integer and
+    # bool tensors, which stay on the CPU: whisper builds its alignment_heads mask with to_sparse(), which meta
+    # tensors do not support. Like torch.device, the mode only applies to the calling thread.
+    factory_functions = {torch.empty, torch.zeros, torch.ones, torch.full, torch.rand, torch.randn}
+
+    class EmptyWeightsMode(torch.overrides.TorchFunctionMode):
+        def __torch_function__(self, func, types, args=(), kwargs=None):
+            kwargs = dict(kwargs or {})
+            if func in factory_functions and kwargs.get("device") is None and (kwargs.get("dtype") or torch.get_default_dtype()).is_floating_point:
+                kwargs["device"] = "meta"
+            return func(*args, **kwargs)
+
+    with EmptyWeightsMode():
+        return whisper.Whisper(whisper.ModelDimensions(**dims))
+
+
+def get_unsaved_buffers(model: whisper.Whisper) -> Dict[str, torch.Tensor]:
+    # Buffers registered with persistent=False (whisper's attention mask and alignment heads) are not part of the
+    # state dict, so they are carried next to it for load_whisper_state.
+    saved_names = set(model.state_dict(keep_vars=True))
+    return {name: buffer for name, buffer in model.named_buffers() if name not in saved_names}
+
+
+def load_whisper_state(model: whisper.Whisper, state_dict: Dict[str, torch.Tensor], unsaved_buffers: Dict[str, torch.Tensor]) -> whisper.Whisper:
+    # With assign=True the given tensors become the model's parameters as they are (mapped file pages,
+    # shared-memory views) instead of being copied into the placeholders of build_empty_whisper_model.
+    model.load_state_dict(state_dict, assign=True)
+    for name, buffer in unsaved_buffers.items():
+        module_name, _, buffer_name = name.rpartition(".")
+        model.get_submodule(module_name).register_buffer(buffer_name, buffer, persistent=False)
+    still_empty = [name for name, tensor in itertools.chain(model.named_parameters(), model.named_buffers()) if tensor.is_meta]
+    if still_empty: raise RuntimeError(f"no values were loaded for {', '.join(still_empty)}")
+    return model
+
+
+def load_converted_weights(weights_path: str) -> Dict[str, Any]:
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore") # torch.load notes that it validates the sparse alignment_heads buffer.
+        return torch.load(weights_path, map_location="cpu", mmap=True, weights_only=True)
+
+
+def load_mmap_weights(weights_path: str, alignment_heads: Optional[bytes]) -> whisper.Whisper:
+    # Tensors are views of the mapped file; pages are read on first use and shared through the page cache
+    # by every process that maps the same file.
+    checkpoint = load_converted_weights(weights_path)
+    model = load_whisper_state(build_empty_whisper_model(checkpoint["dims"]), checkpoint["model_state_dict"], checkpoint["unsaved_buffers"])
+    if alignment_heads is not None:
+        model.set_alignment_heads(alignment_heads)
+    return model
+
+
+def quantize_whisper_model_int8(model: whisper.Whisper) -> whisper.Whisper:
+    # Dynamic quantization: Linear weights are stored as int8 and activations are quantized per batch, so no
+    # calibration data is needed. quantize_dynamic matches module types exactly, so whisper's Linear subclass
+    # (which differs only by casting its weights to an fp16 input's dtype, which does not occur on CPU) gets
+    # its own qconfig_spec and mapping entries. Its from_float hands the quantized Linear a plain nn.Linear
+    # holding the same parameters, since from_float rejects subclasses.
+    class WhisperLinearToDynamic:
+        @staticmethod
+        def from_float(module, use_precomputed_fake_quant=False):
+            float_linear = torch.nn.Linear(module.in_features, module.out_features, bias=module.bias is not None, device="meta")
+            float_linear.weight, float_linear.bias, float_linear.qconfig = module.weight, module.bias, module.qconfig
+            return torch.ao.nn.quantized.dynamic.Linear.from_float(float_linear, use_precomputed_fake_quant=use_precomputed_fake_quant)
+
+    mapping = dict(torch.ao.quantization.quantization_mappings.get_default_dynamic_quant_module_mappings())
+    mapping[whisper.model.Linear] = WhisperLinearToDynamic
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore") # torch.ao.quantization deprecation notices
+        return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear, whisper.model.Linear}, dtype=torch.qint8, mapping=mapping, inplace=True)
+
+
+def load_int8_weights(weights_path: str, alignment_heads: Optional[bytes]) -> whisper.Whisper:
+    # The quantized layers are put in place empty (cheap; nothing is observed or rounded) and then filled
+    # from the cached state dict, which skips loading the float32 weights and quantizing them again.
+    checkpoint = load_converted_weights(weights_path)
+    model = build_empty_whisper_model(checkpoint["dims"])
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        for module_name, module in list(model.named_modules()):
+            if type(module) is not whisper.model.Linear: continue
+            parent_name, _, attribute_name = module_name.rpartition(".")
+            quantized_linear = torch.ao.nn.quantized.dynamic.Linear(module.in_features, module.out_features, bias_=module.bias is not None, dtype=torch.qint8)
+            setattr(model.get_submodule(parent_name), attribute_name, quantized_linear)
+        load_whisper_state(model, checkpoint["model_state_dict"], checkpoint["unsaved_buffers"])
+    if alignment_heads is not None:
+        model.set_alignment_heads(alignment_heads)
+    return model
+
+
+def load_quantized_whisper_model(model_name: str, download_root: Optional[str], quantize: str, mmap_weights: bool = True, convert: bool = True) -> whisper.Whisper:
+    # Quantized models run on the CPU only. The quantized state dict is cached next to the checkpoint under
+    # the same kind of marker as the float32 conversion, so each process after the first one just loads it.
+    resolved_checkpoint = resolve_checkpoint(model_name, download_root)
+    if resolved_checkpoint is None:
+        warn_unresolved_checkpoint(model_name)
+        return quantize_whisper_model_int8(whisper.load_model(model_name, device="cpu", download_root=download_root))
+    checkpoint_path, expected_sha256, alignment_heads = resolved_checkpoint
+    try:
+        if read_mmap_weights_marker(checkpoint_path, expected_sha256, quantize) is not None:
+            return load_int8_weights(get_mmap_weights_paths(checkpoint_path, quantize)[0], alignment_heads)
+    except Exception as e:
+        print(f"WARNING: Could not load the cached {quantize} weights of '{model_name}' ({e}); quantizing again.", file=sys.stderr, flush=True)
+
+    model = quantize_whisper_model_int8(load_whisper_model(model_name, download_root, "cpu", mmap_weights, convert))
+    if convert and os.path.isfile(checkpoint_path):
+        try:
+            checkpoint_stat = os.stat(checkpoint_path)
+            convert_checkpoint_to_mmap_weights(model, checkpoint_path, expected_sha256 or sha256_of_file(checkpoint_path), checkpoint_stat, quantize)
+        except Exception as e:
+            print(f"WARNING: Could not cache the {quantize} weights of '{model_name}': {e}", file=sys.stderr, flush=True)
+    return model
+
+
+def load_whisper_model(
+    model_name: str, download_root: Optional[str] = None, device: Optional[Union[str, torch.device]] = None, mmap_weights: bool = True,
+    convert: bool = True, quantize: str = "none"
+) -> whisper.Whisper:
+    """Load a Whisper model like ``whisper.load_model``, using a memory-mapped copy of its weights when possible.
+
+    The first load verifies the checkpoint's SHA256, converts it into a file ``torch.load(mmap=True)``
+    can map and writes a marker with the checksum, size and mtime next to it. Later loads map that file
+    instead of reading and re-hashing the whole checkpoint. With ``convert=False`` an existing conversion
+    is used but none is written. Falls back to ``whisper.load_model`` if anything goes wrong. With
+    ``quantize="int8"`` the model is dynamically quantized for the CPU (and ``device`` is ignored).
+    """
+    if quantize != "none":
+        return load_quantized_whisper_model(model_name, download_root, quantize, mmap_weights, convert)
+    if device is None:
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+    if not mmap_weights:
+        return whisper.load_model(model_name, device=device, download_root=download_root)
+
+    resolved_checkpoint = resolve_checkpoint(model_name, download_root)
+    if resolved_checkpoint is None:
+        warn_unresolved_checkpoint(model_name)
+        return whisper.load_model(model_name, device=device, download_root=download_root)
+    checkpoint_path, expected_sha256, alignment_heads = resolved_checkpoint
+    try:
+        if read_mmap_weights_marker(checkpoint_path, expected_sha256) is not None:
+            return load_mmap_weights(get_mmap_weights_paths(checkpoint_path)[0], alignment_heads).to(device)
+    except Exception as e:
+        print(f"WARNING: Could not map the converted weights of '{model_name}' ({e}); loading the checkpoint instead.", file=sys.stderr, flush=True)
+
+    # whisper.load_model downloads a missing checkpoint and verifies the checksum of an existing one.
+    model = whisper.load_model(model_name, device="cpu", download_root=download_root)
+    if convert and os.path.isfile(checkpoint_path):
+        try:
+            # Official checkpoints were just verified against their published checksum by whisper.load_model.
+            checkpoint_stat = os.stat(checkpoint_path)
+            convert_checkpoint_to_mmap_weights(model, checkpoint_path, expected_sha256 or sha256_of_file(checkpoint_path), checkpoint_stat)
+        except Exception as e:
+            print(f"WARNING: Could not write memory-mapped weights for '{model_name}': {e}", file=sys.stderr, flush=True)
+    return model.to(device)
@@ -0,0 +1,110 @@
+import os
+import json
+import time
+import threading
+from typing import Any, Dict, IO, Optional
+
+PROGRESS_FORMATS = ["text", "jsonl"]
+
+
+def open_progress_stream(progress_fd: int) -> IO[str]:
+    # On Windows only the standard fds are inherited, so a parent hands over an inheritable OS handle
+    # instead, which is turned into a C runtime fd here.
+    if os.name == "nt" and progress_fd > 2:
+        import msvcrt
+        progress_fd = msvcrt.open_osfhandle(progress_fd, os.O_WRONLY)
+    return os.fdopen(progress_fd, "w", encoding="utf-8", buffering=1, closefd=progress_fd > 2)
+
+
+class ProgressReporter:
+    """Typed progress events written as JSON lines, for ``--progress_format jsonl``.
+
+    Every event has ``event`` (its type) and ``time`` (seconds since the reporter was created). Chunk
+    events carry the file's audio seconds done and in total, the real-time factor so far and an ETA, so
+    a GUI never has to parse log text. ``file_progress`` events report the same fields from inside a
+    chunk that is still decoding, at most every ``FILE_PROGRESS_INTERVAL_SEC``. A reporter without a
+    stream drops every event.
+    """
+
+    FILE_PROGRESS_INTERVAL_SEC = 0.5
+
+    def __init__(self, stream: Optional[IO[str]] = None):
+        self.stream = stream
+        self.started_at = time.perf_counter()
+        self.lock = threading.Lock()
+        self.files: Dict[str, Dict[str, float]] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.stream is not None
+
+    def emit(self, event: str, **fields: Any):
+        if self.stream is None: return
+        event_line = json.dumps({"event": event, "time": round(time.perf_counter() - self.started_at, 3), **fields}, ensure_ascii=False)
+        with self.lock:
+            try:
+                self.stream.write(event_line + "\n")
+                self.stream.flush()
+            except (OSError, ValueError):
+                self.stream = None # The reader went away; progress reporting must never fail a run.
+
+    def error(self, message: str, video: Optional[str] = None, level: str = "error"):
+        self.emit("error", level=level, video=video, message=message)
+
+    def file_planned(self, video: str, chunks: int, audio_sec: Optional[float], done_chunks: int = 0, done_audio_sec: float = 0.0):
+        # Chunks already done (recovered from a checkpoint journal) count towards progress but not the real-time factor.
+        if self.stream is None: return
+        with self.lock:
+            self.files[video] = {
+                "chunks": chunks, "audio_sec": audio_sec, "done_chunks": done_chunks, "done_audio_sec": done_audio_sec,
+                "recovered_audio_sec": done_audio_sec, "started_at": time.perf_counter(), "partial_audio_sec": 0.0, "progress_emitted_at": 0.0,
+            }
+        self.emit("file_planned", video=video, chunks=chunks, audio_sec=None if audio_sec is None else round(audio_sec, 3),
+                  done_chunks=done_chunks, done_audio_sec=round(done_audio_sec, 3))
+
+    def chunk_done(self, video: str, audio_sec: Optional[float], chunks: int = 1, error: Optional[str] = None):
+        # One finished (or finally failed) chunk batch of a file announced with file_planned. audio_sec None
+        # stands for the rest of the file, e.g. a whole file whose length only file_progress learned.
+        if self.stream is None: return
+        with self.lock:
+            file_state = self.files.get(video)
+            if file_state is None: return
+            if audio_sec is None: audio_sec = max(0.0, (file_state["audio_sec"] or 0.0) - file_state["done_audio_sec"])
+            file_state["done_chunks"] += chunks
+            file_state["done_audio_sec"] += audio_sec
+            file_state["partial_audio_sec"] = 0.0
+            chunk_fields = self.progress_fields(file_state)
+        self.emit("chunk_done", video=video, audio_sec=round(audio_sec, 3), error=error, **chunk_fields)
+
+    def file_progress(self, video: str, chunk_done_sec: float, chunk_total_sec: float):
+        # Progress inside the chunk being decoded, e.g. a whole file transcribed without VAD. A file whose
+        # length was unknown when it was planned takes the chunk's total as its own.
+        if self.stream is None: return
+        with self.lock:
+            file_state = self.files.get(video)
+            if file_state is None: return
+            if file_state["audio_sec"] is None and file_state["chunks"] == 1: file_state["audio_sec"] = chunk_total_sec
+            file_state["partial_audio_sec"] = chunk_done_sec
+            now = time.perf_counter()
+            if now - file_state["progress_emitted_at"] < self.FILE_PROGRESS_INTERVAL_SEC: return
+            file_state["progress_emitted_at"] = now
+            progress_fields = self.progress_fields(file_state)
+        self.emit("file_progress", video=video, **progress_fields)
+
+    @staticmethod
+    def progress_fields(file_state: Dict[str, float]) -> Dict[str, Any]:
+        audio_done_sec = file_state["done_audio_sec"] + file_state["partial_audio_sec"]
+        decoded_audio_sec = audio_done_sec - file_state["recovered_audio_sec"]
+        real_time_factor = (time.perf_counter() - file_state["started_at"]) / decoded_audio_sec if decoded_audio_sec > 0 else None
+        eta_sec = None
+        if real_time_factor is not None and file_state["audio_sec"] is not None:
+            eta_sec = real_time_factor * max(0.0, file_state["audio_sec"] - audio_done_sec)
+        return {
+            "chunks_done": int(file_state["done_chunks"]), "chunks": int(file_state["chunks"]),
+            "audio_done_sec": round(audio_done_sec, 3), "audio_total_sec": None if file_state["audio_sec"] is None else round(file_state["audio_sec"], 3),
+            "rtf": None if real_time_factor is None else round(real_time_factor, 4), "eta_sec": None if eta_sec is None else round(eta_sec, 1),
+        }
+
+    def file_finished(self, video: str, srt_path: Optional[str]):
+        with self.lock: self.files.pop(video, None)
+        self.emit("file_finished", video=video, srt=srt_path, ok=srt_path is not None)
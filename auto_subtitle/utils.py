@@ -1,5 +1,9 @@
 import os
-from typing import Iterator, TextIO
+import sys
+import json
+import types
+import importlib
+from typing import Any, Dict, Iterator, List, TextIO, Type
 
 
 def str2bool(string):
@@ -13,7 +17,7 @@ def str2bool(string):
             f"Expected one of {set(str2val.keys())}, got {string}")
 
 
-def format_timestamp(seconds: float, always_include_hours: bool = False):
+def format_timestamp(seconds: float, always_include_hours: bool = False, decimal_marker: str = ","):
     assert seconds >= 0, "non-negative timestamp expected"
     milliseconds = round(seconds * 1000.0)
 
@@ -27,20 +31,173 @@ def format_timestamp(seconds: float, always_include_hours: bool = False):
     milliseconds -= seconds * 1_000
 
     hours_marker = f"{hours:02d}:" if always_include_hours or hours > 0 else ""
-    return f"{hours_marker}{minutes:02d}:{seconds:02d},{milliseconds:03d}"
+    return f"{hours_marker}{minutes:02d}:{seconds:02d}{decimal_marker}{milliseconds:03d}"
 
 
-def write_srt(transcript: Iterator[dict], file: TextIO):
-    for i, segment in enumerate(transcript, start=1):
-        print(
-            f"{i}\n"
-            f"{format_timestamp(segment['start'], always_include_hours=True)} --> "
-            f"{format_timestamp(segment['end'], always_include_hours=True)}\n"
-            f"{segment['text'].strip().replace('-->', '->')}\n",
-            file=file,
-            flush=True,
+def format_ass_timestamp(seconds: float):
+    assert seconds >= 0, "non-negative timestamp expected"
+    centiseconds = round(seconds * 100.0)
+    hours, centiseconds = divmod(centiseconds, 360_000)
+    minutes, centiseconds = divmod(centiseconds, 6_000)
+    seconds, centiseconds = divmod(centiseconds, 100)
+    return f"{hours}:{minutes:02d}:{seconds:02d}.{centiseconds:02d}"
+
+
+def format_srt_cue(index: int, segment: dict) -> str:
+    return (
+        f"{index}\n"
+        f"{format_timestamp(segment['start'], always_include_hours=True)} --> "
+        f"{format_timestamp(segment['end'], always_include_hours=True)}\n"
+        f"{segment['text'].strip().replace('-->', '->')}\n"
+    )
+
+
+class SubtitleWriter:
+    """Collects formatted cues for an open subtitle file and writes them out in one call per ``flush``.
+
+    Subclasses set ``extension`` and implement ``format_cue``; ``header`` and ``footer`` frame the cues.
+    Nothing reaches the file before the first ``flush``, and ``close`` adds the footer and flushes (it
+    does not close the file).
+    """
+
+    extension = ""
+
+    def __init__(self, file: TextIO):
+        self.file = file
+        self.cues_written = 0
+        self.buffer: List[str] = [self.header()]
+
+    def header(self) -> str:
+        return ""
+
+    def footer(self) -> str:
+        return ""
+
+    def format_cue(self, index: int, segment: dict) -> str:
+        raise NotImplementedError
+
+    def write(self, segment: dict):
+        self.cues_written += 1
+        self.buffer.append(self.format_cue(self.cues_written, segment))
+
+    def flush(self):
+        if self.buffer:
+            self.file.write("".join(self.buffer))
+            self.buffer = []
+        self.file.flush()
+
+    def close(self):
+        self.buffer.append(self.footer())
+        self.flush()
+
+
+class SrtWriter(SubtitleWriter):
+    extension = ".srt"
+
+    def format_cue(self, index: int, segment: dict) -> str:
+        return format_srt_cue(index, segment) + "\n"
+
+
+class VttWriter(SubtitleWriter):
+    extension = ".vtt"
+
+    def header(self) -> str:
+        return "WEBVTT\n\n"
+
+    def format_cue(self, index: int, segment: dict) -> str:
+        return (
+            f"{format_timestamp(segment['start'], always_include_hours=True, decimal_marker='.')} --> "
+            f"{format_timestamp(segment['end'], always_include_hours=True, decimal_marker='.')}\n"
+            f"{segment['text'].strip().replace('-->', '->')}\n\n"
+        )
+
+
+class AssWriter(SubtitleWriter):
+    # The style matches the force_style used for burn-in: outlined text on a translucent box.
+    extension = ".ass"
+
+    def header(self) -> str:
+        return (
+            "[Script Info]\nScriptType: v4.00+\nPlayResX: 384\nPlayResY: 288\nWrapStyle: 0\nScaledBorderAndShadow: yes\n\n"
+            "[V4+ Styles]\n"
+            "Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, Bold, Italic, Underline, StrikeOut, "
+            "ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding\n"
+            "Style: Default,Arial,16,&H00FFFFFF,&H000000FF,&H40000000,&H40000000,0,0,0,0,100,100,0,0,3,1,0,2,10,10,10,1\n\n"
+            "[Events]\nFormat: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text\n"
         )
 
+    def format_cue(self, index: int, segment: dict) -> str:
+        text = segment["text"].strip().replace("{", "\\{").replace("}", "\\}").replace("\n", "\\N")
+        return f"Dialogue: 0,{format_ass_timestamp(segment['start'])},{format_ass_timestamp(segment['end'])},Default,,0,0,0,,{text}\n"
+
+
+class JsonWriter(SubtitleWriter):
+    """A JSON array with one object per cue: index, start, end, text and, when the backend produced them, word timings."""
+
+    extension = ".json"
+
+    def header(self) -> str:
+        return "["
+
+    def footer(self) -> str:
+        return "\n]\n" if self.cues_written else "]\n"
+
+    def format_cue(self, index: int, segment: dict) -> str:
+        cue = {"index": index, "start": round(segment["start"], 3), "end": round(segment["end"], 3), "text": segment["text"].strip()}
+        if segment.get("words"):
+            cue["words"] = [
+                {"word": word["word"], "start": round(word["start"], 3), "end": round(word["end"], 3), "probability": round(word.get("probability", 1.0), 4)}
+                for word in segment["words"]
+            ]
+        return ("\n" if index == 1 else ",\n") + json.dumps(cue, ensure_ascii=False)
+
+
+SUBTITLE_FORMATS: Dict[str, Type[SubtitleWriter]] = {"srt": SrtWriter, "vtt": VttWriter, "ass": AssWriter, "json": JsonWriter}
+
+
+def output_formats_arg(value: str) -> List[str]:
+    output_formats = []
+    for output_format in value.lower().split(","):
+        output_format = output_format.strip()
+        if output_format not in SUBTITLE_FORMATS:
+            raise ValueError(f"Expected a comma-separated list of {list(SUBTITLE_FORMATS)}, got {value!r}")
+        if output_format not in output_formats: output_formats.append(output_format)
+    return output_formats
+
+
+def write_subtitles(transcript: Iterator[dict], file: TextIO, output_format: str = "srt"):
+    subtitle_writer = SUBTITLE_FORMATS[output_format](file)
+    for segment in transcript:
+        subtitle_writer.write(segment)
+    subtitle_writer.close()
+
+
+def write_srt(transcript: Iterator[dict], file: TextIO):
+    write_subtitles(transcript, file, "srt")
+
 
 def filename(path):
     return os.path.splitext(os.path.basename(path))[0]
+
+
+def sanitize_for_print(text_to_print: str) -> str:
+    try:
+        
+        if sys.stdout.encoding and sys.stdout.encoding.lower() not in ['utf-8', 'utf8']:
+            return text_to_print.encode(sys.stdout.encoding, errors='replace').decode(sys.stdout.encoding, errors='ignore')
+        return text_to_print
+    except Exception: 
+        
+        return "".join(c if ord(c) < 128 else '?' for c in text_to_print)
+
+
+class LazyModule(types.ModuleType):
+    """Stands in for a heavy module (torch, whisper, numpy, ...) until one of its attributes is used.
+
+    ``auto_subtitle --help`` and argument errors then return without importing torch, and each stage
+    only pays for the libraries it actually touches.
+    """
+
+    def __getattr__(self, attribute_name: str) -> Any:
+        module = sys.modules.get(self.__name__) or importlib.import_module(self.__name__)
+        return getattr(module, attribute_name)
@@ -0,0 +1,86 @@
+# Startup cost of the CLI: `python -X importtime` for `import auto_subtitle.cli` plus the wall-clock time of
+# `python -m auto_subtitle.cli --help`. Lists the slowest imports and fails (exit status 1) when a heavy
+# library is imported at startup again or the import takes longer than --max_import_ms.
+#
+#   python benchmarks/import_time_benchmark.py --runs 5
+
+import os
+import re
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+from typing import Dict, List, Tuple
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Libraries the CLI defers until the stage that needs them.
+HEAVY_MODULES = ["torch", "whisper", "numpy", "ffmpeg", "soundfile", "torchaudio", "faster_whisper", "ctranslate2", "silero_vad"]
+
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def run_importtime(module_name: str) -> List[Tuple[str, int, int, int]]:
+    # (module, self us, cumulative us, nesting depth) for every module imported, in import order.
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module_name}"], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+    )
+    imports = []
+    for line in completed.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            imports.append((match.group(4), int(match.group(1)), int(match.group(2)), (len(match.group(3)) - 1) // 2))
+    return imports
+
+
+def time_help(runs: int) -> List[float]:
+    durations = []
+    for _ in range(runs):
+        started_at = time.perf_counter()
+        subprocess.run([sys.executable, "-m", "auto_subtitle.cli", "--help"], cwd=REPO_ROOT, capture_output=True, check=True)
+        durations.append(time.perf_counter() - started_at)
+    return durations
+
+
+def main():
+    parser = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument("--module", type=str, default="auto_subtitle.cli", help="module whose import is profiled")
+    parser.add_argument("--runs", type=int, default=5, help="number of --help runs and import profiles; medians are reported")
+    parser.add_argument("--top", type=int, default=15, help="how many of the slowest imports to list")
+    parser.add_argument("--max_import_ms", type=float, default=500, help="fail when the median cumulative import time exceeds this")
+    args = parser.parse_args()
+
+    profiles = [run_importtime(args.module) for _ in range(max(1, args.runs))]
+    totals_ms = [next(cumulative for name, _, cumulative, _ in profile if name == args.module) / 1000 for profile in profiles]
+    median_profile = profiles[totals_ms.index(sorted(totals_ms)[len(totals_ms) // 2])]
+    # -X importtime lists nested imports before the module that triggered them, one indent level deeper.
+    module_index = next(i for i, (name, _, _, _) in enumerate(median_profile) if name == args.module)
+    module_depth = median_profile[module_index][3]
+    direct_imports: Dict[str, int] = {}
+    for name, _, cumulative, depth in reversed(median_profile[:module_index]):
+        if depth <= module_depth: break
+        if depth == module_depth + 1: direct_imports[name] = cumulative
+
+    print(f"import {args.module}: median {statistics.median(totals_ms):.1f} ms over {len(totals_ms)} run(s) (min {min(totals_ms):.1f} ms, max {max(totals_ms):.1f} ms)")
+    print(f"Slowest direct imports of {args.module} (cumulative ms, including their own imports):")
+    for name, cumulative in sorted(direct_imports.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {cumulative / 1000:9.1f}  {name}")
+
+    help_durations = time_help(max(1, args.runs))
+    print(f"auto_subtitle --help: median {statistics.median(help_durations) * 1000:.0f} ms wall clock, interpreter start-up included")
+
+    imported_names = {name.split(".")[0] for name, _, _, _ in median_profile}
+    eager_heavy_modules = [name for name in HEAVY_MODULES if name in imported_names]
+    failed = False
+    if eager_heavy_modules:
+        print(f"FAIL: heavy module(s) imported at startup: {', '.join(eager_heavy_modules)}")
+        failed = True
+    if statistics.median(totals_ms) > args.max_import_ms:
+        print(f"FAIL: import time above --max_import_ms {args.max_import_ms:.0f}")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# Compares the float32 Whisper model with its --quantize int8 version on the same audio:
+# real-time factor (transcription seconds per second of audio) and word-level agreement of the transcripts.
+#
+#   python benchmarks/quantization_benchmark.py sample.wav --model small --language en
+
+import os
+import sys
+import time
+import argparse
+import difflib
+import warnings
+from typing import Dict, List
+
+import torch
+import whisper
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from auto_subtitle.cli import normalize_text_for_comparison
+from auto_subtitle.models import load_whisper_model
+
+
+def transcribe_timed(model: whisper.Whisper, audio, language: str) -> Dict[str, float]:
+    started_at = time.perf_counter()
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        result = model.transcribe(audio, language=language, temperature=0.0, fp16=False, verbose=None)
+    return {"seconds": time.perf_counter() - started_at, "text": result["text"]}
+
+
+def word_agreement(reference_text: str, candidate_text: str) -> float:
+    # Share of the reference words that line up with identical words in the candidate transcript.
+    reference_words = normalize_text_for_comparison(reference_text).split()
+    candidate_words = normalize_text_for_comparison(candidate_text).split()
+    if not reference_words: return 1.0 if not candidate_words else 0.0
+    matcher = difflib.SequenceMatcher(a=reference_words, b=candidate_words, autojunk=False)
+    return sum(block.size for block in matcher.get_matching_blocks()) / len(reference_words)
+
+
+def main():
+    parser = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument("audio", nargs="+", type=str, help="audio or video files to transcribe with both models")
+    parser.add_argument("--model", default="small", choices=whisper.available_models(), help="name of the Whisper model to compare")
+    parser.add_argument("--model_download_root", type=str, default=None, help="root directory of the Whisper model cache")
+    parser.add_argument("--language", type=str, default="en", help="language passed to both models, so detection does not differ between them")
+    parser.add_argument("--threads", type=int, default=0, help="torch intra-op threads; 0 keeps torch's default")
+    args = parser.parse_args()
+
+    if args.threads > 0: torch.set_num_threads(args.threads)
+    models = {
+        "fp32": load_whisper_model(args.model, args.model_download_root, device="cpu"),
+        "int8": load_whisper_model(args.model, args.model_download_root, quantize="int8"),
+    }
+    totals: Dict[str, float] = {"audio": 0.0, "fp32": 0.0, "int8": 0.0}
+    agreements: List[float] = []
+    for audio_path in args.audio:
+        audio = whisper.load_audio(audio_path)
+        audio_seconds = len(audio) / whisper.audio.SAMPLE_RATE
+        runs = {name: transcribe_timed(model, audio, args.language) for name, model in models.items()}
+        agreement = word_agreement(runs["fp32"]["text"], runs["int8"]["text"])
+        agreements.append(agreement)
+        totals["audio"] += audio_seconds
+        for name in models: totals[name] += runs[name]["seconds"]
+        print(f"{os.path.basename(audio_path)}: {audio_seconds:.1f}s audio; RTF fp32 {runs['fp32']['seconds'] / audio_seconds:.3f}, "
+              f"int8 {runs['int8']['seconds'] / audio_seconds:.3f}; word agreement {agreement:.1%}", flush=True)
+
+    if totals["audio"] > 0:
+        print(f"Overall ({args.model}, {torch.get_num_threads()} thread(s)): RTF fp32 {totals['fp32'] / totals['audio']:.3f}, "
+              f"int8 {totals['int8'] / totals['audio']:.3f} ({totals['fp32'] / max(totals['int8'], 1e-9):.2f}x faster); "
+              f"mean word agreement {sum(agreements) / len(agreements):.1%}", flush=True)
+
+
+if __name__ == "__main__":
+    main()
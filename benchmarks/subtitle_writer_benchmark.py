@@ -0,0 +1,78 @@
+# Throughput of the subtitle writers on a synthetic transcript: cues per second and MB/s for every format in
+# SUBTITLE_FORMATS (one write per flush), against the old SRT writer that printed and flushed every cue.
+#
+#   python benchmarks/subtitle_writer_benchmark.py --cues 100000 --runs 3
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import statistics
+from typing import Callable, Dict, List, TextIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from auto_subtitle.utils import SUBTITLE_FORMATS, format_srt_cue, str2bool, write_subtitles
+
+WORDS = ["the", "subtitle", "writer", "speech", "model", "window", "audio", "chunk", "language", "time", "video", "quick"]
+
+
+def make_transcript(cue_count: int, with_words: bool) -> List[dict]:
+    random_source = random.Random(0)
+    transcript, start_sec = [], 0.0
+    for _ in range(cue_count):
+        segment_words, word_start_sec = [], start_sec
+        for word in random_source.choices(WORDS, k=random_source.randint(4, 12)):
+            word_end_sec = word_start_sec + random_source.uniform(0.15, 0.4)
+            segment_words.append({"word": f" {word}", "start": word_start_sec, "end": word_end_sec, "probability": random_source.random()})
+            word_start_sec = word_end_sec
+        segment = {"start": start_sec, "end": word_start_sec, "text": "".join(word["word"] for word in segment_words)}
+        if with_words: segment["words"] = segment_words
+        transcript.append(segment)
+        start_sec = word_start_sec + random_source.uniform(0.0, 1.5)
+    return transcript
+
+
+def write_srt_per_cue_flush(transcript: List[dict], file: TextIO):
+    # The writer before the format registry: one print and one flush per cue.
+    for index, segment in enumerate(transcript, start=1):
+        print(format_srt_cue(index, segment), file=file, flush=True)
+
+
+def time_writer(write: Callable[[List[dict], TextIO], None], transcript: List[dict], runs: int) -> Dict[str, float]:
+    durations, size_bytes = [], 0
+    with tempfile.TemporaryDirectory() as temp_dir:
+        target_path = os.path.join(temp_dir, "transcript")
+        for _ in range(runs):
+            started_at = time.perf_counter()
+            with open(target_path, "w", encoding="utf-8") as file:
+                write(transcript, file)
+            durations.append(time.perf_counter() - started_at)
+        size_bytes = os.path.getsize(target_path)
+    seconds = statistics.median(durations)
+    return {"seconds": seconds, "cues_per_sec": len(transcript) / seconds, "mb_per_sec": size_bytes / seconds / 1e6, "size_mb": size_bytes / 1e6}
+
+
+def main():
+    parser = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument("--cues", type=int, default=100_000, help="number of cues in the synthetic transcript")
+    parser.add_argument("--runs", type=int, default=3, help="runs per writer; the median is reported")
+    parser.add_argument("--word_timings", type=str2bool, default=True, help="give every segment word timings (only the json format writes them)")
+    args = parser.parse_args()
+
+    transcript = make_transcript(args.cues, args.word_timings)
+    writers: Dict[str, Callable[[List[dict], TextIO], None]] = {"srt (per-cue flush)": write_srt_per_cue_flush}
+    for output_format in SUBTITLE_FORMATS:
+        writers[output_format] = lambda transcript, file, output_format=output_format: write_subtitles(iter(transcript), file, output_format)
+
+    print(f"{len(transcript)} cues, median of {args.runs} run(s)")
+    print(f"{'writer':<22}{'seconds':>10}{'cues/s':>12}{'MB/s':>9}{'MB':>8}")
+    results = {name: time_writer(write, transcript, max(1, args.runs)) for name, write in writers.items()}
+    for name, result in results.items():
+        print(f"{name:<22}{result['seconds']:>10.3f}{result['cues_per_sec']:>12.0f}{result['mb_per_sec']:>9.1f}{result['size_mb']:>8.1f}")
+    print(f"Buffered SRT is {results['srt (per-cue flush)']['seconds'] / results['srt']['seconds']:.1f}x the per-cue flushing writer.")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,8 @@ import threading
 import sys
 import multiprocessing
 import time
+import json
+import queue
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 VENV_SCRIPTS_DIR = SCRIPT_DIR
@@ -44,6 +46,27 @@ except NotImplementedError:
 
 
 DEFAULT_OUTPUT_DIR = os.path.join(os.path.expanduser("~"), "Desktop")
+# Output choice for --task both: subtitles in the spoken language and an English translation from one run.
+BOTH_OUTPUT_LANGUAGES = "Original + English"
+PROGRESS_POLL_MS = 250
+
+
+def open_progress_pipe():
+    # The CLI writes its --progress_format jsonl events to the pipe's write end, which only the child inherits.
+    # Returns (read file, write fd to close once the child started, --progress_fd value, extra Popen arguments).
+    read_fd, write_fd = os.pipe()
+    if os.name == 'nt':
+        import msvcrt
+        write_handle = msvcrt.get_osfhandle(write_fd)
+        os.set_handle_inheritable(write_handle, True)
+        startupinfo = subprocess.STARTUPINFO()
+        startupinfo.lpAttributeList = {"handle_list": [write_handle]}
+        popen_kwargs = {"startupinfo": startupinfo}
+        progress_fd_arg = str(write_handle)
+    else:
+        popen_kwargs = {"pass_fds": (write_fd,)}
+        progress_fd_arg = str(write_fd)
+    return os.fdopen(read_fd, "r", encoding="utf-8", errors="replace"), write_fd, progress_fd_arg, popen_kwargs
 
 
 class SubtitleApp:
@@ -58,6 +81,12 @@ class SubtitleApp:
         self.pause_event = threading.Event()
         self.pause_event.set() 
         self.current_process = None
+        self.daemon_process = None
+        self.daemon_events = None
+        self.daemon_job_counter = 0
+        # Filled from any thread and drained by _poll_daemon_output on the Tk thread every PROGRESS_POLL_MS.
+        self.pending_log_lines = queue.Queue()
+        self.progress_events = queue.Queue()
         self.current_video_index = 0
         self.is_processing = False 
 
@@ -99,7 +128,7 @@ class SubtitleApp:
         self.output_language_var = tk.StringVar(master)
         self.output_language_var.set(DEFAULT_LANGUAGE_DISPLAY_NAME)
         self.output_language_dropdown = ttk.Combobox(options_frame, textvariable=self.output_language_var,
-                                                     values=list(LANGUAGES_MAP.keys()), state="readonly", width=25)
+                                                     values=list(LANGUAGES_MAP.keys()) + [BOTH_OUTPUT_LANGUAGES], state="readonly", width=25)
         self.output_language_dropdown.grid(row=2, column=1, sticky=tk.EW, padx=5, pady=2, columnspan=2)
 
         no_speech_label = tk.Label(options_frame, text="No Speech Threshold (Whisper):")
@@ -186,6 +215,14 @@ class SubtitleApp:
         self.stop_button = tk.Button(control_button_frame, text="Stop Processing", command=self._handle_stop, bg="salmon", width=15, state=tk.DISABLED)
         self.stop_button.pack(side=tk.LEFT, padx=5)
 
+        progress_frame = tk.Frame(master)
+        progress_frame.pack(padx=10, fill=tk.X)
+        self.file_progress = ttk.Progressbar(progress_frame, orient='horizontal', mode='determinate', maximum=100)
+        self.file_progress.pack(fill=tk.X)
+        self.progress_status_var = tk.StringVar(master, value="")
+        self.progress_status_label = tk.Label(progress_frame, textvariable=self.progress_status_var, fg="grey", anchor=tk.W)
+        self.progress_status_label.pack(fill=tk.X)
+
         self.log_label = tk.Label(master, text="Log Output:")
         self.log_label.pack(anchor=tk.W, padx=10)
         self.log_text = scrolledtext.ScrolledText(master, height=10, width=80, state=tk.DISABLED, wrap=tk.WORD)
@@ -193,6 +230,7 @@ class SubtitleApp:
 
         self.toggle_vad_options()
         self.check_paths()
+        self.master.after(PROGRESS_POLL_MS, self._poll_daemon_output)
         
     def _get_num_workers_tooltip_text(self):
         max_cores = os.cpu_count() or 1
@@ -262,19 +300,58 @@ class SubtitleApp:
 
 
     def log_message(self, message, color=None, no_newline=False):
-        def _update_log():
+        # Safe from any thread; the text is inserted by the next _poll_daemon_output.
+        self.pending_log_lines.put((str(message) + ("" if no_newline else "\n"), color))
+
+    def _poll_daemon_output(self):
+        # Runs on the Tk thread: log lines queued since the last poll are inserted in one go, and of the daemon's
+        # progress events only the latest state per tick reaches the progress bar.
+        log_lines = []
+        while True:
+            try: log_lines.append(self.pending_log_lines.get_nowait())
+            except queue.Empty: break
+        if log_lines:
             self.log_text.config(state=tk.NORMAL)
-            msg_str = str(message)
-            if color:
-                tag_name = f"color_{color.replace(' ', '_').replace(':', '')}"
-                self.log_text.tag_configure(tag_name, foreground=color)
-                self.log_text.insert(tk.END, msg_str + ("" if no_newline else "\n"), tag_name)
-            else:
-                self.log_text.insert(tk.END, msg_str + ("" if no_newline else "\n"))
+            for msg_str, color in log_lines:
+                if color:
+                    tag_name = f"color_{color.replace(' ', '_').replace(':', '')}"
+                    self.log_text.tag_configure(tag_name, foreground=color)
+                    self.log_text.insert(tk.END, msg_str, tag_name)
+                else:
+                    self.log_text.insert(tk.END, msg_str)
             self.log_text.see(tk.END)
             self.log_text.config(state=tk.DISABLED)
-        if self.master.winfo_exists(): 
-            self.master.after(0, _update_log)
+
+        latest_chunk_event = None
+        while True:
+            try: event = self.progress_events.get_nowait()
+            except queue.Empty: break
+            if event["event"] == "file_planned":
+                self.file_progress['value'] = 0
+                self.progress_status_var.set(f"{os.path.basename(event['video'])}: {event['chunks']} chunk(s) of speech to transcribe")
+                latest_chunk_event = None
+            elif event["event"] in ("chunk_done", "file_progress"):
+                latest_chunk_event = event
+            elif event["event"] == "language_detected":
+                self.log_message(f"Detected language of {os.path.basename(event['video'])}: {event['language']} (probability {event['probability']:.2f})", "green")
+            elif event["event"] == "error":
+                video_name = f"{os.path.basename(event['video'])}: " if event.get("video") else ""
+                self.log_message(f"{event['level'].upper()}: {video_name}{event['message']}", "red" if event["level"] == "error" else "orange")
+            elif event["event"] == "file_finished":
+                self.file_progress['value'] = 100 if event["ok"] else 0
+                latest_chunk_event = None
+
+        if latest_chunk_event is not None:
+            event = latest_chunk_event
+            if event["audio_total_sec"]: self.file_progress['value'] = 100 * event["audio_done_sec"] / event["audio_total_sec"]
+            else: self.file_progress['value'] = 100 * event["chunks_done"] / max(1, event["chunks"])
+            status = f"{os.path.basename(event['video'])}: {event['chunks_done']}/{event['chunks']} chunk(s)"
+            if event["rtf"] is not None: status += f", {event['rtf']:.2f}x real time"
+            if event["eta_sec"] is not None: status += f", about {int(event['eta_sec'] // 60)}m {int(event['eta_sec'] % 60):02d}s left"
+            self.progress_status_var.set(status)
+
+        if self.master.winfo_exists():
+            self.master.after(PROGRESS_POLL_MS, self._poll_daemon_output)
 
     def select_files(self):
         files = filedialog.askopenfilenames(
@@ -409,26 +486,111 @@ class SubtitleApp:
         if not self.is_processing: 
             return
 
-        self.log_message("Stop requested. Attempting to terminate current task...", "red")
+        self.log_message("Stop requested. Cancelling the current job...", "red")
         self.stop_event.set()
         self.pause_event.set() 
 
+        # Only the running job is cancelled: the daemon keeps its models loaded for the next Start.
         if self.current_process and self.current_process.poll() is None:
             try:
-                self.log_message(f"Terminating subprocess PID: {self.current_process.pid}", "gray")
-                self.current_process.terminate()
-                self.current_process.wait(timeout=3) 
-            except subprocess.TimeoutExpired:
-                self.log_message("Subprocess did not terminate gracefully, killing.", "red")
-                self.current_process.kill()
-                self.current_process.wait(timeout=2) 
+                self.log_message(f"Cancelling job {self.daemon_job_counter} in daemon PID: {self.current_process.pid}", "gray")
+                self.current_process.stdin.write(json.dumps({"command": "cancel", "id": self.daemon_job_counter}) + "\n")
+                self.current_process.stdin.flush()
             except Exception as e:
-                self.log_message(f"Error during subprocess termination: {e}", "red")
+                self.log_message(f"Error while cancelling the daemon job: {e}", "red")
             self.current_process = None
         
         self.stop_button.config(state=tk.DISABLED)
 
 
+    def _start_daemon(self):
+        # One auto_subtitle daemon per session keeps the models loaded from one file to the next. It is
+        # started on first use, and again if it exited (Stop only cancels its job). Returns True once it is ready.
+        if self.daemon_process and self.daemon_process.poll() is None:
+            return True
+        command = [
+            PYTHON_EXECUTABLE, "-u", "-m", "auto_subtitle.cli", "--daemon", "True",
+            "--srt_only", "True", "--output_srt", "True", "--verbose", "True", "--resume", "True",
+            "--ffmpeg_executable_path", FFMPEG_EXECUTABLE_PATH, "--model_download_root", MODEL_CACHE_ROOT_DIR
+        ]
+        progress_file, progress_write_fd, progress_fd_arg, progress_popen_kwargs = open_progress_pipe()
+        command += ["--progress_format", "jsonl", "--progress_fd", progress_fd_arg]
+        command_str = ' '.join(f'"{arg}"' if ' ' in arg else arg for arg in command)
+        self.log_message(f"Starting subtitle daemon: {command_str}")
+
+        process_flags = 0
+        if os.name == 'nt': process_flags = subprocess.CREATE_NO_WINDOW
+        process_env = os.environ.copy()
+        ffmpeg_bin_dir = os.path.dirname(FFMPEG_EXECUTABLE_PATH)
+        process_env["PATH"] = ffmpeg_bin_dir + os.pathsep + process_env.get("PATH", "")
+        process_env["PYTHONUTF8"] = "1"
+
+        self.daemon_events = queue.Queue()
+        try:
+            self.daemon_process = subprocess.Popen(
+                command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+                bufsize=1, cwd=VENV_SCRIPTS_DIR, creationflags=process_flags,
+                encoding='utf-8', errors='replace', env=process_env, **progress_popen_kwargs
+            )
+        except Exception:
+            progress_file.close()
+            raise
+        finally:
+            os.close(progress_write_fd) # The daemon holds the only write end now, so the reader sees EOF when it exits.
+        self.current_process = self.daemon_process
+        threading.Thread(target=self._read_daemon_output, args=(self.daemon_process, self.daemon_events), daemon=True).start()
+        threading.Thread(target=self._read_progress_events, args=(progress_file,), daemon=True).start()
+        ready_event = self._wait_for_daemon_event(lambda event: event["event"] == "ready")
+        self.current_process = None
+        return ready_event is not None and ready_event["event"] == "ready"
+
+    def _read_daemon_output(self, daemon_process, daemon_events):
+        # The daemon's JSON event lines go to the processing thread; every other line is log output.
+        for raw_line_from_process in iter(daemon_process.stdout.readline, ''):
+            line_content = raw_line_from_process.rstrip('\n')
+            if line_content.startswith('{"event"'):
+                try:
+                    daemon_events.put(json.loads(line_content))
+                    continue
+                except ValueError:
+                    pass
+            # Only the last state of a carriage-return progress line is kept.
+            final_part = line_content.split('\r')[-1]
+            if final_part: self.log_message(final_part)
+        daemon_process.stdout.close()
+        daemon_events.put({"event": "daemon_exited"})
+
+    def _read_progress_events(self, progress_file):
+        with progress_file:
+            for event_line in progress_file:
+                try:
+                    self.progress_events.put(json.loads(event_line))
+                except ValueError:
+                    pass
+
+    def _wait_for_daemon_event(self, is_wanted_event):
+        # Returns the first wanted event, {"event": "daemon_exited"} if the daemon is gone, or None on Stop.
+        while not self.stop_event.is_set():
+            try:
+                event = self.daemon_events.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            if event["event"] == "daemon_exited" or is_wanted_event(event):
+                return event
+        return None
+
+    def _shutdown_daemon(self):
+        if self.daemon_process is None:
+            return
+        if self.daemon_process.poll() is None:
+            try:
+                self.daemon_process.stdin.write('{"command": "shutdown"}\n')
+                self.daemon_process.stdin.flush()
+                self.daemon_process.wait(timeout=10)
+            except Exception:
+                self.daemon_process.kill()
+        self.daemon_process = None
+
     def process_videos_sequentially(self):
         all_successful_session = True 
 
@@ -454,7 +616,9 @@ class SubtitleApp:
             whisper_task_arg = "transcribe"
             whisper_language_arg = transcription_lang_code
 
-            if transcription_lang_code != output_lang_code:
+            if selected_output_lang_name == BOTH_OUTPUT_LANGUAGES:
+                whisper_task_arg = "both"
+            elif transcription_lang_code != output_lang_code:
                 if output_lang_code == "en":
                     whisper_task_arg = "translate"
                 else:
@@ -479,14 +643,12 @@ class SubtitleApp:
                     self.log_message(f"ERROR: Could not create output directory {output_directory}: {e}", "red")
                     all_successful_session = False; break 
 
-            command = [
-                PYTHON_EXECUTABLE, "-u", "-m", "auto_subtitle.cli", video_file_path,
+            job_args = [
+                video_file_path,
                 "--model", selected_model_name, 
                 "--language", whisper_language_arg,
                 "--task", whisper_task_arg,
-                "--output_dir", output_directory, "--srt_only", "True", "--output_srt", "True",
-                "--verbose", "True", "--ffmpeg_executable_path", FFMPEG_EXECUTABLE_PATH,
-                "--model_download_root", MODEL_CACHE_ROOT_DIR,
+                "--output_dir", output_directory,
                 "--no_speech_threshold", no_speech_threshold_setting,
                 "--merge_repetitive_segments", str(merge_repetitions_setting),
                 "--use_vad", str(use_vad_setting), "--vad_threshold", vad_threshold_setting,
@@ -494,62 +656,53 @@ class SubtitleApp:
                 "--min_silence_duration_ms", min_silence_ms_setting,
                 "--num_workers", num_workers_setting
             ]
-            command_str = ' '.join(f'"{arg}"' if ' ' in arg else arg for arg in command)
-            self.log_message(f"Executing: {command_str}")
+            job_args_str = ' '.join(f'"{arg}"' if ' ' in arg else arg for arg in job_args)
 
             try:
-                process_flags = 0
-                if os.name == 'nt': process_flags = subprocess.CREATE_NO_WINDOW
-                process_env = os.environ.copy()
-                ffmpeg_bin_dir = os.path.dirname(FFMPEG_EXECUTABLE_PATH)
-                process_env["PATH"] = ffmpeg_bin_dir + os.pathsep + process_env.get("PATH", "")
-                process_env["PYTHONUTF8"] = "1"
-                
-                self.current_process = subprocess.Popen(
-                    command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
-                    bufsize=1, cwd=VENV_SCRIPTS_DIR, creationflags=process_flags,
-                    encoding='utf-8', errors='replace', env=process_env
-                )
-
-                for raw_line_from_process in iter(self.current_process.stdout.readline, ''):
-                    if self.stop_event.is_set(): 
-                        if self.current_process and self.current_process.poll() is None: 
-                             self.log_message("Stop detected during subprocess output. Terminating.", "orange")
-                             self.current_process.terminate() 
-                        break 
-                    line_content = raw_line_from_process.rstrip('\n')
-                    parts = line_content.split('\r')
-                    for part_content in parts:
-                        if part_content: self.log_message(part_content)
-                
-                if self.current_process: 
-                    self.current_process.stdout.close()
-                    return_code = self.current_process.wait()
-                else: 
-                    return_code = -99 
-                
-                self.current_process = None 
+                if not self._start_daemon():
+                    if self.stop_event.is_set():
+                        self.log_message(f"Processing of {os.path.basename(video_file_path)} was stopped.", "orange")
+                    else:
+                        self.log_message("ERROR: The subtitle daemon exited before it was ready.", "red")
+                    all_successful_session = False; break
+
+                self.daemon_job_counter += 1
+                job_id = self.daemon_job_counter
+                self.log_message(f"Submitting job {job_id} to daemon: {job_args_str}")
+                self.current_process = self.daemon_process
+                self.daemon_process.stdin.write(json.dumps({"id": job_id, "args": job_args}) + "\n")
+                self.daemon_process.stdin.flush()
+                job_event = self._wait_for_daemon_event(lambda event: event.get("id") == job_id and event["event"] in ("job_finished", "job_failed"))
+                self.current_process = None
 
-                if self.stop_event.is_set(): 
+                if self.stop_event.is_set() or job_event is None: 
                     self.log_message(f"Processing of {os.path.basename(video_file_path)} was stopped.", "orange")
                     all_successful_session = False; break
 
-                if return_code == 0:
-                    self.log_message(f"Successfully processed {os.path.basename(video_file_path)}.", "green")
-                    self.current_video_index += 1
+                if job_event["event"] == "job_finished" and job_event["ok"]:
+                    job_timings = job_event["timings"]
+                    self.log_message(f"Successfully processed {os.path.basename(video_file_path)} in {job_timings['total_sec']:.1f}s "
+                                     f"(model loading {job_timings['model_load_sec']:.1f}s).", "green")
+                elif job_event["event"] == "job_finished":
+                    self.log_message(f"ERROR processing {os.path.basename(video_file_path)}: no subtitles were written.", "red")
+                    all_successful_session = False
+                elif job_event["event"] == "job_failed":
+                    self.log_message(f"ERROR processing {os.path.basename(video_file_path)}: {job_event['error']}", "red")
+                    all_successful_session = False
                 else:
-                    self.log_message(f"ERROR processing {os.path.basename(video_file_path)}. CLI script returned code: {return_code}", "red")
+                    self.log_message(f"ERROR processing {os.path.basename(video_file_path)}. The subtitle daemon exited with code: {self.daemon_process.poll()}", "red")
                     all_successful_session = False
-                    self.current_video_index += 1 
+                self.current_video_index += 1
                 
             except FileNotFoundError:
                 self.log_message(f"ERROR: Command not found. Ensure Python executable ({PYTHON_EXECUTABLE}) is correct.", "red")
                 all_successful_session = False; break
             except Exception as e:
-                if self.current_process: 
-                    try: self.current_process.kill(); self.current_process.wait(timeout=1)
+                self.current_process = None
+                if self.daemon_process: 
+                    try: self.daemon_process.kill(); self.daemon_process.wait(timeout=1)
                     except: pass 
-                    self.current_process = None
+                    self.daemon_process = None
                 
                 if self.stop_event.is_set():
                     self.log_message(f"Processing of {os.path.basename(video_file_path)} forcefully stopped during exception.", "orange")
@@ -651,10 +804,12 @@ if __name__ == "__main__":
                 if app.processing_thread and app.processing_thread.is_alive():
                     app.log_message("Waiting for processing thread to terminate before closing...", "orange")
                     app.processing_thread.join(timeout=5) 
+                app._shutdown_daemon()
                 root.destroy()
             else:
                 return 
         else:
+            app._shutdown_daemon()
             root.destroy()
 
     root.protocol("WM_DELETE_WINDOW", on_closing)
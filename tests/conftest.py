@@ -0,0 +1,28 @@
+# Lets the tests import auto_subtitle from the checkout, the way the benchmarks do.
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture(scope="session")
+def random_whisper_model():
+    # A tiny whisper model with seeded random weights: no checkpoint download, and the same tokens on every run.
+    torch = pytest.importorskip("torch")
+    whisper = pytest.importorskip("whisper")
+    dims = whisper.ModelDimensions(
+        n_mels=80, n_audio_ctx=1500, n_audio_state=64, n_audio_head=2, n_audio_layer=1,
+        n_vocab=51865, n_text_ctx=448, n_text_state=64, n_text_head=2, n_text_layer=1,
+    )
+    model = whisper.Whisper(dims).eval()
+    generator = torch.Generator().manual_seed(0)
+    with torch.no_grad():
+        for parameter in model.parameters(): parameter.copy_(torch.randn(parameter.shape, generator=generator) * 0.05)
+    return model
+
+
+@pytest.fixture
+def random_model_options():
+    # Decode options that keep the random model from falling back to higher temperatures or skipping windows.
+    return {"compression_ratio_threshold": 1e9, "logprob_threshold": -1e9, "no_speech_threshold": 1.0, "fp16": False}
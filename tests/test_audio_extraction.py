@@ -0,0 +1,74 @@
+import os
+import sys
+import textwrap
+
+import pytest
+
+np = pytest.importorskip("numpy")
+ffmpeg = pytest.importorskip("ffmpeg")
+
+from auto_subtitle import cli
+
+# Stand-ins for ffmpeg and ffprobe. A "video" here is a text file "<samples> <probed duration>": ffmpeg
+# writes that many s16le samples of a ramp to stdout, ffprobe reports the duration, and "fail" makes
+# ffmpeg exit with an error.
+FAKE_FFMPEG = """
+    import sys
+    path = sys.argv[sys.argv.index("-i") + 1]
+    with open(path) as f: fields = f.read().split()
+    if fields[0] == "fail":
+        sys.stderr.write("Invalid data found when processing input")
+        sys.exit(1)
+    samples = int(fields[0])
+    sys.stdout.buffer.write(b"".join(((i * 7) % 65536 - 32768).to_bytes(2, "little", signed=True) for i in range(samples)))
+"""
+FAKE_FFPROBE = """
+    import json, sys
+    with open(sys.argv[-1]) as f: fields = f.read().split()
+    print(json.dumps({"format": {"duration": fields[1]}, "streams": []}))
+"""
+
+
+@pytest.fixture
+def fake_ffmpeg(tmp_path):
+    for name, source in (("ffmpeg", FAKE_FFMPEG), ("ffprobe", FAKE_FFPROBE)):
+        script_path = tmp_path / name
+        script_path.write_text(f"#!{sys.executable}\n" + textwrap.dedent(source))
+        os.chmod(script_path, 0o755)
+    return str(tmp_path / "ffmpeg")
+
+
+def make_video(tmp_path, samples, probed_duration_sec):
+    video_path = tmp_path / f"video_{samples}.mp4"
+    video_path.write_text(f"{samples} {probed_duration_sec}")
+    return str(video_path)
+
+
+def expected_waveform(samples):
+    return (((np.arange(samples) * 7) % 65536 - 32768).astype(np.int16)).astype(np.float32) / 32768.0
+
+
+@pytest.mark.parametrize("probed_duration_sec", ["2.5", "0.01"])
+def test_load_audio_into_memory(tmp_path, fake_ffmpeg, probed_duration_sec):
+    # A probe that undercounts the audio makes the buffer grow instead of truncating the waveform.
+    audio = cli.load_audio_into_memory(make_video(tmp_path, 40000, probed_duration_sec), fake_ffmpeg)
+    assert audio.dtype == np.float32
+    assert np.array_equal(audio, expected_waveform(40000))
+
+
+def test_load_audio_into_memory_raises_ffmpeg_error(tmp_path, fake_ffmpeg):
+    video_path = tmp_path / "broken.mp4"
+    video_path.write_text("fail 1.0")
+    with pytest.raises(ffmpeg.Error) as error:
+        cli.load_audio_into_memory(str(video_path), fake_ffmpeg)
+    assert b"Invalid data" in error.value.stderr
+
+
+def test_get_audio_falls_back_to_tempfile(tmp_path, fake_ffmpeg, monkeypatch):
+    video_path = tmp_path / "broken.mp4"
+    video_path.write_text("fail 1.0")
+    monkeypatch.setattr(cli, "extract_audio_to_tempfile", lambda path, ffmpeg_cmd="ffmpeg": "/tmp/broken.wav")
+    good_video_path = make_video(tmp_path, 1600, "0.1")
+    audio = cli.get_audio([str(video_path), good_video_path], fake_ffmpeg)
+    assert audio[str(video_path)] == "/tmp/broken.wav"
+    assert np.array_equal(audio[good_video_path], expected_waveform(1600))
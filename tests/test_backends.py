@@ -0,0 +1,44 @@
+import types
+
+from auto_subtitle.backends import FasterWhisperBackend
+
+
+class FakeFasterWhisperModel:
+    # Stands in for faster_whisper.WhisperModel: segments come from a generator, as they do there.
+    def __init__(self, duration=4.0):
+        self.duration = duration
+        self.calls = []
+        self.model = types.SimpleNamespace(is_multilingual=False)
+
+    def transcribe(self, audio, **kwargs):
+        self.calls.append(kwargs)
+        segments = (
+            types.SimpleNamespace(
+                id=i, seek=0, start=start, end=end, text=f" {kwargs.get('task', 'transcribe')} {i}", tokens=(i, i + 1),
+                temperature=0.0, avg_logprob=-0.2, compression_ratio=1.1, no_speech_prob=0.01,
+            )
+            for i, (start, end) in enumerate([(0.0, 1.5), (1.5, 5.0)])
+        )
+        return segments, types.SimpleNamespace(duration=self.duration)
+
+    def detect_language(self, audio):
+        return "de", 0.9, [("de", 0.9), ("en", 0.1)]
+
+
+def test_faster_whisper_transcribe():
+    model = FakeFasterWhisperModel()
+    backend = FasterWhisperBackend(model)
+    progress = []
+    segments = backend.transcribe([0.0] * 16, {"language": "de", "logprob_threshold": -1.0, "beam_size": None, "fp16": False}, lambda *p: progress.append(p))
+    assert model.calls == [{"language": "de", "log_prob_threshold": -1.0}]
+    assert segments[1] == {
+        "id": 1, "seek": 0, "start": 1.5, "end": 5.0, "text": " transcribe 1", "tokens": [1, 2], "temperature": 0.0,
+        "avg_logprob": -0.2, "compression_ratio": 1.1, "no_speech_prob": 0.01,
+    }
+    assert progress == [(1.5, 4.0), (4.0, 4.0)]
+    assert not backend.is_multilingual
+
+
+def test_faster_whisper_detect_language():
+    assert FasterWhisperBackend(FakeFasterWhisperModel()).detect_language([[0.0], [0.0]]) == [{"de": 0.9, "en": 0.1}] * 2
+
@@ -0,0 +1,55 @@
+import types
+
+import pytest
+
+from auto_subtitle.backends import WhisperBackend, needs_next_window, split_decoding_result_into_segments
+
+TOKENIZER = types.SimpleNamespace(eot=50257, timestamp_begin=50364, decode=lambda tokens: " ".join(map(str, tokens)))
+
+
+def decoding_result(tokens):
+    return types.SimpleNamespace(tokens=tokens, temperature=0.0, avg_logprob=-0.3, compression_ratio=1.2, no_speech_prob=0.05)
+
+
+def test_split_decoding_result_into_segments():
+    segments = split_decoding_result_into_segments(decoding_result([50364, 1, 2, 50414, 50414, 3, 50464]), TOKENIZER, 3.0)
+    assert [(segment["start"], segment["end"], segment["text"], segment["tokens"]) for segment in segments] == [(0.0, 1.0, "1 2", [1, 2]), (1.0, 2.0, "3", [3])]
+    assert segments[0]["no_speech_prob"] == 0.05
+
+    # Without timestamp pairs the single segment runs to the last timestamp.
+    assert [(segment["start"], segment["end"], segment["text"]) for segment in split_decoding_result_into_segments(decoding_result([50364, 4, 5, 50464]), TOKENIZER, 3.0)] == [(0.0, 2.0, "4 5")]
+
+
+def test_split_drops_unfinished_tail_and_empty_segments():
+    # "6" after the last timestamp pair is unfinished; the 1.0-1.0 segment is instantaneous.
+    segments = split_decoding_result_into_segments(decoding_result([50364, 1, 50414, 50414, 50414, 50414, 6]), TOKENIZER, 3.0)
+    assert [(segment["start"], segment["end"], segment["text"]) for segment in segments] == [(0.0, 1.0, "1")]
+
+
+def test_needs_next_window():
+    # Ends on a single timestamp: the window is complete.
+    assert not needs_next_window(decoding_result([50364, 1, 50414, 50414, 2, 50464]), TOKENIZER, 3.0)
+    # Ends mid-segment at 1.0 s of a 3.0 s chunk: transcribe() would decode again from 1.0 s.
+    assert needs_next_window(decoding_result([50364, 1, 50414, 50414, 2]), TOKENIZER, 3.0)
+    # ... but not when that seek lands at the end of the chunk.
+    assert not needs_next_window(decoding_result([50364, 1, 50414, 50414, 2]), TOKENIZER, 1.0)
+    # No timestamp pairs at all.
+    assert not needs_next_window(decoding_result([50364, 1, 2]), TOKENIZER, 3.0)
+
+
+def segment_texts(segments):
+    return [(round(segment["start"], 2), round(segment["end"], 2), segment["text"]) for segment in segments]
+
+
+@pytest.mark.parametrize("language", ["en", None])
+def test_batched_chunks_match_transcribe(random_whisper_model, random_model_options, language):
+    np = pytest.importorskip("numpy")
+    rng = np.random.default_rng(0)
+    audio_chunks = [(rng.standard_normal(int(16000 * duration_sec)) * 0.1).astype(np.float32) for duration_sec in (1.3, 7.7)]
+    backend = WhisperBackend(random_whisper_model)
+    options = dict(random_model_options, task="transcribe", language=language)
+
+    batched = backend.transcribe_chunks(audio_chunks, options, batch_size=2)
+    one_at_a_time = [backend.transcribe(chunk, dict(options, verbose=None)) for chunk in audio_chunks]
+    assert all(batched)
+    assert [segment_texts(segments) for segments in batched] == [segment_texts(segments) for segments in one_at_a_time]
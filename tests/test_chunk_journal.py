@@ -0,0 +1,121 @@
+import os
+
+import pytest
+
+from auto_subtitle.cache import ChunkJournal
+from auto_subtitle.cli import transcribe_prepared_audio
+
+SEGMENTS = [{"start": 1.0, "end": 2.5, "text": " hello"}]
+
+
+def test_journal_round_trip(tmp_path):
+    journal = ChunkJournal(str(tmp_path), "key")
+    assert journal.load() == {}
+    journal.append([(0, 16000)], SEGMENTS)
+    journal.append([(32000, 8000), (48000, 8000)], [])
+    assert ChunkJournal(str(tmp_path), "key").load() == {((0, 16000),): SEGMENTS, ((32000, 8000), (48000, 8000)): []}
+
+
+def test_journal_skips_and_cuts_a_torn_record(tmp_path):
+    journal = ChunkJournal(str(tmp_path), "key")
+    journal.append([(0, 16000)], SEGMENTS)
+    with open(journal.journal_path, "a", encoding="utf-8") as journal_file:
+        journal_file.write('{"chunks": [[16000, 16')
+    assert list(journal.load()) == [((0, 16000),)]
+
+    resumed_journal = ChunkJournal(str(tmp_path), "key")
+    resumed_journal.append([(16000, 16000)], SEGMENTS)
+    resumed_journal.append([(32000, 16000)], SEGMENTS)
+    assert list(resumed_journal.load()) == [((0, 16000),), ((16000, 16000),), ((32000, 16000),)]
+    with open(journal.journal_path, "r", encoding="utf-8") as journal_file:
+        assert len(journal_file.read().splitlines()) == 3
+
+
+def test_journal_remove(tmp_path):
+    journal = ChunkJournal(str(tmp_path), "key")
+    journal.append([(0, 16000)], SEGMENTS)
+    journal.remove()
+    assert journal.load() == {}
+    journal.remove()
+
+
+def read_journal(journal):
+    with open(journal.journal_path, "rb") as journal_file:
+        return journal_file.read()
+
+
+def test_truncate_cuts_a_torn_record_longer_than_one_block(tmp_path):
+    journal = ChunkJournal(str(tmp_path), "key")
+    journal.append([(0, 16000)], SEGMENTS)
+    complete_records = read_journal(journal)
+    with open(journal.journal_path, "ab") as journal_file:
+        journal_file.write(b'{"chunks": [[16000, 16000]], "segments": [{"text": "' + b"x" * 200000)
+    journal.truncate_partial_tail()
+    assert read_journal(journal) == complete_records
+
+
+def test_truncate_empties_a_journal_without_a_complete_record(tmp_path):
+    journal = ChunkJournal(str(tmp_path), "key")
+    with open(journal.journal_path, "wb") as journal_file:
+        journal_file.write(b'{"chunks": [[0, 16')
+    journal.truncate_partial_tail()
+    assert read_journal(journal) == b""
+
+
+def test_truncate_leaves_clean_and_missing_journals_alone(tmp_path):
+    journal = ChunkJournal(str(tmp_path), "key")
+    journal.truncate_partial_tail()
+    assert not os.path.exists(journal.journal_path)
+    journal.append([(0, 16000)], SEGMENTS)
+    complete_records = read_journal(journal)
+    journal.truncate_partial_tail()
+    assert read_journal(journal) == complete_records
+
+
+class FakeBackend:
+    name = "whisper"
+    is_multilingual = True
+
+    def __init__(self, failing_lengths=()):
+        self.failing_lengths = failing_lengths
+        self.chunk_lengths = []
+
+    def transcribe_chunks(self, audio_chunks, options, batch_size=1):
+        self.chunk_lengths.extend(len(chunk) for chunk in audio_chunks)
+        if any(len(chunk) in self.failing_lengths for chunk in audio_chunks): raise RuntimeError("decoder failed")
+        return [[{"start": 0.0, "end": 0.5, "text": f" {len(chunk)}", "no_speech_prob": 0.0}] for chunk in audio_chunks]
+
+
+def transcribe_with_journal(journal, backend):
+    np = pytest.importorskip("numpy")
+    pytest.importorskip("torch")
+    waveform = np.zeros(4 * 16000, dtype=np.float32)
+    prepared_audio = {"use_vad": True, "vad_chunks": [(0, 16000, 0.0), (16000, 8000, 1.0), (32000, 4000, 2.0)], "waveform": waveform, "audio": waveform}
+    segments = transcribe_prepared_audio(
+        "video.mp4", prepared_audio, backend, "tiny", None, {"task": "transcribe", "language": "en"}, 1, False,
+        chunk_journal=journal, chunk_retries=0,
+    )
+    return [segment["text"] for segment in segments], prepared_audio["failed_chunks"]
+
+
+def test_resume_skips_journaled_chunks(tmp_path):
+    journal = ChunkJournal(str(tmp_path), "key")
+    journal.append([(16000, 8000)], [{"start": 1.0, "end": 1.5, "text": " from the journal"}])
+    backend = FakeBackend()
+    texts, failed_chunks = transcribe_with_journal(journal, backend)
+    assert backend.chunk_lengths == [16000, 4000]
+    assert texts == [" 16000", " from the journal", " 4000"] and failed_chunks == []
+    # A file that finished completely no longer needs its journal.
+    assert not os.path.exists(journal.journal_path)
+
+
+def test_failed_run_keeps_the_journal_for_the_next_one(tmp_path):
+    journal = ChunkJournal(str(tmp_path), "key")
+    texts, failed_chunks = transcribe_with_journal(journal, FakeBackend(failing_lengths=(8000,)))
+    assert texts == [" 16000", " 4000"] and [failed_chunk["start"] for failed_chunk in failed_chunks] == [1.0]
+    assert set(ChunkJournal(str(tmp_path), "key").load()) == {((0, 16000),), ((32000, 4000),)}
+
+    backend = FakeBackend()
+    texts, failed_chunks = transcribe_with_journal(ChunkJournal(str(tmp_path), "key"), backend)
+    assert backend.chunk_lengths == [8000]
+    assert texts == [" 16000", " 8000", " 4000"] and failed_chunks == []
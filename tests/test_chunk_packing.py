@@ -0,0 +1,40 @@
+import pytest
+
+from auto_subtitle import cli
+from auto_subtitle.cli import pack_speech_timestamps
+
+
+def test_pack_merges_close_regions_up_to_the_window_length():
+    speech_timestamps = [{"start": 0, "end": 16000}, {"start": 32000, "end": 48000}, {"start": 100000, "end": 116000}]
+    assert pack_speech_timestamps(speech_timestamps) == [{"start": 0, "end": 48000}, {"start": 100000, "end": 116000}]
+    assert pack_speech_timestamps(speech_timestamps, max_window_ms=2000) == speech_timestamps
+    assert pack_speech_timestamps(speech_timestamps, max_gap_ms=10000) == [{"start": 0, "end": 116000}]
+    assert speech_timestamps[0] == {"start": 0, "end": 16000}
+
+
+def test_pack_without_packing():
+    speech_timestamps = [{"start": 0, "end": 16000}, {"start": 16001, "end": 20000}]
+    packed = pack_speech_timestamps(speech_timestamps, packing_policy="none")
+    assert packed == speech_timestamps and packed[0] is not speech_timestamps[0]
+    assert pack_speech_timestamps([]) == []
+    with pytest.raises(ValueError):
+        pack_speech_timestamps(speech_timestamps, packing_policy="optimal")
+
+
+@pytest.mark.parametrize("chunk_packing, expected_chunks", [
+    ("none", [(4640, 11200, 0.29), (20000, 11200, 1.25)]),
+    ("greedy", [(4640, 26560, 0.29)]),
+])
+def test_prepared_chunks_are_packed_windows(monkeypatch, chunk_packing, expected_chunks):
+    np = pytest.importorskip("numpy")
+    pytest.importorskip("torch")
+    # Two speech regions 0.26 s apart: separate chunks without packing, one window with it.
+    speech_probs = np.array([0.0] * 10 + [0.9] * 20 + [0.0] * 10 + [0.9] * 20 + [0.0] * 10, dtype=np.float32)
+    monkeypatch.setattr(cli, "VAD_MODEL", object())
+    monkeypatch.setattr(cli, "VAD_UTILS", object())
+    monkeypatch.setattr(cli, "compute_vad_speech_probs", lambda *args, **kwargs: speech_probs)
+    vad_parameters = {"vad_threshold": 0.5, "min_speech_duration_ms": 250, "min_silence_duration_ms": 100, "chunk_packing": chunk_packing, "chunk_max_gap_ms": 2000, "chunk_max_window_ms": 30000}
+    waveform = np.zeros(70 * 512, dtype=np.float32)
+    prepared = cli.prepare_audio_for_transcription("clip.mp4", waveform, True, vad_parameters, False)
+    assert prepared["use_vad"] and prepared["waveform"] is not None
+    assert [(offset, length, round(start_sec, 2)) for offset, length, start_sec in prepared["vad_chunks"]] == expected_chunks
@@ -0,0 +1,103 @@
+import queue
+import threading
+
+import pytest
+
+from auto_subtitle import cli
+from test_longest_first import FakePool, make_task, task_result
+
+
+class ResultCollector:
+    def __init__(self):
+        self.results = queue.Queue()
+
+    def __call__(self, context, result):
+        self.results.put((context, result))
+
+    def get(self):
+        return self.results.get(timeout=10)
+
+
+@pytest.fixture
+def make_runner():
+    runners = []
+
+    def make(pool, max_retries, task_events=None):
+        collector = ResultCollector()
+        runner = cli.ChunkTaskRunner(pool, task_events, max_retries, collector, poll_interval_sec=3600)
+        runners.append(runner)
+        return runner, collector
+
+    yield make
+    for runner in runners: runner.close()
+
+
+def test_failed_attempts_are_retried(make_runner):
+    pool = FakePool(lambda task, attempt: task_result(task, error="decoder failed" if attempt < 3 else None))
+    runner, collector = make_runner(pool, 2)
+    runner.submit(make_task(1.0), "job")
+    context, result = collector.get()
+    assert context == "job" and result["error"] is None and result["attempts"] == 3
+    assert pool.submitted == [(1.0, 1), (1.0, 2), (1.0, 3)] and runner.retries == 2
+
+
+def test_exhausted_retries_report_the_last_error(make_runner):
+    def run_task(task, attempt):
+        raise RuntimeError(f"worker crashed on attempt {attempt}")
+
+    runner, collector = make_runner(FakePool(run_task), 1)
+    runner.submit(make_task(1.0))
+    _, result = collector.get()
+    assert (result["error"], result["attempts"], result["segments"]) == ("worker crashed on attempt 2", 2, [])
+    assert collector.results.empty() and runner.outstanding == {}
+
+
+def test_attempt_lost_with_a_dead_worker_is_retried(make_runner, monkeypatch):
+    task_events = queue.Queue()
+    lost_attempts = []
+
+    def run_task(task, attempt):
+        if attempt == 1:
+            # The worker announces the task and then dies: no result ever comes back for this attempt.
+            task_events.put((task[0], task[2][0][2], attempt, 4242))
+            lost_attempts.append(task)
+            return None
+        return task_result(task)
+
+    monkeypatch.setattr(cli.multiprocessing, "active_children", lambda: [])
+    pool = FakePool(run_task)
+    runner, collector = make_runner(pool, 1, task_events)
+    runner.submit(make_task(2.0))
+    for thread in pool.threads: thread.join()
+    runner.check_workers()
+    _, result = collector.get()
+    assert result["error"] is None and result["attempts"] == 2
+    assert runner.lost_tasks == 1
+
+    # A result of the written-off attempt that still turns up is ignored.
+    runner._finish_attempt(("psm_a", 2.0), 1, task_result(lost_attempts[0]))
+    assert collector.results.empty()
+
+
+def test_live_worker_and_stale_start_events_are_not_written_off(make_runner, monkeypatch):
+    task_events = queue.Queue()
+    task_started = threading.Event()
+    release_task = threading.Event()
+
+    def run_task(task, attempt):
+        task_events.put((task[0], task[2][0][2], attempt, 1111))
+        task_started.set()
+        release_task.wait(timeout=10)
+        return task_result(task)
+
+    monkeypatch.setattr(cli.multiprocessing, "active_children", lambda: [type("Child", (), {"pid": 1111})()])
+    runner, collector = make_runner(FakePool(run_task), 1, task_events)
+    runner.submit(make_task(3.0))
+    # A start event of an attempt that is no longer current does not claim the task for its worker.
+    assert task_started.wait(timeout=10)
+    task_events.put(("psm_a", 3.0, 7, 9999))
+    runner.check_workers()
+    assert runner.outstanding[("psm_a", 3.0)]["pid"] == 1111 and runner.lost_tasks == 0
+    release_task.set()
+    _, result = collector.get()
+    assert result["attempts"] == 1
@@ -0,0 +1,92 @@
+import threading
+
+from auto_subtitle import cli
+from test_longest_first import FakePool, make_task, task_result
+
+
+class FakeWarmPool:
+    def __init__(self, run_task=lambda task, attempt: task_result(task)):
+        self.pool = FakePool(run_task)
+        self.task_events = None
+        self.num_workers = 2
+        self.files_served = 0
+        self.utilization = []
+
+    def record_utilization(self, wall_sec, busy_sec, lost_tasks=0):
+        self.utilization.append((busy_sec, lost_tasks))
+
+
+def prepare_job(video):
+    # "<name>:<chunk starts>" -> a job with one pool task per chunk start.
+    name, _, starts = video.partition(":")
+    if name == "broken": raise RuntimeError("no audio stream")
+    return {"video": name, "pool_tasks": [make_task(float(start_sec), shared_audio_name=name) for start_sec in starts.split(",") if start_sec]}
+
+
+def test_results_are_routed_to_their_file():
+    warm_pool = FakeWarmPool()
+    finished = {}
+    routed = []
+    cli.run_cross_file_batch(
+        ["a:3,1,2", "b:", "broken:1", "c:0.5"], prepare_job, lambda job: finished.update({job["video"]: [result["chunk_start_sec"] for result in job["pool_results"]]}),
+        warm_pool, max_files_in_flight=2, on_task_result=lambda job, result: routed.append((job["video"], result["chunk_start_sec"])),
+    )
+    # A file without chunks is finished as it is; a file that fails to prepare is skipped without stalling the batch.
+    assert finished == {"a": [1.0, 2.0, 3.0], "b": [], "c": [0.5]}
+    assert sorted(routed) == [("a", 1.0), ("a", 2.0), ("a", 3.0), ("c", 0.5)]
+    assert warm_pool.files_served == 2
+    assert warm_pool.utilization == [(4.0, 0)]
+
+
+def test_slow_finish_does_not_hold_up_other_files_results():
+    first_file_finishing = threading.Event()
+    second_file_routed = threading.Event()
+    finished = []
+
+    def run_task(task, attempt):
+        # The second file's chunk completes only once the first file is in finish_job.
+        if task[0] == "b": assert first_file_finishing.wait(timeout=10)
+        return task_result(task)
+
+    def finish_job(job):
+        # The first file's burn-in waits until the second file's results have been routed.
+        if job["video"] == "a":
+            first_file_finishing.set()
+            assert second_file_routed.wait(timeout=10)
+        finished.append(job["video"])
+
+    def on_task_result(job, result):
+        if job["video"] == "b": second_file_routed.set()
+
+    cli.run_cross_file_batch(["a:0", "b:0"], prepare_job, finish_job, FakeWarmPool(run_task), max_files_in_flight=2, on_task_result=on_task_result)
+    assert finished == ["a", "b"]
+
+
+def test_files_in_flight_are_bounded():
+    in_flight = []
+    peak_in_flight = []
+    lock = threading.Lock()
+
+    def counting_prepare_job(video):
+        with lock:
+            in_flight.append(video.partition(":")[0])
+            peak_in_flight.append(len(in_flight))
+        return prepare_job(video)
+
+    def finish_job(job):
+        with lock: in_flight.remove(job["video"])
+        if job["video"] == "b": raise RuntimeError("burn-in failed") # Still frees the file's slot.
+
+    cli.run_cross_file_batch([f"{name}:0,1" for name in "abcde"], counting_prepare_job, finish_job, FakeWarmPool(), max_files_in_flight=2)
+    assert in_flight == [] and max(peak_in_flight) <= 2
+
+
+def test_failed_chunks_reach_the_file_after_retries():
+    def run_task(task, attempt):
+        if task[2][0][2] == 1.0: raise RuntimeError("worker crashed")
+        return task_result(task)
+
+    warm_pool = FakeWarmPool(run_task)
+    finished = {}
+    cli.run_cross_file_batch(["a:0,1"], prepare_job, lambda job: finished.update({job["video"]: job["pool_results"]}), warm_pool, 1, chunk_retries=1)
+    assert [(result["chunk_start_sec"], result["error"], result["attempts"]) for result in finished["a"]] == [(0.0, None, 1), (1.0, "worker crashed", 2)]
@@ -0,0 +1,119 @@
+import json
+import os
+import queue
+import threading
+
+import pytest
+
+from auto_subtitle import cli
+from test_cross_file_batch import FakeWarmPool, prepare_job
+from test_longest_first import FakePool, make_task
+
+
+class ReplyReader:
+    # Stands in for stdout: JSON event lines are queued for the test, log lines are dropped.
+    def __init__(self):
+        self.events = queue.Queue()
+        self.partial = ""
+
+    def write(self, text):
+        self.partial += text
+        while "\n" in self.partial:
+            line, self.partial = self.partial.split("\n", 1)
+            if line.startswith("{"): self.events.put(json.loads(line))
+
+    def flush(self):
+        pass
+
+    def next_event(self):
+        return self.events.get(timeout=10)
+
+
+@pytest.fixture
+def job_cancel():
+    cli.JOB_CANCEL.clear()
+    yield cli.JOB_CANCEL
+    cli.JOB_CANCEL.clear()
+
+
+@pytest.fixture
+def start_daemon(monkeypatch, job_cancel):
+    # Runs run_daemon on a thread with a pipe as stdin; jobs run the fake run_subtitle_job below. Started from
+    # the test itself, since pytest puts its own stdout back in place between fixture setup and the test.
+    read_fd, write_fd = os.pipe()
+    requests = os.fdopen(write_fd, "w")
+    replies = ReplyReader()
+    released_slots = []
+    daemon_threads = []
+    monkeypatch.setattr(cli.sys, "stdin", os.fdopen(read_fd))
+    monkeypatch.setattr(cli.ResidentModels, "release", lambda self, slot: released_slots.append(slot))
+
+    def run_subtitle_job(parser, job_args, resident_models):
+        # "wait.mp4" runs until the job is cancelled, like a long transcription between its chunk checks.
+        while job_args["video"] == ["wait.mp4"]:
+            cli.raise_if_job_cancelled()
+            job_cancel.wait(0.01)
+        return {"srt": {video: f"{video}.srt" for video in job_args["video"]}, "timings": {"total_sec": 0.0, "model_load_sec": 0.0, "stages": {}}}
+
+    monkeypatch.setattr(cli, "run_subtitle_job", run_subtitle_job)
+    def send(request):
+        requests.write(json.dumps(request) + "\n")
+        requests.flush()
+
+    def start():
+        monkeypatch.setattr(cli.sys, "stdout", replies)
+        parser = cli.build_arg_parser()
+        daemon_args = parser.parse_args([]).__dict__
+        for process_option in ("daemon", "progress_format", "progress_fd"): daemon_args.pop(process_option)
+        daemon_threads.append(threading.Thread(target=cli.run_daemon, args=(parser, daemon_args), daemon=True))
+        daemon_threads[0].start()
+        assert replies.next_event()["event"] == "ready"
+        return send, replies, released_slots
+
+    yield start
+    requests.close() # The end of stdin stops the daemon.
+    for daemon_thread in daemon_threads: daemon_thread.join(timeout=10)
+    assert not any(daemon_thread.is_alive() for daemon_thread in daemon_threads)
+
+
+def test_cancel_stops_the_running_job_and_keeps_the_daemon(start_daemon):
+    send, replies, released_slots = start_daemon()
+    send({"id": 1, "args": ["wait.mp4"]})
+    assert replies.next_event() == {"event": "job_started", "id": 1}
+    send({"command": "cancel", "id": 1})
+    assert replies.next_event() == {"event": "job_cancelled", "id": 1}
+    assert released_slots == ["workers"] # Queued chunks of the cancelled job go with the pool; the models stay.
+    send({"id": 2, "args": ["next.mp4"]})
+    assert replies.next_event() == {"event": "job_started", "id": 2}
+    finished = replies.next_event()
+    assert (finished["event"], finished["id"], finished["srt"]) == ("job_finished", 2, {"next.mp4": "next.mp4.srt"})
+
+
+def test_cancel_before_the_job_starts(start_daemon):
+    send, replies, _ = start_daemon()
+    send({"command": "cancel", "id": 3})
+    send({"id": 3, "args": ["wait.mp4"]})
+    assert replies.next_event() == {"event": "job_cancelled", "id": 3}
+    send({"id": 4, "args": ["other.mp4"]})
+    assert replies.next_event() == {"event": "job_started", "id": 4}
+
+
+def test_cancel_interrupts_the_wait_for_pool_results(job_cancel, monkeypatch):
+    monkeypatch.setattr(cli, "JOB_CANCEL_POLL_SEC", 0.01)
+    job_cancel.set()
+    with pytest.raises(cli.JobCancelledError):
+        cli.run_pool_tasks_longest_first(FakePool(lambda task, attempt: None), [make_task(0.0)], 1)
+
+
+def test_cancelled_cross_file_batch_hands_over_waiting_files(job_cancel, monkeypatch):
+    monkeypatch.setattr(cli, "JOB_CANCEL_POLL_SEC", 0.01)
+    first_task_sent = threading.Event()
+
+    def run_task(task, attempt):
+        # The worker never answers, and the job is cancelled while the file waits for its chunk.
+        first_task_sent.set()
+        job_cancel.set()
+
+    handed_over = []
+    cli.run_cross_file_batch(["a:0", "b:0"], prepare_job, lambda job: handed_over.append(job["video"]), FakeWarmPool(run_task), max_files_in_flight=1)
+    assert first_task_sent.is_set() and "a" in handed_over
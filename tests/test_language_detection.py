@@ -0,0 +1,65 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("whisper")
+
+from auto_subtitle import cli
+from auto_subtitle.backends import WhisperBackend
+
+
+class FakeBackend:
+    def __init__(self, language_probs_by_length, is_multilingual=True):
+        self.language_probs_by_length = language_probs_by_length
+        self.is_multilingual = is_multilingual
+        self.calls = []
+
+    def detect_language(self, audio_chunks):
+        self.calls.append([len(chunk) for chunk in audio_chunks])
+        if self.language_probs_by_length is None: raise RuntimeError("encoder failed")
+        return [self.language_probs_by_length[len(chunk)] for chunk in audio_chunks]
+
+
+def test_vote_samples_chunks_across_the_file_and_weights_them_by_length():
+    vad_chunks = [(i * 20000, 1000 + i, i * 1.25) for i in range(9)]
+    backend = FakeBackend({1000: {"en": 0.6, "de": 0.4}, 1004: {"en": 0.6, "de": 0.4}, 1008: {"de": 1.0}})
+    language, probability = cli.detect_language_for_file(backend, np.zeros(200000, dtype=np.float32), vad_chunks, 3)
+    # First, middle and last chunk, in one detect_language call.
+    assert backend.calls == [[1000, 1004, 1008]]
+    assert language == "de"
+    assert probability == pytest.approx((0.4 * 1000 + 0.4 * 1004 + 1.0 * 1008) / 3012)
+
+
+def test_vote_caps_the_weight_of_chunks_longer_than_a_window():
+    long_chunk = cli.whisper.audio.N_SAMPLES * 3
+    vad_chunks = [(0, long_chunk, 0.0), (long_chunk, cli.whisper.audio.N_SAMPLES, 90.0)]
+    backend = FakeBackend({long_chunk: {"en": 1.0}, cli.whisper.audio.N_SAMPLES: {"fr": 1.0}})
+    language, probability = cli.detect_language_for_file(backend, np.zeros(long_chunk * 2, dtype=np.float32), vad_chunks, 3)
+    assert (language, probability) == ("en", 0.5)
+
+
+def test_chunk_options_pin_the_detected_language():
+    backend = FakeBackend({1000: {"ja": 0.9, "en": 0.1}})
+    options = cli.get_chunk_options_for_file("video.mp4", backend, np.zeros(2000, dtype=np.float32), [(0, 1000, 0.0)], {"task": "transcribe", "language": None})
+    assert options == {"task": "transcribe", "language": "ja", "verbose": False}
+
+
+@pytest.mark.parametrize("language, is_multilingual, language_detection_chunks", [("de", True, 3), (None, False, 3), (None, True, 0)])
+def test_chunk_options_skip_detection(language, is_multilingual, language_detection_chunks):
+    backend = FakeBackend({1000: {"ja": 1.0}}, is_multilingual)
+    options = cli.get_chunk_options_for_file("video.mp4", backend, np.zeros(2000, dtype=np.float32), [(0, 1000, 0.0)], {"language": language}, language_detection_chunks)
+    assert backend.calls == [] and options["language"] == language
+
+
+def test_chunk_options_fall_back_to_per_chunk_detection(capsys):
+    options = cli.get_chunk_options_for_file("video.mp4", FakeBackend(None), np.zeros(2000, dtype=np.float32), [(0, 1000, 0.0)], {"language": None})
+    assert options["language"] is None
+    assert "File-level language detection failed" in capsys.readouterr().err
+
+
+def test_whisper_backend_detects_every_chunk_in_one_pass(random_whisper_model):
+    audio_chunks = [np.zeros(8000, dtype=np.float32), np.random.default_rng(0).standard_normal(40 * 16000).astype(np.float32)]
+    language_probs_per_chunk = WhisperBackend(random_whisper_model).detect_language(audio_chunks)
+    assert len(language_probs_per_chunk) == 2
+    for language_probs in language_probs_per_chunk:
+        assert "en" in language_probs and set(language_probs) <= set(cli.whisper.tokenizer.LANGUAGES)
+        assert sum(language_probs.values()) == pytest.approx(1.0, abs=1e-4)
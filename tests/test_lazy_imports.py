@@ -0,0 +1,45 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ["torch", "whisper", "numpy", "ffmpeg", "torchaudio", "soundfile", "faster_whisper"]
+
+# Runs main() with the given arguments, then reports which heavy modules got imported.
+RUN_MAIN = f"""
+import sys
+from auto_subtitle import cli
+sys.argv = ["auto_subtitle"] + sys.argv[1:]
+try:
+    cli.main()
+finally:
+    print("imported:", ",".join(name for name in {HEAVY_MODULES!r} if name in sys.modules), file=sys.stderr)
+"""
+
+
+def run_cli(*args):
+    return subprocess.run([sys.executable, "-c", RUN_MAIN, *args], cwd=REPO_ROOT, capture_output=True, text=True, timeout=60)
+
+
+def imported_modules(completed):
+    return completed.stderr.rsplit("imported:", 1)[1].strip()
+
+
+def test_importing_the_cli_loads_no_heavy_module():
+    completed = subprocess.run([sys.executable, "-c", RUN_MAIN.replace("cli.main()", "pass")], cwd=REPO_ROOT, capture_output=True, text=True, timeout=60)
+    assert completed.returncode == 0 and imported_modules(completed) == ""
+
+
+def test_help_loads_no_heavy_module():
+    completed = run_cli("--help")
+    assert completed.returncode == 0 and "--model" in completed.stdout
+    assert imported_modules(completed) == ""
+
+
+@pytest.mark.parametrize("args", [["video.mp4", "--model", "huge"], ["video.mp4", "--output_format", "doc"]])
+def test_argument_errors_load_no_heavy_module(args):
+    completed = run_cli(*args)
+    assert completed.returncode == 2 and "invalid" in completed.stderr
+    assert imported_modules(completed) == ""
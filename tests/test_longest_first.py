@@ -0,0 +1,67 @@
+import threading
+
+from auto_subtitle import cli
+
+
+class FakePool:
+    """apply_async on one background thread per call, answering each task with ``run_task(task, attempt)``.
+
+    ``run_task`` may raise to reach the error callback, or return None to never answer (a lost worker).
+    """
+
+    def __init__(self, run_task):
+        self.run_task = run_task
+        self.submitted = []
+        self.threads = []
+
+    def apply_async(self, func, args, callback, error_callback):
+        task, attempt = args
+        self.submitted.append((task[2][0][2], attempt))
+
+        def run():
+            try:
+                task_result = self.run_task(task, attempt)
+            except Exception as e_task:
+                error_callback(e_task)
+                return
+            if task_result is not None: callback(task_result)
+
+        thread = threading.Thread(target=run, daemon=True)
+        self.threads.append(thread)
+        thread.start()
+
+
+def make_task(start_sec, length=16000, shared_audio_name="psm_a"):
+    return (shared_audio_name, 10 * 16000, [(int(start_sec * 16000), length, start_sec)], "tiny", None, {}, 1, "whisper")
+
+
+def task_result(task, error=None, busy_sec=1.0):
+    return {"chunk_start_sec": task[2][0][2], "segments": [{"start": task[2][0][2], "end": task[2][0][2] + 1, "text": " x"}], "error": error, "worker_pid": 1, "busy_sec": busy_sec}
+
+
+def test_batches_are_ordered_longest_first():
+    chunk_batches = [[(0, 100, 0.0)], [(100, 300, 1.0)], [(400, 150, 2.0), (550, 100, 3.0)]]
+    assert cli.order_chunk_batches_longest_first(chunk_batches) == [[(100, 300, 1.0)], [(400, 150, 2.0), (550, 100, 3.0)], [(0, 100, 0.0)]]
+
+
+def test_results_are_reported_as_they_arrive_and_returned_by_start_time():
+    # Task 0.0 answers only after 2.0 has finished, so completion order differs from submission order.
+    second_done = threading.Event()
+
+    def run_task(task, attempt):
+        start_sec = task[2][0][2]
+        if start_sec == 0.0: assert second_done.wait(timeout=10)
+        result = task_result(task)
+        if start_sec == 2.0: second_done.set()
+        return result
+
+    pool = FakePool(run_task)
+    streamed = []
+    tasks = [make_task(2.0, 32000), make_task(0.0)]
+    task_results, wall_sec, busy_sec, utilization, lost_tasks = cli.run_pool_tasks_longest_first(pool, tasks, 2, on_task_result=lambda result: streamed.append(result["chunk_start_sec"]))
+
+    assert pool.submitted == [(2.0, 1), (0.0, 1)]
+    assert streamed == [2.0, 0.0]
+    assert [result["chunk_start_sec"] for result in task_results] == [0.0, 2.0]
+    assert all(result["attempts"] == 1 for result in task_results)
+    assert busy_sec == 2.0 and lost_tasks == 0 and 0.0 < utilization <= 1.0
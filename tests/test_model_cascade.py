@@ -0,0 +1,67 @@
+import pytest
+
+from auto_subtitle import cli
+
+np = pytest.importorskip("numpy")
+
+
+def draft(start_sec, end_sec, text, avg_logprob=-0.1, **fields):
+    return dict({"start": start_sec, "end": end_sec, "text": f" {text}", "avg_logprob": avg_logprob, "no_speech_prob": 0.0, "compression_ratio": 1.2}, **fields)
+
+
+class FakeAccurateBackend:
+    name = "whisper"
+
+    def __init__(self):
+        self.calls = []
+
+    def transcribe_chunks(self, audio_chunks, options, batch_size=1):
+        self.calls.append(([len(chunk) / 16000 for chunk in audio_chunks], options))
+        return [[{"start": 0.0, "end": len(chunk) / 16000, "text": f" accurate {options['task']}"}] for chunk in audio_chunks]
+
+
+@pytest.fixture
+def cascade():
+    model_cascade = cli.ModelCascade("whisper", "large-v3", None, 0.5)
+    model_cascade.backend = FakeAccurateBackend()
+    return model_cascade
+
+
+def test_segment_confidence():
+    assert cli.segment_confidence(draft(0, 1, "a", avg_logprob=0.0)) == 1.0
+    assert cli.segment_confidence(draft(0, 1, "a", avg_logprob=-1.0, no_speech_prob=0.5)) == pytest.approx(0.5 * 0.36788, rel=1e-4)
+    assert cli.segment_confidence(draft(0, 1, "a", avg_logprob=0.0, compression_ratio=3.0)) == 0.0
+
+
+def test_low_confidence_runs_become_padded_spans(cascade):
+    segments = [draft(0.5, 1.0, "kept"), draft(1.1, 2.0, "unsure", -2.0), draft(2.5, 3.0, "unsure", -2.0), draft(3.1, 4.0, "kept"), draft(6.0, 7.0, "unsure", -2.0)]
+    # Padding reaches into silence, stops at kept neighbours and at the window edges.
+    assert cascade.find_low_confidence_spans(segments, 0.0, 7.1, 2.4) == [(1.0, 3.1), (5.75, 7.1)]
+
+
+def test_refine_splices_accurate_segments_into_the_timeline(cascade, capsys):
+    audio = np.zeros(20 * 16000, dtype=np.float32)
+    chunk_batch = [(0, 4 * 16000, 0.0), (10 * 16000, 4 * 16000, 10.0)]
+    segments = [draft(10.5, 11.5, "later"), draft(0.5, 1.5, "first"), draft(2.0, 3.0, "mumbled", -3.0), draft(12.0, 13.0, "noise", no_speech_prob=0.9)]
+    refined = cascade.refine("video.mp4", audio, chunk_batch, segments, {"task": "transcribe", "language": "en"})
+    assert [(segment["start"], segment["end"], segment["text"]) for segment in refined] == [
+        (0.5, 1.5, " first"), (1.75, 3.25, " accurate transcribe"), (10.5, 11.5, " later"), (11.75, 13.25, " accurate transcribe"),
+    ]
+    assert cascade.backend.calls[0][0] == [1.5, 1.5] and cascade.backend.calls[0][1]["verbose"] is False
+    cascade.report_file("video.mp4")
+    assert "2 of 4 draft segment(s) re-decoded; 3.0s of 8.0s audio (37.5%) needed 'large-v3'" in capsys.readouterr().out
+    assert cascade.run_stats["redecoded_sec"] == 3.0
+
+
+def test_confident_drafts_never_load_the_accurate_model(cascade, monkeypatch):
+    monkeypatch.setattr(cascade, "get_backend", lambda: pytest.fail("the accurate model was loaded"))
+    segments = [draft(0.5, 1.5, "first")]
+    assert cascade.refine("video.mp4", np.zeros(16000 * 2, dtype=np.float32), [(0, 2 * 16000, 0.0)], segments, {"task": "transcribe"}) == segments
+    assert cascade.file_stats["video.mp4"]["segments"] == 1
+
+
+def test_task_both_refines_each_task_separately(cascade):
+    segments = cli.tag_segments_with_task([draft(0.5, 1.5, "hallo", -3.0)], "transcribe") + cli.tag_segments_with_task([draft(0.5, 1.5, "hello")], "translate")
+    refined = cascade.refine("video.mp4", np.zeros(2 * 16000, dtype=np.float32), [(0, 2 * 16000, 0.0)], segments, {"task": cli.TASK_BOTH})
+    assert sorted((segment["task"], segment["text"]) for segment in refined) == [("transcribe", " accurate transcribe"), ("translate", " hello")]
+    assert [options["task"] for _, options in cascade.backend.calls] == ["transcribe"]
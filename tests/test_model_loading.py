@@ -0,0 +1,79 @@
+import copy
+import threading
+from dataclasses import asdict
+
+import pytest
+
+from auto_subtitle import models
+
+torch = pytest.importorskip("torch")
+whisper = pytest.importorskip("whisper")
+
+
+@pytest.fixture
+def checkpoint_path(random_whisper_model, tmp_path):
+    # Saved the way official checkpoints are, so load_whisper_model treats it like a downloaded model.
+    path = str(tmp_path / "random.pt")
+    torch.save({"dims": asdict(random_whisper_model.dims), "model_state_dict": random_whisper_model.state_dict()}, path)
+    return path
+
+
+def logits(model):
+    mel = torch.randn(1, 80, 3000, generator=torch.Generator().manual_seed(0))
+    with torch.no_grad():
+        return model.eval()(mel, torch.tensor([[50258, 50259, 50359]]))
+
+
+def test_converted_weights_are_mapped_on_the_next_load(random_whisper_model, checkpoint_path, monkeypatch):
+    first_model = models.load_whisper_model(checkpoint_path, device="cpu")
+    assert models.read_mmap_weights_marker(checkpoint_path, None) is not None
+    load_mmap_weights = models.load_mmap_weights
+    mapped_loads = []
+    monkeypatch.setattr(models, "load_mmap_weights", lambda *args: mapped_loads.append(args) or load_mmap_weights(*args))
+    mapped_model = models.load_whisper_model(checkpoint_path, device="cpu")
+    assert len(mapped_loads) == 1
+    assert torch.allclose(logits(mapped_model), logits(first_model)) and torch.allclose(logits(mapped_model), logits(random_whisper_model))
+    assert torch.equal(mapped_model.decoder.mask, random_whisper_model.decoder.mask) and mapped_model.alignment_heads.is_sparse
+
+
+def test_cached_int8_weights_match_a_fresh_quantization(checkpoint_path):
+    quantized_model = models.load_whisper_model(checkpoint_path, quantize="int8")
+    assert models.read_mmap_weights_marker(checkpoint_path, None, "int8") is not None
+    cached_model = models.load_int8_weights(models.get_mmap_weights_paths(checkpoint_path, "int8")[0], None)
+    assert isinstance(cached_model.decoder.blocks[0].attn.query, torch.ao.nn.quantized.dynamic.Linear)
+    assert torch.allclose(logits(cached_model), logits(quantized_model))
+
+
+def test_empty_model_build_leaves_other_threads_alone(random_whisper_model, monkeypatch):
+    # A layer another thread creates while an empty model is being built still gets allocated, initialized weights.
+    other_thread_layers = []
+    build_whisper = whisper.Whisper
+
+    def build_while_another_thread_creates_a_layer(dims):
+        creating_thread = threading.Thread(target=lambda: other_thread_layers.append(torch.nn.Linear(4, 4)))
+        creating_thread.start()
+        creating_thread.join()
+        return build_whisper(dims)
+
+    monkeypatch.setattr(whisper, "Whisper", build_while_another_thread_creates_a_layer)
+    model = models.build_empty_whisper_model(asdict(random_whisper_model.dims))
+    assert model.decoder.ln.weight.is_meta and not model.alignment_heads.is_meta
+    assert not other_thread_layers[0].weight.is_meta and other_thread_layers[0].weight.abs().sum() > 0
+
+
+def test_tensors_missing_from_the_state_dict_are_reported(random_whisper_model):
+    model = models.build_empty_whisper_model(asdict(random_whisper_model.dims))
+    state_dict = random_whisper_model.state_dict()
+    del state_dict["decoder.ln.weight"]
+    with pytest.raises(RuntimeError, match="decoder.ln.weight"):
+        models.load_whisper_state(model, state_dict, models.get_unsaved_buffers(random_whisper_model))
+
+
+def test_int8_quantization_swaps_every_whisper_linear(random_whisper_model):
+    float_model = copy.deepcopy(random_whisper_model)
+    quantized_model = models.quantize_whisper_model_int8(copy.deepcopy(random_whisper_model))
+    assert not any(isinstance(module, torch.nn.Linear) for module in quantized_model.modules())
+    assert sum(isinstance(module, torch.ao.nn.quantized.dynamic.Linear) for module in quantized_model.modules()) == sum(
+        type(module) is whisper.model.Linear for module in float_model.modules()
+    )
+    assert torch.allclose(logits(quantized_model), logits(float_model), atol=1e-2)
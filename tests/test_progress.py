@@ -0,0 +1,106 @@
+import io
+import json
+import sys
+import threading
+import types
+
+import pytest
+
+from auto_subtitle import backends
+from auto_subtitle.progress import ProgressReporter
+
+
+def read_events(stream):
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+def test_chunk_events_carry_progress_rtf_and_eta():
+    stream = io.StringIO()
+    reporter = ProgressReporter(stream)
+    reporter.file_planned("video.mp4", 3, 30.0, done_chunks=1, done_audio_sec=10.0)
+    reporter.chunk_done("video.mp4", 10.0)
+    reporter.chunk_done("video.mp4", None, error="decoder failed")
+    reporter.file_finished("video.mp4", None)
+    planned, first_chunk, last_chunk, finished = read_events(stream)
+    assert (planned["event"], planned["done_audio_sec"]) == ("file_planned", 10.0)
+    assert (first_chunk["chunks_done"], first_chunk["audio_done_sec"], first_chunk["audio_total_sec"]) == (2, 20.0, 30.0)
+    # The recovered chunk counts towards progress but not towards the real-time factor.
+    assert first_chunk["rtf"] is not None and first_chunk["eta_sec"] == pytest.approx(first_chunk["rtf"] * 10.0, abs=0.1)
+    assert (last_chunk["audio_sec"], last_chunk["error"], last_chunk["eta_sec"]) == (10.0, "decoder failed", 0.0)
+    assert (finished["event"], finished["ok"]) == ("file_finished", False)
+
+
+def test_file_progress_is_throttled_and_learns_the_length():
+    stream = io.StringIO()
+    reporter = ProgressReporter(stream)
+    reporter.file_planned("video.mp4", 1, None)
+    reporter.file_progress("video.mp4", 5.0, 60.0)
+    reporter.file_progress("video.mp4", 6.0, 60.0) # Within FILE_PROGRESS_INTERVAL_SEC of the previous one.
+    progress_events = [event for event in read_events(stream) if event["event"] == "file_progress"]
+    assert len(progress_events) == 1 and (progress_events[0]["audio_done_sec"], progress_events[0]["audio_total_sec"]) == (5.0, 60.0)
+
+
+def test_a_closed_stream_disables_the_reporter():
+    stream = io.StringIO()
+    reporter = ProgressReporter(stream)
+    stream.close()
+    reporter.error("failed") # Must not raise.
+    assert not reporter.enabled
+    ProgressReporter().emit("stage_started") # Without a stream every event is dropped.
+
+
+class FakeTqdm:
+    def __init__(self, total=None, **kwargs):
+        self.total = total
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def update(self, n=1):
+        pass
+
+
+@pytest.fixture
+def fake_whisper(monkeypatch):
+    # A whisper whose transcribe() module creates its progress bar through its `tqdm` global, like whisper.transcribe.
+    transcribe_module = types.ModuleType("fake_whisper_transcribe")
+    transcribe_module.tqdm = types.ModuleType("tqdm")
+    transcribe_module.tqdm.tqdm = FakeTqdm
+
+    def transcribe(model, audio, **options):
+        with sys.modules["fake_whisper_transcribe"].tqdm.tqdm(total=3000) as progress_bar:
+            progress_bar.update(1000)
+            worker = threading.Thread(target=progress_bar.update, args=(500,)) # Another thread's updates are not this call's.
+            worker.start()
+            worker.join()
+            progress_bar.update(2500)
+        return {"segments": [{"start": 0.0, "end": 30.0, "text": " done"}]}
+
+    transcribe.__module__ = "fake_whisper_transcribe"
+    monkeypatch.setitem(sys.modules, "fake_whisper_transcribe", transcribe_module)
+    monkeypatch.setattr(backends, "whisper", types.SimpleNamespace(transcribe=transcribe, audio=types.SimpleNamespace(FRAMES_PER_SECOND=100)))
+    monkeypatch.setattr(backends, "WHISPER_PROGRESS_HOOK_WARNED", False)
+    model = types.SimpleNamespace(transcribe=lambda audio, **options: transcribe(model, audio, **options))
+    return transcribe_module, backends.WhisperBackend(model)
+
+
+def test_whisper_progress_is_reported_through_its_tqdm_bar(fake_whisper):
+    transcribe_module, backend = fake_whisper
+    original_tqdm = transcribe_module.tqdm
+    progress = []
+    segments = backend.transcribe("audio.wav", {}, lambda done_sec, total_sec: progress.append((done_sec, total_sec)))
+    assert progress == [(10.0, 30.0), (30.0, 30.0)] and segments[0]["text"] == " done"
+    assert transcribe_module.tqdm is original_tqdm
+
+
+def test_whisper_without_the_expected_tqdm_global_transcribes_without_progress(fake_whisper, capsys):
+    transcribe_module, backend = fake_whisper
+    transcribe_module.tqdm = types.SimpleNamespace(tqdm=FakeTqdm) # Not the tqdm module any more: left alone.
+    progress = []
+    for _ in range(2):
+        assert backend.transcribe("audio.wav", {}, lambda *progress_args: progress.append(progress_args))[0]["text"] == " done"
+    assert progress == [] and isinstance(transcribe_module.tqdm, types.SimpleNamespace)
+    assert capsys.readouterr().err.count("per-chunk progress is not reported") == 1
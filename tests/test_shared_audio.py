@@ -0,0 +1,100 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from auto_subtitle import cli
+
+
+@pytest.fixture
+def worker_attachments(monkeypatch):
+    # A fresh per-"worker" attachment table, closed again before the test's blocks are unlinked.
+    attachments = {}
+    monkeypatch.setattr(cli, "WORKER_SHARED_AUDIO", attachments)
+    yield attachments
+    for shared_block in attachments.values():
+        try:
+            shared_block.close()
+        except BufferError:
+            pass
+
+
+@pytest.fixture
+def shared_waveform(worker_attachments):
+    waveform = np.arange(48000, dtype=np.float32) / 48000
+    shared_block = cli.create_shared_audio_block(waveform)
+    yield waveform, shared_block
+    attachment = worker_attachments.pop(shared_block.name, None)
+    if attachment is not None: attachment.close()
+    cli.release_shared_audio_block(shared_block)
+
+
+class FakeBackend:
+    def __init__(self):
+        self.calls = []
+
+    def transcribe_chunks(self, audio_chunks, options, batch_size=1):
+        self.calls.append(([chunk.copy() for chunk in audio_chunks], options, batch_size))
+        return [[{"start": 0.5, "end": 10.0, "text": f" chunk {i}"}] for i in range(len(audio_chunks))]
+
+
+def test_attach_reads_the_shared_waveform(shared_waveform):
+    waveform, shared_block = shared_waveform
+    view = cli.attach_shared_audio(shared_block.name, len(waveform))
+    assert np.array_equal(view, waveform)
+    del view
+
+
+def test_pool_tasks_carry_descriptors_not_audio(shared_waveform):
+    waveform, shared_block = shared_waveform
+    chunk_batches = [[(0, 16000, 0.0)], [(16000, 32000, 1.0)]]
+    tasks = cli.make_pool_tasks(shared_block, len(waveform), chunk_batches, "tiny", None, {"task": "transcribe"}, 1)
+    # Longest batch first; every task names the block and lists (offset, length, start_sec) descriptors.
+    assert [(task[0], task[1], task[2]) for task in tasks] == [(shared_block.name, 48000, [(16000, 32000, 1.0)]), (shared_block.name, 48000, [(0, 16000, 0.0)])]
+
+
+def test_worker_transcribes_slices_of_the_shared_waveform(monkeypatch, shared_waveform):
+    waveform, shared_block = shared_waveform
+    backend = FakeBackend()
+    monkeypatch.setattr(cli, "WORKER_BACKEND", backend)
+    monkeypatch.setattr(cli, "WORKER_TASK_EVENTS", None)
+    chunk_batch = [(0, 16000, 2.0), (32000, 8000, 7.0)]
+    result = cli.transcribe_chunk_worker((shared_block.name, len(waveform), chunk_batch, "tiny", None, {"task": "transcribe"}, 2, "whisper"))
+
+    assert result["error"] is None and result["chunk_start_sec"] == 2.0
+    (audio_chunks, options, batch_size), = backend.calls
+    assert np.array_equal(audio_chunks[0], waveform[:16000]) and np.array_equal(audio_chunks[1], waveform[32000:40000])
+    assert (options, batch_size) == ({"task": "transcribe"}, 2)
+    # Segment times move to the file's timeline, clamped to each chunk's own length.
+    assert [(segment["start"], segment["end"], segment["text"]) for segment in result["segments"]] == [(2.5, 3.0, " chunk 0"), (7.5, 7.5, " chunk 1")]
+
+
+def test_worker_keeps_a_bounded_number_of_attachments(monkeypatch, worker_attachments):
+    monkeypatch.setattr(cli, "WORKER_SHARED_AUDIO_MAX_ATTACHMENTS", 2)
+    shared_blocks = [cli.create_shared_audio_block(np.full(8, i, dtype=np.float32)) for i in range(3)]
+    try:
+        for shared_block in shared_blocks: cli.attach_shared_audio(shared_block.name, 8)
+        assert list(worker_attachments) == [shared_blocks[1].name, shared_blocks[2].name]
+        # Reusing an attachment makes it the most recent one.
+        cli.attach_shared_audio(shared_blocks[1].name, 8)
+        assert list(worker_attachments) == [shared_blocks[2].name, shared_blocks[1].name]
+    finally:
+        for shared_block in worker_attachments.values(): shared_block.close()
+        worker_attachments.clear()
+        for shared_block in shared_blocks: cli.release_shared_audio_block(shared_block)
+
+
+def test_release_unlinks_even_when_close_fails(capsys):
+    class ExportedBlock:
+        name = "psm_test"
+        unlinked = False
+
+        def close(self):
+            raise BufferError("cannot close exported pointers exist")
+
+        def unlink(self):
+            self.unlinked = True
+
+    shared_block = ExportedBlock()
+    cli.release_shared_audio_block(shared_block)
+    assert shared_block.unlinked
+    assert "Could not close shared audio block psm_test" in capsys.readouterr().err
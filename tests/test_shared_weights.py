@@ -0,0 +1,52 @@
+import gc
+
+import pytest
+
+from auto_subtitle import cli
+
+torch = pytest.importorskip("torch")
+
+
+@pytest.fixture
+def shared_weights(random_whisper_model):
+    shared_block, weights_spec = cli.share_whisper_model_weights(random_whisper_model)
+    yield shared_block, weights_spec
+    gc.collect() # Drops the rebuilt models' views of the block before it is closed.
+    cli.release_shared_weights_block(shared_block)
+
+
+def test_rebuilt_model_matches_the_original(random_whisper_model, shared_weights):
+    shared_block, weights_spec = shared_weights
+    model = cli.build_whisper_model_from_shared_weights(weights_spec, shared_block).eval()
+    original_state = random_whisper_model.state_dict()
+    assert all(torch.equal(tensor, original_state[name]) for name, tensor in model.state_dict().items())
+    assert model.alignment_heads.is_sparse and torch.equal(model.decoder.mask, random_whisper_model.decoder.mask)
+    mel = torch.randn(1, 80, 3000, generator=torch.Generator().manual_seed(0))
+    tokens = torch.tensor([[50258, 50259, 50359]])
+    with torch.no_grad():
+        assert torch.allclose(model(mel, tokens), random_whisper_model(mel, tokens))
+
+
+def test_rebuilt_parameters_are_views_of_the_block(shared_weights):
+    shared_block, weights_spec = shared_weights
+    model = cli.build_whisper_model_from_shared_weights(weights_spec, shared_block)
+    offset, _, dtype = weights_spec["tensors"]["decoder.ln.weight"]
+    torch.frombuffer(shared_block.buf, dtype=dtype, count=1, offset=offset)[0] = 42.0
+    assert model.decoder.ln.weight[0].item() == 42.0
+
+
+def test_worker_attaches_to_the_shared_weights(shared_weights, monkeypatch):
+    _, weights_spec = shared_weights
+    monkeypatch.setattr(cli, "WORKER_BACKEND", None)
+    monkeypatch.setattr(cli, "WORKER_SHARED_WEIGHTS", None)
+    cli.load_whisper_model_for_worker("tiny", None, weights_spec)
+    assert isinstance(cli.WORKER_BACKEND, cli.WhisperBackend)
+    assert cli.WORKER_SHARED_WEIGHTS.name == weights_spec["block_name"]
+    monkeypatch.setattr(cli, "WORKER_BACKEND", None)
+    cli.WORKER_SHARED_WEIGHTS.close()
+
+
+def test_missing_torch_support_is_reported(monkeypatch):
+    monkeypatch.delattr(torch, "frombuffer")
+    with pytest.raises(RuntimeError, match="torch.frombuffer"):
+        cli.check_shared_weights_support()
@@ -0,0 +1,62 @@
+import threading
+
+from auto_subtitle.cli import run_staged_pipeline
+
+
+def test_items_pass_through_every_stage_in_order():
+    stages = [("extract", lambda item: item + ["extract"]), ("transcribe", lambda item: item + ["transcribe"]), ("burn", lambda item: item + ["burn"])]
+    results = run_staged_pipeline([[i] for i in range(5)], stages)
+    assert results == [[i, "extract", "transcribe", "burn"] for i in range(5)]
+
+
+def test_failed_item_is_dropped_and_the_rest_continue(capsys):
+    def transcribe(item):
+        if item["video"] == "b.mp4": raise RuntimeError("model crashed")
+        return item["video"]
+
+    results = run_staged_pipeline([{"video": "a.mp4"}, {"video": "b.mp4"}, {"video": "c.mp4"}], [("extract", dict), ("transcribe", transcribe)])
+    assert results == ["a.mp4", "c.mp4"]
+    assert "Pipeline stage 'transcribe' failed: model crashed" in capsys.readouterr().err
+
+
+def test_next_file_is_extracted_while_the_current_one_is_transcribed():
+    second_extracted = threading.Event()
+    extracted = []
+
+    def extract(item):
+        extracted.append(item)
+        if item == 1: second_extracted.set()
+        return item
+
+    def transcribe(item):
+        # Blocks on file 0 until file 1 has been extracted; a sequential loop would never get there.
+        if item == 0: assert second_extracted.wait(timeout=10)
+        return item
+
+    assert run_staged_pipeline([0, 1, 2], [("extract", extract), ("transcribe", transcribe)]) == [0, 1, 2]
+
+
+def test_queue_depth_bounds_work_ahead():
+    release_transcribe = threading.Event()
+    extracted = []
+    extract_calls = threading.Semaphore(0)
+
+    def extract(item):
+        extracted.append(item)
+        extract_calls.release()
+        return item
+
+    def transcribe(item):
+        release_transcribe.wait(timeout=10)
+        return item
+
+    pipeline_results = []
+    pipeline_thread = threading.Thread(target=lambda: pipeline_results.extend(run_staged_pipeline(list(range(10)), [("extract", extract), ("transcribe", transcribe)], queue_depth=1)))
+    pipeline_thread.start()
+    # With transcribe stuck on item 0: item 1 waits in the queue and item 2 is extracted but cannot be handed on.
+    for _ in range(3): assert extract_calls.acquire(timeout=10)
+    assert not extract_calls.acquire(timeout=0.3)
+    assert extracted == [0, 1, 2]
+    release_transcribe.set()
+    pipeline_thread.join(timeout=10)
+    assert pipeline_results == list(range(10))
@@ -0,0 +1,107 @@
+import os
+import time
+
+import pytest
+
+from auto_subtitle import cli
+from test_longest_first import FakePool, make_task, task_result
+
+
+def cue(start_sec, text, **fields):
+    return dict({"start": start_sec, "end": start_sec + 1.0, "text": f" {text}", "no_speech_prob": 0.1}, **fields)
+
+
+def make_writer(tmp_path, merge_repetitive=False):
+    return cli.StreamingSubtitleWriter("video.mp4", {"srt": str(tmp_path / "video.srt")}, 0.6, merge_repetitive, False)
+
+
+def wait_for_text(path, text):
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as subtitle_file:
+                if text in subtitle_file.read(): return True
+        time.sleep(0.01)
+    return False
+
+
+def test_chunks_are_written_in_timeline_order(tmp_path):
+    subtitle_writer = make_writer(tmp_path)
+    subtitle_writer.add_chunk(2, [cue(20.0, "third")])
+    subtitle_writer.add_chunk(1, [cue(10.0, "second")])
+    # Nothing passes the watermark until chunk 0 arrives.
+    assert subtitle_writer.watermark == 0 and subtitle_writer.segments_received == 0
+    subtitle_writer.add_chunk(0, [cue(0.0, "first"), cue(1.0, "quiet", no_speech_prob=0.9)])
+    assert subtitle_writer.watermark == 3 and subtitle_writer.completed_chunks == {}
+    assert subtitle_writer.close() == str(tmp_path / "video.srt")
+    with open(tmp_path / "video.srt", encoding="utf-8") as subtitle_file:
+        content = subtitle_file.read()
+    assert content.index("first") < content.index("second") < content.index("third")
+    assert "quiet" not in content
+
+
+def test_finished_cues_are_on_disk_before_close(tmp_path):
+    subtitle_writer = make_writer(tmp_path, merge_repetitive=True)
+    subtitle_writer.add_chunk(0, [cue(0.0, "first"), cue(1.0, "second")])
+    # "second" is held back by the repetition merge until the next cue shows it is not repeated.
+    assert wait_for_text(str(tmp_path / "video.srt"), "first")
+    subtitle_writer.add_chunk(1, [cue(2.0, "second"), cue(3.0, "third")])
+    assert wait_for_text(str(tmp_path / "video.srt"), "00:00:01,000 --> 00:00:03,000\nsecond")
+    subtitle_writer.close()
+
+
+def test_chunks_after_a_missing_one_are_not_written(tmp_path, capsys):
+    subtitle_writer = make_writer(tmp_path)
+    subtitle_writer.add_chunk(0, [cue(0.0, "first")])
+    subtitle_writer.add_chunk(2, [cue(20.0, "third")])
+    assert subtitle_writer.close() == str(tmp_path / "video.srt")
+    with open(tmp_path / "video.srt", encoding="utf-8") as subtitle_file:
+        assert "third" not in subtitle_file.read()
+    assert "1 chunk(s) of 'video' completed after a missing earlier chunk" in capsys.readouterr().err
+
+
+def test_no_cues_removes_stale_subtitles(tmp_path):
+    (tmp_path / "video.srt").write_text("stale")
+    subtitle_writer = make_writer(tmp_path)
+    subtitle_writer.add_chunk(0, [cue(0.0, "quiet", no_speech_prob=0.9)])
+    assert subtitle_writer.close() is None
+    assert not (tmp_path / "video.srt").exists()
+
+
+class FakeBackend:
+    name = "whisper"
+    is_multilingual = True
+
+    def transcribe_chunks(self, audio_chunks, options, batch_size=1):
+        return [[{"start": 0.0, "end": len(chunk) / 16000, "text": f" {len(chunk)}", "no_speech_prob": 0.0}] for chunk in audio_chunks]
+
+
+class RecordingWriter:
+    def __init__(self):
+        self.chunks = {}
+
+    def add_chunk(self, chunk_index, segments):
+        self.chunks[chunk_index] = segments
+
+
+@pytest.mark.parametrize("collect_segments", [True, False])
+def test_transcribed_segments_are_only_collected_on_request(collect_segments):
+    np = pytest.importorskip("numpy")
+    pytest.importorskip("torch")
+    waveform = np.zeros(5 * 16000, dtype=np.float32)
+    prepared_audio = {"use_vad": True, "vad_chunks": [(0, 16000, 0.0), (32000, 8000, 2.0), (48000, 4000, 3.0)], "waveform": waveform, "audio": waveform}
+    subtitle_writer = RecordingWriter()
+    segments = cli.transcribe_prepared_audio(
+        "video.mp4", prepared_audio, FakeBackend(), "tiny", None, {"task": "transcribe", "language": "en"}, 1, False,
+        batch_size=2, subtitle_writer=subtitle_writer, collect_segments=collect_segments,
+    )
+    assert [[segment["text"] for segment in subtitle_writer.chunks[i]] for i in sorted(subtitle_writer.chunks)] == [[" 16000", " 8000"], [" 4000"]]
+    assert [segment["text"] for segment in segments] == ([" 16000", " 8000", " 4000"] if collect_segments else [])
+    assert prepared_audio["waveform"] is None and prepared_audio["failed_chunks"] == []
+
+
+def test_streamed_pool_results_drop_their_segments():
+    streamed = []
+    task_results, *_ = cli.run_pool_tasks_longest_first(FakePool(lambda task, attempt: task_result(task)), [make_task(0.0)], 1, on_task_result=streamed.append)
+    assert len(streamed[0]["segments"]) == 1
+    assert "segments" not in task_results[0] and task_results[0]["chunk_start_sec"] == 0.0
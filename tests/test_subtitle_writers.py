@@ -0,0 +1,152 @@
+import io
+import json
+
+import pytest
+
+from auto_subtitle.utils import SUBTITLE_FORMATS, format_ass_timestamp, format_timestamp, output_formats_arg, write_subtitles
+
+TRANSCRIPT = [
+    {"start": 0.0, "end": 1.5, "text": " Hello there. "},
+    {"start": 3661.25, "end": 3662.0, "text": "a --> b {x}", "words": [{"word": " a", "start": 3661.25, "end": 3661.5, "probability": 0.91234}]},
+]
+
+
+def write(output_format, transcript=TRANSCRIPT):
+    file = io.StringIO()
+    write_subtitles(iter(transcript), file, output_format)
+    return file.getvalue()
+
+
+def test_timestamps():
+    assert format_timestamp(3661.25, always_include_hours=True) == "01:01:01,250"
+    assert format_timestamp(1.5, decimal_marker=".") == "00:01.500"
+    assert format_ass_timestamp(3661.256) == "1:01:01.26"
+
+
+def test_srt_round_trip():
+    cues = write("srt").split("\n\n")
+    assert cues[-1] == ""
+    parsed = [cue.split("\n") for cue in cues[:-1]]
+    assert parsed == [
+        ["1", "00:00:00,000 --> 00:00:01,500", "Hello there."],
+        ["2", "01:01:01,250 --> 01:01:02,000", "a -> b {x}"],
+    ]
+
+
+def test_vtt():
+    assert write("vtt") == "WEBVTT\n\n00:00:00.000 --> 00:00:01.500\nHello there.\n\n01:01:01.250 --> 01:01:02.000\na -> b {x}\n\n"
+
+
+def test_ass_escapes_override_braces():
+    dialogue_lines = [line for line in write("ass").splitlines() if line.startswith("Dialogue:")]
+    assert dialogue_lines == [
+        "Dialogue: 0,0:00:00.00,0:00:01.50,Default,,0,0,0,,Hello there.",
+        "Dialogue: 0,1:01:01.25,1:01:02.00,Default,,0,0,0,,a --> b \\{x\\}",
+    ]
+
+
+def test_json_round_trip():
+    cues = json.loads(write("json"))
+    assert cues[0] == {"index": 1, "start": 0.0, "end": 1.5, "text": "Hello there."}
+    assert cues[1]["words"] == [{"word": " a", "start": 3661.25, "end": 3661.5, "probability": 0.9123}]
+    assert json.loads(write("json", [])) == []
+
+
+@pytest.mark.parametrize("output_format", list(SUBTITLE_FORMATS))
+def test_flush_writes_only_buffered_cues(output_format):
+    file = io.StringIO()
+    subtitle_writer = SUBTITLE_FORMATS[output_format](file)
+    subtitle_writer.write(TRANSCRIPT[0])
+    assert file.getvalue() == ""
+    subtitle_writer.flush()
+    written_after_first_flush = file.getvalue()
+    subtitle_writer.write(TRANSCRIPT[1])
+    subtitle_writer.close()
+    assert file.getvalue().startswith(written_after_first_flush)
+    assert file.getvalue() == write(output_format)
+
+
+def test_output_formats_arg():
+    assert output_formats_arg("SRT, vtt,srt,json") == ["srt", "vtt", "json"]
+    with pytest.raises(ValueError):
+        output_formats_arg("srt,txt")
+
+
+def test_repeated_cues_merge_their_words():
+    from auto_subtitle.cli import merge_repetitive_segments
+    segments = [
+        {"start": 0.0, "end": 1.0, "text": " Yes.", "words": [{"word": " Yes.", "start": 0.1, "end": 0.9}]},
+        {"start": 1.0, "end": 2.0, "text": " yes", "words": [{"word": " yes", "start": 1.2, "end": 1.8}]},
+    ]
+    merged = list(merge_repetitive_segments(iter(segments), "video.mp4", False))
+    assert len(merged) == 1 and merged[0]["end"] == 2.0
+    assert [word["start"] for word in merged[0]["words"]] == [0.1, 1.2]
+    assert len(segments[0]["words"]) == 1 # The input cue is left as it was.
+
+
+class WordTimingBackend:
+    # Returns one cue per chunk with word timings relative to the chunk, and records the options it was given.
+    name = "whisper"
+    is_multilingual = True
+
+    def __init__(self):
+        self.options = []
+
+    def transcribe_chunks(self, audio_chunks, options, batch_size=1):
+        self.options.append(options)
+        return [[{"start": 0.5, "end": 1.5, "text": " same", "no_speech_prob": 0.0, "words": [{"word": " same", "start": 0.5, "end": 1.5, "probability": 0.9}]}] for _ in audio_chunks]
+
+    def transcribe_all_tasks(self, audio, options, progress_callback=None):
+        return self.transcribe_chunks([audio], options)[0]
+
+
+def test_json_output_lists_words_on_the_file_timeline(tmp_path):
+    np = pytest.importorskip("numpy")
+    pytest.importorskip("torch")
+    from auto_subtitle import cli
+    waveform = np.zeros(10 * 16000, dtype=np.float32)
+    prepared_audio = {"use_vad": True, "vad_chunks": [(16000, 2 * 16000, 1.0), (5 * 16000, 2 * 16000, 5.0)], "waveform": waveform, "audio": waveform}
+    subtitle_writer = cli.StreamingSubtitleWriter("video.mp4", {"json": str(tmp_path / "video.json")}, 0.6, True, False)
+    cli.transcribe_prepared_audio("video.mp4", prepared_audio, WordTimingBackend(), "tiny", None, {"task": "transcribe", "language": "en", "word_timestamps": True}, 1, False, subtitle_writer=subtitle_writer)
+    subtitle_writer.close()
+    with open(tmp_path / "video.json", encoding="utf-8") as json_file:
+        cues = json.load(json_file)
+    # Both chunks say the same thing, so the repetition merge joins them into one cue with both chunks' words.
+    assert [(cue["start"], cue["end"]) for cue in cues] == [(1.5, 6.5)]
+    assert [(word["start"], word["end"]) for word in cues[0]["words"]] == [(1.5, 2.5), (5.5, 6.5)]
+
+
+def test_json_output_requests_word_timestamps(tmp_path, monkeypatch):
+    np = pytest.importorskip("numpy")
+    pytest.importorskip("torch")
+    from auto_subtitle import cli
+    backend = WordTimingBackend()
+    monkeypatch.setattr(cli, "load_backend", lambda *args, **kwargs: backend)
+    monkeypatch.setattr(cli, "get_audio", lambda paths, *args: {path: np.zeros(3 * 16000, dtype=np.float32) for path in paths})
+    parser = cli.build_arg_parser()
+    for output_format, word_timestamps in (("srt,json", True), ("srt", None)):
+        args = parser.parse_args(["video.mp4", "--output_format", output_format, "--srt_only", "True", "--use_vad", "False", "--output_dir", str(tmp_path)]).__dict__
+        for process_option in ("daemon", "progress_format", "progress_fd"): args.pop(process_option)
+        cli.run_subtitle_job(parser, args, cli.ResidentModels())
+        assert backend.options[-1].get("word_timestamps") is word_timestamps
+    with open(tmp_path / "video.json", encoding="utf-8") as json_file:
+        assert json.load(json_file)[0]["words"][0]["word"] == " same"
+    # Transcripts decoded with word timings are cached apart from those without.
+    key_options = dict(audio_hash="abc", model_name="small", use_vad_processing=False, vad_params={}, batch_size=1)
+    assert cli.get_transcription_cache_key(whisper_options={"word_timestamps": True}, **key_options) != cli.get_transcription_cache_key(whisper_options={}, **key_options)
+
+
+def test_word_timestamps_keep_chunks_off_the_batched_path():
+    pytest.importorskip("torch")
+    from auto_subtitle.backends import WhisperBackend
+
+    class RecordingWhisperBackend(WhisperBackend):
+        def transcribe_chunk_batch(self, audio_chunks, whisper_options):
+            raise AssertionError("batched decoding has no word timings")
+
+        def transcribe(self, audio, options, progress_callback=None):
+            return [{"start": 0.0, "end": 1.0, "text": f" {options['task']}", "words": []}]
+
+    backend = RecordingWhisperBackend(model=None)
+    segments = backend.transcribe_chunks([[0.0] * 16000] * 2, {"task": "both", "word_timestamps": True}, batch_size=2)
+    assert [[segment["text"] for segment in chunk_segments] for chunk_segments in segments] == [[" transcribe", " translate"]] * 2
@@ -0,0 +1,103 @@
+import types
+
+import pytest
+
+from auto_subtitle import backends
+from auto_subtitle.backends import TASK_BOTH, FasterWhisperBackend, WhisperBackend
+from auto_subtitle.cli import make_streaming_subtitle_writer
+
+from test_backends import FakeFasterWhisperModel
+from test_batched_decoding import segment_texts
+
+
+class FakeWhisperModel:
+    def __init__(self):
+        self.calls = []
+
+    def transcribe(self, audio, **options):
+        self.calls.append(options)
+        return {"segments": [{"start": 0.0, "end": 1.0, "text": f" {options['task']} of {len(audio)}"}]}
+
+
+def test_whisper_transcribe_all_tasks_runs_one_pass_per_task():
+    model = FakeWhisperModel()
+    segments = WhisperBackend(model).transcribe_all_tasks([0.0] * 8, {"task": TASK_BOTH, "language": "de"})
+    assert model.calls == [{"task": "transcribe", "language": "de"}, {"task": "translate", "language": "de"}]
+    assert [(segment["task"], segment["text"]) for segment in segments] == [("transcribe", " transcribe of 8"), ("translate", " translate of 8")]
+
+
+def test_single_task_segments_are_not_tagged():
+    segments = WhisperBackend(FakeWhisperModel()).transcribe_all_tasks([0.0], {"task": "translate"})
+    assert "task" not in segments[0]
+
+
+def test_task_both_progress_spans_both_passes():
+    progress = []
+    segments = FasterWhisperBackend(FakeFasterWhisperModel()).transcribe_all_tasks([0.0], {"task": TASK_BOTH}, lambda *p: progress.append(p))
+    assert [segment["task"] for segment in segments] == ["transcribe", "transcribe", "translate", "translate"]
+    assert progress == [(0.75, 4.0), (2.0, 4.0), (2.75, 4.0), (4.0, 4.0)]
+
+
+def test_task_both_sends_single_short_chunks_through_the_shared_encoder_batch(monkeypatch):
+    monkeypatch.setattr(backends, "whisper", types.SimpleNamespace(audio=types.SimpleNamespace(N_SAMPLES=10)))
+    backend = WhisperBackend(FakeWhisperModel())
+    batches = []
+
+    def transcribe_chunk_batch(audio_chunks, options):
+        batches.append([len(chunk) for chunk in audio_chunks])
+        return [[{"text": "batched", "task": "transcribe"}, {"text": "batched", "task": "translate"}] for _ in audio_chunks]
+
+    backend.transcribe_chunk_batch = transcribe_chunk_batch
+    segments_per_chunk = backend.transcribe_chunks([[0.0] * 4, [0.0] * 20, [0.0] * 6], {"task": TASK_BOTH}, batch_size=1)
+    # The 20-sample chunk is longer than one window and is transcribed once per task instead.
+    assert batches == [[4], [6]]
+    assert [[(segment["task"], segment["text"]) for segment in segments] for segments in segments_per_chunk] == [
+        [("transcribe", "batched"), ("translate", "batched")],
+        [("transcribe", " transcribe of 20"), ("translate", " translate of 20")],
+        [("transcribe", "batched"), ("translate", "batched")],
+    ]
+
+
+def test_task_both_falls_back_to_one_pass_per_task_when_the_batch_fails(monkeypatch):
+    monkeypatch.setattr(backends, "whisper", types.SimpleNamespace(audio=types.SimpleNamespace(N_SAMPLES=10)))
+    backend = WhisperBackend(FakeWhisperModel())
+
+    def transcribe_chunk_batch(audio_chunks, options):
+        raise RuntimeError("out of memory")
+
+    backend.transcribe_chunk_batch = transcribe_chunk_batch
+    segments_per_chunk = backend.transcribe_chunks([[0.0] * 4], {"task": TASK_BOTH})
+    assert [segment["task"] for segment in segments_per_chunk[0]] == ["transcribe", "translate"]
+
+
+def test_task_both_writes_one_subtitle_file_per_task(tmp_path):
+    subtitle_writer = make_streaming_subtitle_writer(str(tmp_path / "clip.mp4"), True, str(tmp_path), ["srt", "vtt"], TASK_BOTH, 0.6, False, False)
+    # Chunks complete out of order; each file still lists them in timeline order.
+    subtitle_writer.add_chunk(1, [
+        {"start": 2.0, "end": 3.0, "text": "zwei", "task": "transcribe", "no_speech_prob": 0.1},
+        {"start": 2.0, "end": 3.0, "text": "two", "task": "translate", "no_speech_prob": 0.1},
+    ])
+    subtitle_writer.add_chunk(0, [
+        {"start": 0.0, "end": 1.0, "text": "eins", "task": "transcribe", "no_speech_prob": 0.1},
+        {"start": 0.0, "end": 1.0, "text": "one", "task": "translate", "no_speech_prob": 0.1},
+    ])
+    assert subtitle_writer.close() == str(tmp_path / "clip.srt")
+    assert (tmp_path / "clip.srt").read_text(encoding="utf-8") == "1\n00:00:00,000 --> 00:00:01,000\neins\n\n2\n00:00:02,000 --> 00:00:03,000\nzwei\n\n"
+    assert (tmp_path / "clip.en.srt").read_text(encoding="utf-8") == "1\n00:00:00,000 --> 00:00:01,000\none\n\n2\n00:00:02,000 --> 00:00:03,000\ntwo\n\n"
+    assert (tmp_path / "clip.en.vtt").read_text(encoding="utf-8").startswith("WEBVTT\n\n00:00:00.000 --> 00:00:01.000\none\n")
+
+
+@pytest.mark.parametrize("language", ["de", None])
+def test_shared_encoder_pass_matches_one_transcribe_call_per_task(random_whisper_model, random_model_options, language):
+    np = pytest.importorskip("numpy")
+    rng = np.random.default_rng(1)
+    audio_chunks = [(rng.standard_normal(int(16000 * duration_sec)) * 0.1).astype(np.float32) for duration_sec in (2.1, 6.4)]
+    backend = WhisperBackend(random_whisper_model)
+    options = dict(random_model_options, language=language)
+
+    shared_encoder = backend.transcribe_chunks(audio_chunks, dict(options, task=TASK_BOTH))
+    for chunk, chunk_segments in zip(audio_chunks, shared_encoder):
+        for task in ("transcribe", "translate"):
+            task_segments = [segment for segment in chunk_segments if segment["task"] == task]
+            assert task_segments
+            assert segment_texts(task_segments) == segment_texts(backend.transcribe(chunk, dict(options, task=task, verbose=None)))
@@ -0,0 +1,40 @@
+import argparse
+
+import pytest
+
+from auto_subtitle import cli
+
+
+@pytest.fixture
+def eight_cores(monkeypatch):
+    monkeypatch.setattr(cli, "get_physical_core_count", lambda: 8)
+
+
+def test_threads_per_worker_arg():
+    assert cli.threads_per_worker_arg("AUTO") == "auto"
+    assert cli.threads_per_worker_arg("3") == 3
+    for value in ("0", "-2", "many"):
+        with pytest.raises(argparse.ArgumentTypeError):
+            cli.threads_per_worker_arg(value)
+
+
+@pytest.mark.parametrize("model_name, expected", [("tiny", (8, 1, 1)), ("small.en", (4, 2, 2)), ("medium", (2, 4, 4)), ("large-v3", (1, 8, 8)), ("unknown", (4, 2, 2))])
+def test_auto_workers_follow_the_model_size(eight_cores, model_name, expected):
+    assert cli.plan_thread_budget(0, "auto", model_name, True) == expected
+
+
+def test_explicit_workers_split_the_cores(eight_cores):
+    assert cli.plan_thread_budget(3, "auto", "tiny", True) == (3, 2, 2)
+    assert cli.plan_thread_budget(3, 4, "tiny", True) == (3, 4, 4)
+    assert cli.plan_thread_budget(0, 3, "large", True) == (2, 3, 3)
+
+
+def test_single_process_runs_get_every_core(eight_cores):
+    assert cli.plan_thread_budget(4, "auto", "tiny", False) == (4, 8, 8)
+    assert cli.plan_thread_budget(1, 2, "tiny", True) == (1, 8, 8)
+
+
+def test_physical_core_count_falls_back_to_cpu_count(monkeypatch):
+    monkeypatch.setattr(cli, "psutil", None)
+    monkeypatch.setattr(cli.os, "cpu_count", lambda: None)
+    assert cli.get_physical_core_count() == 1
@@ -0,0 +1,72 @@
+import os
+
+import pytest
+
+from auto_subtitle.cache import TranscriptionCache, hash_audio, make_cache_key
+from auto_subtitle.cli import get_transcription_cache_key, load_cached_segments, store_cached_segments
+
+SEGMENTS = [{"start": 1.0, "end": 2.5, "text": " héllo", "no_speech_prob": 0.1}]
+VAD_PARAMS = {"threshold": 0.5}
+
+
+def cache_key(**overrides):
+    arguments = dict(
+        audio_hash="abc", model_name="small", whisper_options={"task": "transcribe", "language": None, "verbose": False},
+        use_vad_processing=True, vad_params=VAD_PARAMS, batch_size=1,
+    )
+    arguments.update(overrides)
+    return get_transcription_cache_key(**arguments)
+
+
+def test_round_trip(tmp_path):
+    cache = TranscriptionCache(str(tmp_path))
+    assert cache.get("key") is None
+    cache.put("key", SEGMENTS)
+    assert TranscriptionCache(str(tmp_path)).get("key") == SEGMENTS
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = TranscriptionCache(str(tmp_path), max_size_mb=2.5 / 1024)
+    segments = [{"text": "x" * 1000}]
+    for i, key in enumerate(["a", "b"]):
+        cache.put(key, segments)
+        os.utime(os.path.join(cache.cache_dir, f"{key}.json"), (i, i))
+    cache.get("a") # Reading "a" makes "b" the oldest entry.
+    cache.put("c", segments)
+    assert [cache.get(key) is not None for key in "abc"] == [True, False, True]
+
+
+def test_cached_segments_helpers(tmp_path):
+    cache = TranscriptionCache(str(tmp_path))
+    store_cached_segments(cache, "key", [])
+    assert load_cached_segments(cache, "key", "video.mp4") is None # Empty results are not cached.
+    store_cached_segments(cache, "key", SEGMENTS)
+    assert load_cached_segments(cache, "key", "video.mp4") == SEGMENTS
+    assert load_cached_segments(None, "key", "video.mp4") is None
+
+
+def test_hash_audio_matches_for_waveform_and_dtype():
+    np = pytest.importorskip("numpy")
+    waveform = np.linspace(-1, 1, 100, dtype=np.float32)
+    assert hash_audio(waveform) == hash_audio(waveform.astype(np.float64))
+    assert hash_audio(waveform) != hash_audio(waveform[::-1])
+
+
+def test_key_covers_decode_options_but_not_verbosity():
+    assert cache_key() == cache_key(whisper_options={"task": "transcribe", "language": None, "verbose": True})
+    assert cache_key() != cache_key(whisper_options={"task": "translate", "language": None})
+    assert cache_key() != cache_key(model_name="medium")
+    assert cache_key() != cache_key(batch_size=4)
+    assert cache_key() != cache_key(quantize="int8")
+    assert cache_key() != cache_key(backend="faster-whisper")
+    assert cache_key() != cache_key(vad_params={"threshold": 0.6})
+    # The VAD parameters do not matter when VAD is off.
+    assert cache_key(use_vad_processing=False) == cache_key(use_vad_processing=False, vad_params={"threshold": 0.6})
+    # Unquantized whisper keys are the plain make_cache_key of the decode options.
+    assert cache_key(whisper_options={"language": "en"}) == make_cache_key("abc", "small", {"whisper": {"language": "en"}, "vad": VAD_PARAMS, "batch_size": 1})
+
+
+def test_key_covers_language_detection_chunks_when_language_is_auto():
+    assert cache_key(language_detection_chunks=3) != cache_key(language_detection_chunks=0)
+    fixed_language = {"task": "transcribe", "language": "de"}
+    assert cache_key(whisper_options=fixed_language, language_detection_chunks=3) == cache_key(whisper_options=fixed_language, language_detection_chunks=0)
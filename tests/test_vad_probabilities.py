@@ -0,0 +1,79 @@
+import pytest
+
+from auto_subtitle import cli
+from auto_subtitle.cache import VadProbabilityCache
+from auto_subtitle.cli import speech_timestamps_from_probs
+
+
+def windows(*runs):
+    # (probability, window count) runs -> one probability per 512-sample window.
+    return [probability for probability, count in runs for _ in range(count)]
+
+
+def test_speech_timestamps_from_probs_pads_separate_regions():
+    pytest.importorskip("numpy")
+    speech_probs = windows((0.0, 10), (0.9, 20), (0.0, 10), (0.9, 20), (0.0, 10))
+    assert speech_timestamps_from_probs(speech_probs, 70 * 512) == [{"start": 4640, "end": 15840}, {"start": 20000, "end": 31200}]
+
+
+def test_speech_timestamps_from_probs_bridges_short_silences():
+    pytest.importorskip("numpy")
+    # Two low windows are shorter than min_silence_duration_ms, and 0.4 is above the end threshold of 0.35.
+    speech_probs = windows((0.0, 10), (0.9, 20), (0.0, 2), (0.9, 5), (0.4, 4), (0.9, 10))
+    assert speech_timestamps_from_probs(speech_probs, 51 * 512) == [{"start": 4640, "end": 51 * 512}]
+
+
+def test_speech_timestamps_from_probs_drops_short_and_missing_speech():
+    pytest.importorskip("numpy")
+    assert speech_timestamps_from_probs(windows((0.2, 50)), 50 * 512) == []
+    # Five windows (2560 samples) are under min_speech_duration_ms.
+    assert speech_timestamps_from_probs(windows((0.0, 10), (0.9, 5), (0.0, 10)), 25 * 512) == []
+
+
+def test_vad_probability_cache_round_trip(tmp_path):
+    np = pytest.importorskip("numpy")
+    cache = VadProbabilityCache(str(tmp_path))
+    speech_probs = np.array([0.0, 0.25, 0.9], dtype=np.float32)
+    assert cache.get("key") is None
+    cache.put("key", speech_probs)
+    assert np.allclose(VadProbabilityCache(str(tmp_path)).get("key"), speech_probs, atol=1e-3)
+
+
+def test_compute_vad_speech_probs_window_loop():
+    torch = pytest.importorskip("torch")
+    calls = []
+
+    def vad_model(window, sampling_rate):
+        calls.append(len(window))
+        return torch.tensor(float(window.abs().max()))
+
+    # A model without audio_forward is called window by window, the last window zero-padded.
+    speech_probs = cli.compute_vad_speech_probs(torch.cat([torch.zeros(512), torch.full((100,), 0.5)]), vad_model)
+    assert calls == [512, 512]
+    assert speech_probs.tolist() == [0.0, 0.5]
+
+
+def test_vad_parameter_changes_reuse_cached_probabilities(tmp_path, monkeypatch):
+    np = pytest.importorskip("numpy")
+    torch = pytest.importorskip("torch")
+    model_runs = []
+
+    def compute_vad_speech_probs(audio_waveform, vad_model, sampling_rate=16000, window_size_samples=512):
+        model_runs.append(window_size_samples)
+        return np.array(windows((0.0, 10), (0.7, 20), (0.0, 10)), dtype=np.float32)
+
+    monkeypatch.setattr(cli, "compute_vad_speech_probs", compute_vad_speech_probs)
+    cache = VadProbabilityCache(str(tmp_path))
+    waveform = torch.zeros(40 * 512)
+
+    def speech_timestamps(**vad_params):
+        return cli.get_speech_timestamps_from_vad(waveform, 16000, None, audio_hash="abc", vad_probability_cache=cache, **vad_params)
+
+    assert speech_timestamps(vad_threshold=0.5) == [{"start": 4640, "end": 15840}]
+    # Only the thresholding reruns for new VAD parameters; the probabilities come from the cache.
+    assert speech_timestamps(vad_threshold=0.8) == []
+    assert speech_timestamps(vad_threshold=0.5, speech_pad_ms=0) == [{"start": 5120, "end": 15360}]
+    assert model_runs == [512]
+    # A different window grid needs new probabilities.
+    speech_timestamps(window_size_samples=1024)
+    assert model_runs == [512, 1024]
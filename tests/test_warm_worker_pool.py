@@ -0,0 +1,31 @@
+import multiprocessing
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("torch")
+
+from auto_subtitle.cli import WarmWorkerPool, create_shared_audio_block, make_pool_tasks, release_shared_audio_block, run_pool_tasks_longest_first
+
+
+def test_warm_pool_serves_every_file_with_the_same_workers():
+    # An unknown backend fails to load at once, so the workers start without downloading a model.
+    warm_pool = WarmWorkerPool(2, "tiny", None, 1, backend_name="none")
+    try:
+        worker_pids = {child.pid for child in multiprocessing.active_children()}
+        assert len(worker_pids) == 2
+        for _ in range(2):
+            shared_audio_block = create_shared_audio_block(np.zeros(1600, dtype=np.float32))
+            try:
+                tasks = make_pool_tasks(shared_audio_block, 1600, [[(0, 1600, 0.0)]], "tiny", None, {}, 1, "none")
+                task_results, _, _, _, lost_tasks = run_pool_tasks_longest_first(warm_pool.pool, tasks, 2, warm_pool.task_events, max_retries=0)
+            finally:
+                release_shared_audio_block(shared_audio_block)
+            assert [task_result["error"] for task_result in task_results] == ["Whisper model not available"]
+            assert task_results[0]["worker_pid"] in worker_pids and lost_tasks == 0
+            warm_pool.files_served += 1
+        assert {child.pid for child in multiprocessing.active_children()} == worker_pids
+        assert set(warm_pool.collect_worker_status()) <= worker_pids
+    finally:
+        warm_pool.close(report=False)
+    assert not multiprocessing.active_children()
@@ -5,7 +5,8 @@ import os
 import threading
 import sys
 import multiprocessing
-import re
+import queue
+import json
 
 # --- Constants and Configuration ---
 try:
@@ -47,15 +48,38 @@ except NotImplementedError:
     DEFAULT_NUM_WORKERS = "1"
 
 DEFAULT_OUTPUT_DIR = os.path.join(os.path.expanduser("~"), "Desktop")
+PROGRESS_POLL_MS = 250
+
+
+def open_progress_pipe():
+    # The CLI writes its --progress_format jsonl events to the pipe's write end, which only the child inherits.
+    # Returns (read file, write fd to close once the child started, --progress_fd value, extra Popen arguments).
+    read_fd, write_fd = os.pipe()
+    if os.name == 'nt':
+        import msvcrt
+        write_handle = msvcrt.get_osfhandle(write_fd)
+        os.set_handle_inheritable(write_handle, True)
+        startupinfo = subprocess.STARTUPINFO()
+        startupinfo.lpAttributeList = {"handle_list": [write_handle]}
+        popen_kwargs = {"startupinfo": startupinfo}
+        progress_fd_arg = str(write_handle)
+    else:
+        popen_kwargs = {"pass_fds": (write_fd,)}
+        progress_fd_arg = str(write_fd)
+    return os.fdopen(read_fd, "r", encoding="utf-8", errors="replace"), write_fd, progress_fd_arg, popen_kwargs
 
 class SubtitleApp:
     def __init__(self, master):
         self.master = master
         self.video_files = []
+        # Progress events of the running CLI, drained on the Tk thread every PROGRESS_POLL_MS.
+        self.progress_events = queue.Queue()
+        self.current_file_index, self.current_file_count = 0, 0
         
         self._configure_styles()
         self._create_widgets()
         self.check_paths()
+        self.master.after(PROGRESS_POLL_MS, self._poll_progress_events)
 
     def _configure_styles(self):
         self.BG_COLOR = "#F5F5F5"
@@ -436,9 +460,8 @@ class SubtitleApp:
             self.log_message(f"\nProcessing file {i+1}/{num_files}: {os.path.basename(video_file_path)}", self.ACCENT_COLOR)
             print(f"\n{'='*80}\n--> Starting file {i+1}/{num_files}: {os.path.basename(video_file_path)}\n{'='*80}")
             
+            self.current_file_index, self.current_file_count = i, num_files
             self.master.after(0, self._update_ui_progress, 0, None, None)
-            is_single_chunk_mode = None
-            processed_chunks, total_chunks = 0, 0
 
             command = [
                 PYTHON_EXECUTABLE, "-u", "-m", "auto_subtitle.cli", video_file_path,
@@ -454,6 +477,8 @@ class SubtitleApp:
                 "--no_speech_threshold", self.no_speech_threshold_var.get(),
                 "--merge_repetitive_segments", str(self.merge_repetitions_var.get())
             ]
+            progress_file, progress_write_fd, progress_fd_arg, progress_popen_kwargs = open_progress_pipe()
+            command.extend(["--progress_format", "jsonl", "--progress_fd", progress_fd_arg])
 
             if self.use_vad_var.get():
                 command.extend(["--use_vad", "True", "--vad_threshold", self.vad_threshold_var.get(),
@@ -467,49 +492,29 @@ class SubtitleApp:
 
             try:
                 process_flags = subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0
-                process = subprocess.Popen(
-                    command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
-                    bufsize=1, cwd=VENV_SCRIPTS_DIR, creationflags=process_flags,
-                    encoding='utf-8', errors='replace'
-                )
-                
+                try:
+                    process = subprocess.Popen(
+                        command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+                        bufsize=1, cwd=VENV_SCRIPTS_DIR, creationflags=process_flags,
+                        encoding='utf-8', errors='replace', **progress_popen_kwargs
+                    )
+                except Exception:
+                    progress_file.close()
+                    raise
+                finally:
+                    os.close(progress_write_fd) # The CLI holds the only write end now, so the reader sees EOF when it exits.
+                progress_thread = threading.Thread(target=self._read_progress_events, args=(progress_file,), daemon=True)
+                progress_thread.start()
+
+                # The log only goes to the console; progress comes from the event stream.
                 for raw_line in iter(process.stdout.readline, ''):
-                    line = raw_line.rstrip()
-                    final_part = line.split('\r')[-1]
-                    if not final_part: continue
-                    print(final_part, flush=True)
-
-                    if is_single_chunk_mode is None:
-                        if (match := re.search(r'VAD found (\d+) speech segments', final_part)):
-                            total_chunks = int(match.group(1))
-                            if total_chunks > 1:
-                                is_single_chunk_mode = False
-                                self.log_message(f"INFO: VAD detected {total_chunks} speech segments.")
-                                # BUGFIX: The original line incorrectly configured the progress bar's maximum,
-                                # causing it to appear stuck. The update logic relies on a percentage-based
-                                # system, so the progress bar's maximum should be 100. This part of the
-                                # original line is removed. The label update is preserved but written
-                                # more safely to avoid potential closure issues.
-                                self.master.after(0, lambda i=i, num_files=num_files: self.overall_progress_label.config(text=f"Overall Progress: {i+1} / {num_files}"))
-                            else:
-                                is_single_chunk_mode = True
-                                self.log_message("INFO: Processing as a single segment. Progress will be time-based.")
-
-                    if is_single_chunk_mode:
-                        if (match := re.search(r'([\d\.]+)/([\d\.]+)[\s\[]', final_part)):
-                            current, total = float(match.group(1)), float(match.group(2))
-                            percent = (current / total) * 100 if total > 0 else 0
-                            self.master.after(0, self._update_ui_progress, percent, i, num_files)
-                    elif total_chunks > 0 and 'Transcription finished for VAD chunk' in final_part:
-                        processed_chunks += 1
-                        percent = (processed_chunks / total_chunks) * 100
-                        self.master.after(0, self._update_ui_progress, percent, i, num_files)
-                    
-                    if (match := re.search(r'INFO: Detected language: (\w+)', final_part)):
-                        self.log_message(f"INFO: Auto-detected language as: {match.group(1).capitalize()}", self.SUCCESS_COLOR)
+                    final_part = raw_line.rstrip().split('\r')[-1]
+                    if final_part: print(final_part, flush=True)
 
                 process.stdout.close()
-                if process.wait() == 0:
+                return_code = process.wait()
+                progress_thread.join()
+                if return_code == 0:
                     self.log_message(f"Successfully processed {os.path.basename(video_file_path)}.", self.SUCCESS_COLOR)
                     self.master.after(0, self._update_ui_progress, 100, i + 1, num_files)
                 else:
@@ -524,6 +529,42 @@ class SubtitleApp:
         
         self.master.after(0, self._processing_finished, all_successful)
 
+    def _read_progress_events(self, progress_file):
+        with progress_file:
+            for event_line in progress_file:
+                try:
+                    self.progress_events.put(json.loads(event_line))
+                except ValueError:
+                    pass
+
+    def _poll_progress_events(self):
+        # Runs on the Tk thread: of the chunk events queued since the last poll only the latest one moves the progress bar.
+        latest_chunk_event = None
+        while True:
+            try: event = self.progress_events.get_nowait()
+            except queue.Empty: break
+            if event["event"] == "file_planned":
+                self.log_message(f"INFO: {event['chunks']} speech chunk(s) to transcribe in {os.path.basename(event['video'])}.")
+                self.overall_progress_label.config(text=f"Overall Progress: {self.current_file_index + 1} / {self.current_file_count}")
+                latest_chunk_event = None
+            elif event["event"] in ("chunk_done", "file_progress"):
+                latest_chunk_event = event
+            elif event["event"] == "language_detected":
+                self.log_message(f"INFO: Auto-detected language as: {event['language']} (probability {event['probability']:.2f})", self.SUCCESS_COLOR)
+            elif event["event"] == "error":
+                self.log_message(f"{event['level'].upper()}: {event['message']}", self.ERROR_COLOR)
+
+        if latest_chunk_event is not None:
+            event = latest_chunk_event
+            if event["audio_total_sec"]: percent = 100 * event["audio_done_sec"] / event["audio_total_sec"]
+            else: percent = 100 * event["chunks_done"] / max(1, event["chunks"])
+            self._update_ui_progress(percent, None, None)
+            if event["eta_sec"] is not None:
+                self.file_progress_label.config(text=f"File Progress: {int(percent)}% (about {int(event['eta_sec'] // 60)}m {int(event['eta_sec'] % 60):02d}s left)")
+
+        if self.master.winfo_exists():
+            self.master.after(PROGRESS_POLL_MS, self._poll_progress_events)
+
     def _processing_finished(self, success_flag=True):
         self.log_message("="*60, self.ACCENT_COLOR)
         should_shutdown = self.shutdown_var.get()